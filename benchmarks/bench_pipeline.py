@@ -0,0 +1,350 @@
+"""接收 → 解析 → 显示 → 保存 全流程基准测试（Linux pty），结果写入JSON文件便于不同版本之间对比
+
+用法:
+    python benchmarks/bench_pipeline.py --bauds 9600,115200,921600,3000000 --ports 1,4,16 \\
+        --mixes rmc-gga,full,binary --seconds 3 --output results.json
+    python benchmarks/bench_pipeline.py --pipeline core --set batch_max_bytes=16384
+
+每个组合（波特率 × 串口数 × 语句组合）单独运行一次：写入端在子进程中按波特率（8N1）向各个伪终端写数据，
+本进程中的接收端完整地走一遍流程。
+  gui   每个串口一个SerialPortWidget（offscreen平台，显示并自动保存），测量事件循环的帧间隔
+  core  SerialReader + FileSink，不使用Qt
+测量：
+  sustained   写入端达到目标速率的95%以上，且写入的字节全部保存到日志（没有丢弃批次）
+  cpu_s_per_mb  接收进程（不含写入子进程）每MB数据消耗的CPU秒
+  peak_rss_mb   本组合运行期间采样到的最大常驻内存
+  frame_ms      gui模式下16ms定时器的实际间隔（P50/P99/最大），即界面卡顿程度
+汇总中的max_lossless_baud为每种语句组合、每个串口数下能无丢失持续接收的最高波特率。
+--set name=value 修改SerialReader或SerialPortWidget的参数（如batch_max_bytes、max_display_lines），记录在结果中。
+"""
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import SENTENCE_MIXES, PacedWriter, open_pty
+
+from log_writer import LogWriter
+from serial_core import FileSink, SerialConfig, SerialReader
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+DRAIN_TIMEOUT = 10.0
+
+
+def rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+
+
+def cpu_seconds() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+def _write_ports(masters, baud, seconds, sentences, results):
+    """写入子进程：每个伪终端一个PacedWriter线程"""
+    writers = [PacedWriter(fd, baud, seconds, sentences=sentences) for fd in masters]
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    results.put([(w.bytes_written, w.elapsed) for w in writers])
+
+
+def start_writers(masters, baud, seconds, sentences):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    process = context.Process(target=_write_ports, args=(masters, baud, seconds, sentences, results), daemon=True)
+    process.start()
+    return process, results
+
+
+def apply_settings(target, settings: dict):
+    for name, value in settings.items():
+        if hasattr(target, name):
+            setattr(target, name, value)
+
+
+class CorePipeline:
+    """SerialReader + FileSink，每个串口一个读取线程"""
+
+    frame_times = None
+
+    def __init__(self, paths, baud, log_writer, log_dir, settings):
+        self.readers = []
+        self.threads = []
+        for i, path in enumerate(paths):
+            config = SerialConfig(port=path, baudrate=baud)
+            reader = SerialReader(config, sinks=[FileSink(log_writer, i, log_dir, f"bench{i}")],
+                                  on_error=lambda message: print(f"错误: {message}", file=sys.stderr))
+            apply_settings(reader, settings)
+            reader.open()
+            self.readers.append(reader)
+            self.threads.append(threading.Thread(target=reader.run, daemon=True))
+        for t in self.threads:
+            t.start()
+
+    def run_for(self, seconds: float, until=None):
+        """等待seconds秒，期间采样内存；until()为真时提前结束"""
+        peak = rss_mb()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not (until and until()):
+            time.sleep(0.05)
+            peak = max(peak, rss_mb())
+        return peak
+
+    @property
+    def received(self) -> int:
+        return sum(r.stats.bytes for r in self.readers)
+
+    def drained(self, written: int) -> bool:
+        return self.received >= written and not any(r.pending_bytes for r in self.readers)
+
+    @property
+    def dropped_batches(self) -> int:
+        return sum(r.dropped_batches for r in self.readers)
+
+    def close(self):
+        for r in self.readers:
+            r.stop()
+        for t in self.threads:
+            t.join(2)
+
+
+class GuiPipeline:
+    """每个串口一个SerialPortWidget：解析结果显示、原始数据缓冲、自动保存都与界面中相同"""
+
+    def __init__(self, paths, baud, log_writer, log_dir, settings):
+        from PyQt5.QtCore import QTimer
+        from PyQt5.QtWidgets import QApplication
+        from main import SerialPortWidget
+
+        self.app = QApplication.instance()
+        self.widgets = []
+        for i, path in enumerate(paths):
+            widget = SerialPortWidget(i)
+            widget.log_writer = log_writer
+            widget.log_dir = log_dir
+            widget.auto_save_enabled = True
+            apply_settings(widget, settings)
+            widget.port_combo.addItem(path)
+            widget.port_combo.setCurrentText(path)
+            if widget.baudrate_combo.findText(str(baud)) < 0:
+                widget.baudrate_combo.addItem(str(baud))
+            widget.baudrate_combo.setCurrentText(str(baud))
+            widget.show()
+            widget.connect_serial()
+            self.widgets.append(widget)
+        self.frame_times = []
+        self._last_tick = None
+        self._timer = QTimer()
+        self._timer.timeout.connect(self._tick)
+        self.run_for(5, until=lambda: all(w.serial_receiver and w.serial_receiver.is_connected
+                                          for w in self.widgets))
+        self.frame_times = []
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.frame_times.append((now - self._last_tick) * 1000)
+        self._last_tick = now
+
+    def run_for(self, seconds: float, until=None):
+        peak = rss_mb()
+        self._last_tick = None
+        self._timer.start(16)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not (until and until()):
+            self.app.processEvents()
+            time.sleep(0.001)
+            peak = max(peak, rss_mb())
+        self._timer.stop()
+        return peak
+
+    @property
+    def received(self) -> int:
+        return sum(w.serial_receiver.stats.bytes for w in self.widgets if w.serial_receiver)
+
+    def drained(self, written: int) -> bool:
+        """全部读到，且每个批次都已交给界面处理（写日志）"""
+        return self.received >= written and not any(
+            w.serial_receiver.reader.pending_bytes or w.serial_receiver.queued_batches
+            for w in self.widgets if w.serial_receiver)
+
+    @property
+    def dropped_batches(self) -> int:
+        return sum(w.serial_receiver.dropped_batches for w in self.widgets if w.serial_receiver)
+
+    def close(self):
+        for w in self.widgets:
+            w.close()
+        self.app.processEvents()
+
+
+def run_cell(pipeline_type, baud, ports, mix, seconds, settings) -> dict:
+    ptys = [open_pty() for _ in range(ports)]
+    log_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    log_writer = LogWriter()
+    log_writer.start()
+    pipeline = pipeline_type([path for _, path, _ in ptys], baud, log_writer, log_dir, settings)
+
+    cpu0 = cpu_seconds()
+    process, results = start_writers([master for master, _, _ in ptys], baud, seconds, SENTENCE_MIXES[mix])
+    peak = pipeline.run_for(seconds + 60, until=lambda: not process.is_alive())
+    written = results.get()
+    total_written = sum(n for n, _ in written)
+    # 写入结束后等待接收端取完内核缓冲区中的剩余数据并处理完所有批次，超时未处理完的计为丢失
+    peak = max(peak, pipeline.run_for(DRAIN_TIMEOUT, until=lambda: pipeline.drained(total_written)))
+    cpu = cpu_seconds() - cpu0
+    process.join()
+
+    received = pipeline.received
+    dropped = pipeline.dropped_batches
+    frame_times = pipeline.frame_times
+    pipeline.close()
+    log_writer.stop()
+    logged = log_writer.bytes_written
+    shutil.rmtree(log_dir, ignore_errors=True)
+    for master, _, slave in ptys:
+        os.close(master)
+        os.close(slave)
+
+    target = baud / 10 * ports
+    achieved = sum(n / t for n, t in written if t)
+    cell = {
+        'baud': baud,
+        'ports': ports,
+        'mix': mix,
+        'target_bytes_per_s': target,
+        'written_bytes_per_s': round(achieved, 1),
+        'written': total_written,
+        'received': received,
+        'logged': logged,
+        'lost': total_written - logged,
+        'dropped_batches': dropped,
+        'log_dropped_writes': log_writer.dropped_writes,
+        'cpu_s_per_mb': round(cpu / (received / 1024 / 1024), 4) if received else None,
+        'peak_rss_mb': round(peak, 1),
+    }
+    cell['sustained'] = (achieved >= 0.95 * target and cell['lost'] == 0 and dropped == 0
+                         and log_writer.dropped_writes == 0)
+    if frame_times:
+        frame_times.sort()
+        cell['frame_ms'] = {
+            'p50': round(statistics.median(frame_times), 2),
+            'p99': round(frame_times[min(len(frame_times) - 1, int(len(frame_times) * 0.99))], 2),
+            'max': round(frame_times[-1], 2),
+        }
+    return cell
+
+
+def summarize(cells: list) -> dict:
+    """每种语句组合、每个串口数下无丢失的最高波特率"""
+    best = {}
+    for cell in cells:
+        key = best.setdefault(cell['mix'], {})
+        ports = str(cell['ports'])
+        if cell['sustained']:
+            key[ports] = max(key.get(ports) or 0, cell['baud'])
+        else:
+            key.setdefault(ports, None)
+    return {'max_lossless_baud': best}
+
+
+def version() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_list(text: str, cast=int) -> list:
+    return [cast(x) for x in text.split(',') if x.strip()]
+
+
+def parse_settings(items) -> dict:
+    settings = {}
+    for item in items:
+        name, _, value = item.partition('=')
+        try:
+            settings[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            settings[name] = value
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pipeline', choices=('gui', 'core'), default='gui')
+    parser.add_argument('--bauds', default='9600,115200,921600,3000000')
+    parser.add_argument('--ports', default='1,4,16')
+    parser.add_argument('--mixes', default=','.join(SENTENCE_MIXES))
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE')
+    parser.add_argument('--output', default='bench_pipeline.json')
+    args = parser.parse_args()
+
+    mixes = parse_list(args.mixes, str)
+    unknown = set(mixes).difference(SENTENCE_MIXES)
+    if unknown:
+        parser.error(f"未知的语句组合: {','.join(sorted(unknown))}，可选: {','.join(SENTENCE_MIXES)}")
+    settings = parse_settings(args.set)
+    # 类属性（如batch_max_bytes、batch_interval）对所有SerialReader生效
+    apply_settings(SerialReader, settings)
+
+    app = None
+    if args.pipeline == 'gui':
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication([])
+        pipeline_type = GuiPipeline
+    else:
+        pipeline_type = CorePipeline
+
+    cells = []
+    for mix in mixes:
+        for ports in parse_list(args.ports):
+            for baud in parse_list(args.bauds):
+                cell = run_cell(pipeline_type, baud, ports, mix, args.seconds, settings)
+                cells.append(cell)
+                frame = cell.get('frame_ms')
+                print(f"{mix:<8}{ports:>3}口 {baud:>8} baud  写入 {cell['written_bytes_per_s'] / 1024:>8.1f} KB/s"
+                      f"  丢失 {cell['lost']:>8}  CPU {cell['cpu_s_per_mb'] or 0:.3f} s/MB"
+                      f"  内存 {cell['peak_rss_mb']:.0f} MB"
+                      + (f"  帧间隔 P99 {frame['p99']:.1f} ms" if frame else "")
+                      + ("" if cell['sustained'] else "  未达标"), flush=True)
+
+    result = {
+        'meta': {
+            'version': version(),
+            'pipeline': args.pipeline,
+            'seconds': args.seconds,
+            'settings': settings,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cells': cells,
+        'summary': summarize(cells),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"无丢失的最高波特率: {json.dumps(result['summary']['max_lossless_baud'], ensure_ascii=False)}")
+    print(f"结果已写入 {args.output}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""每串口一个线程 vs 共享I/O反应器：16个pty下的空闲/负载开销对比（Linux）
+
+用法: python benchmarks/bench_reactor.py --ports 16 --seconds 5 --baud 115200
+"""
+import argparse
+import os
+import resource
+import time
+
+from common import PacedWriter, open_pty
+
+from PyQt5.QtCore import QCoreApplication, Qt
+from serial_reactor import SerialReactor
+from serial_receiver import SerialConfig, SerialReceiver
+
+
+def usage():
+    """返回 (CPU秒, 上下文切换次数)，统计整个进程的所有线程"""
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime, ru.ru_nvcsw + ru.ru_nivcsw
+
+
+def total_written(writers):
+    return sum(w.bytes_written for w in writers)
+
+
+def run_mode(mode, ports, seconds, baud):
+    reactor = SerialReactor() if mode == 'reactor' else None
+    ptys = [open_pty() for _ in range(ports)]
+    received = [0] * ports
+    receivers = []
+    for i, (_master, slave_path, _slave) in enumerate(ptys):
+        receiver = SerialReceiver(SerialConfig(port=slave_path, baudrate=baud), i, reactor=reactor)
+
+        def on_data(data, i=i):
+            received[i] += len(data)
+
+        receiver.raw_data_received.connect(on_data, Qt.DirectConnection)
+        receiver.start()
+        receivers.append(receiver)
+    while not all(r.is_connected for r in receivers):
+        time.sleep(0.01)
+
+    # 空闲阶段
+    cpu0, ctx0 = usage()
+    time.sleep(seconds)
+    cpu1, ctx1 = usage()
+    idle = ((cpu1 - cpu0) / seconds, (ctx1 - ctx0) / seconds)
+
+    # 负载阶段：每个串口都按baud持续发送
+    writers = [PacedWriter(master, baud, seconds) for master, _, _ in ptys]
+    cpu0, ctx0 = usage()
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    cpu1, ctx1 = usage()
+    deadline = time.perf_counter() + 2
+    while sum(received) < total_written(writers) and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    load = ((cpu1 - cpu0) / seconds, (ctx1 - ctx0) / seconds)
+    lost = total_written(writers) - sum(received)
+
+    for receiver in receivers:
+        receiver.cleanup()
+    if reactor is not None:
+        reactor.stop()
+    for master, _, slave in ptys:
+        os.close(master)
+        os.close(slave)
+    return idle, load, lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ports', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--baud', type=int, default=115200)
+    args = parser.parse_args()
+
+    app = QCoreApplication([])
+    print(f"{'模式':<10}{'空闲CPU':>10}{'空闲切换/s':>12}{'负载CPU':>10}{'负载切换/s':>12}{'丢失字节':>10}")
+    for mode in ('thread', 'reactor'):
+        (idle_cpu, idle_ctx), (load_cpu, load_ctx), lost = run_mode(mode, args.ports, args.seconds, args.baud)
+        print(f"{mode:<10}{idle_cpu:>10.2%}{idle_ctx:>12.1f}{load_cpu:>10.2%}{load_ctx:>12.1f}{lost:>10}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""接收循环吞吐量/延迟基准测试（Linux pty）
+
+用法: python benchmarks/bench_receive.py --baud 3000000 --seconds 5
+
+写入端按照给定波特率（8N1）向伪终端写入NMEA数据，SerialReceiver 在另一端接收；
+--core 时直接使用 serial_core.SerialReader，不创建QCoreApplication，便于单独剖析接收核心。
+如果接收循环跟不上，pty 缓冲区写满后写入端会被阻塞，实际速率就会低于目标速率。
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from common import PacedWriter, SAMPLE_SENTENCES, open_pty
+
+from serial_core import SerialConfig, SerialReader
+
+
+class Counter:
+    def __init__(self):
+        self.bytes = 0
+        self.chunks = 0
+        self.last_time = 0.0
+        self.arrived = threading.Event()
+
+    def on_data(self, data):
+        self.last_time = time.perf_counter()
+        self.bytes += len(data)
+        self.chunks += 1
+        self.arrived.set()
+
+
+def measure_throughput(receiver, counter, master_fd, baud, seconds):
+    writer = PacedWriter(master_fd, baud, seconds)
+    writer.start()
+    writer.join()
+    # 等待接收端取完剩余数据
+    deadline = time.perf_counter() + 2
+    while counter.bytes < writer.bytes_written and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return writer
+
+
+def measure_latency(counter, master_fd, samples):
+    sentence = SAMPLE_SENTENCES[0]
+    latencies = []
+    for _ in range(samples):
+        expected = counter.bytes + len(sentence)
+        start = time.perf_counter()
+        os.write(master_fd, sentence)
+        while counter.bytes < expected:
+            counter.arrived.wait(1)
+            counter.arrived.clear()
+        latencies.append((counter.last_time - start) * 1000)
+        time.sleep(0.002)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baud', type=int, default=3000000)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--latency-samples', type=int, default=200)
+    parser.add_argument('--batch-interval', type=float, default=0.0,
+                        help='SerialReceiver.batch_interval（秒），0表示每次读取后立即发送')
+    parser.add_argument('--core', action='store_true', help='直接测试SerialReader，不使用Qt')
+    args = parser.parse_args()
+
+    master_fd, slave_path, _slave_fd = open_pty()
+    counter = Counter()
+    config = SerialConfig(port=slave_path, baudrate=args.baud)
+    if args.core:
+        app = None
+        receiver = SerialReader(config, on_batch=lambda data, chunks, records: counter.on_data(data),
+                                on_error=lambda msg: print(f"错误: {msg}"))
+        receiver.parse_records = False
+        thread = threading.Thread(target=receiver.run, daemon=True)
+    else:
+        from PyQt5.QtCore import QCoreApplication, Qt
+        from serial_receiver import SerialReceiver
+
+        app = QCoreApplication([])
+        receiver = thread = SerialReceiver(config, 0)
+        receiver.raw_data_received.connect(counter.on_data, Qt.DirectConnection)
+        receiver.error_occurred.connect(lambda msg: print(f"错误: {msg}"), Qt.DirectConnection)
+    receiver.batch_interval = args.batch_interval
+    thread.start()
+    while not receiver.is_connected:
+        time.sleep(0.01)
+
+    cpu_start = time.process_time()
+    writer = measure_throughput(receiver, counter, master_fd, args.baud, args.seconds)
+    cpu_used = time.process_time() - cpu_start
+    target_rate = args.baud / 10
+    achieved_rate = writer.bytes_written / writer.elapsed
+    received, chunks = counter.bytes, counter.chunks
+
+    latencies = measure_latency(counter, master_fd, args.latency_samples)
+    if args.core:
+        receiver.stop()
+        thread.join(2)
+    else:
+        receiver.cleanup()
+    del app
+
+    print(f"目标速率: {target_rate / 1024:.1f} KB/s ({args.baud} baud)")
+    print(f"写入速率: {achieved_rate / 1024:.1f} KB/s ({achieved_rate / target_rate:.1%})")
+    print(f"接收字节: {received} / {writer.bytes_written}")
+    print(f"平均每批: {received / max(chunks, 1):.0f} 字节")
+    print(f"CPU占用: {cpu_used / writer.elapsed:.1%}")
+    print(f"接收延迟: p50={statistics.median(latencies):.3f} ms  "
+          f"p99={statistics.quantiles(latencies, n=100)[98]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""基准测试公用工具：Linux 伪终端(pty)和NMEA测试数据"""
+import os
+import sys
+import threading
+import time
+import tty
+
+# 允许直接以 python benchmarks/xxx.py 方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_SENTENCES = (
+    b"$GNRMC,083559.00,A,3958.71234,N,11619.45678,E,0.004,77.52,091202,,,A*4B\r\n",
+    b"$GNGGA,083559.00,3958.71234,N,11619.45678,E,1,12,0.86,52.4,M,-8.5,M,,*6C\r\n",
+)
+
+
+def sentence(body: str) -> bytes:
+    """'GNRMC,...' -> 带正确校验和的完整语句"""
+    from serial_core.framer import nmea_checksum
+    body = body.encode()
+    return b"$%s*%02X\r\n" % (body, nmea_checksum(body))
+
+
+def ubx_frame(msg_class: int, msg_id: int, payload: bytes) -> bytes:
+    from serial_core.binary import ubx_checksum
+    body = bytes((msg_class, msg_id)) + len(payload).to_bytes(2, 'little') + payload
+    return b'\xb5\x62' + body + bytes(ubx_checksum(body))
+
+
+def rtcm3_frame(message_type: int, payload: bytes) -> bytes:
+    from serial_core.binary import crc24q
+    payload = bytes((message_type >> 4, (message_type & 0x0F) << 4)) + payload
+    frame = b'\xd3' + len(payload).to_bytes(2, 'big') + payload
+    return frame + crc24q(frame).to_bytes(3, 'big')
+
+
+# 语句组合：一个周期内接收机输出的内容
+SENTENCE_MIXES = {
+    'rmc-gga': SAMPLE_SENTENCES,
+    'full': SAMPLE_SENTENCES + (
+        sentence("GPGSV,3,1,12,01,40,083,46,02,17,308,41,12,07,344,39,14,22,228,45"),
+        sentence("GPGSV,3,2,12,15,55,120,44,17,33,050,40,19,12,300,35,24,65,010,47"),
+        sentence("GPGSV,3,3,12,25,20,180,38,28,08,270,30,30,45,140,43,32,15,210,36"),
+        sentence("GNGSA,A,3,80,71,73,79,69,,,,,,,,1.83,1.09,1.47"),
+        sentence("GNVTG,77.52,T,,M,0.004,N,0.008,K,A"),
+        sentence("GNZDA,083559.00,09,12,2002,00,00"),
+        sentence("GNGST,083559.00,1.2,0.8,0.5,45.0,0.9,0.7,1.5"),
+    ),
+    'binary': SAMPLE_SENTENCES + (
+        ubx_frame(0x01, 0x07, bytes(range(92))),
+        rtcm3_frame(1005, bytes(range(17))),
+        rtcm3_frame(1077, bytes(range(200))),
+    ),
+}
+
+
+def open_pty():
+    """创建一对伪终端，返回 (master_fd, slave_path)。slave 端可以直接交给 pyserial 打开"""
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+    slave_path = os.ttyname(slave_fd)
+    # 保持 slave 端打开，避免 pyserial 打开前 master 读到 EIO
+    return master_fd, slave_path, slave_fd
+
+
+def nmea_payload(size: int, sentences=SAMPLE_SENTENCES) -> bytes:
+    """生成至少 size 字节、以完整语句结尾的NMEA数据"""
+    block = b"".join(sentences)
+    repeat = size // len(block) + 1
+    return block * repeat
+
+
+class PacedWriter(threading.Thread):
+    """按指定字节速率向 master_fd 写入数据，模拟给定波特率的串口设备（8N1，每字节10位）"""
+
+    def __init__(self, master_fd: int, baudrate: int, seconds: float, slice_seconds: float = 0.005,
+                 sentences=SAMPLE_SENTENCES):
+        super().__init__(daemon=True)
+        self.master_fd = master_fd
+        self.bytes_per_second = baudrate / 10
+        self.seconds = seconds
+        self.slice_seconds = slice_seconds
+        self.bytes_written = 0
+        self.elapsed = 0.0
+        self._payload = nmea_payload(int(self.bytes_per_second * slice_seconds) * 4 + 4096, sentences)
+
+    def run(self):
+        start = time.perf_counter()
+        deadline = start + self.seconds
+        offset = 0
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            due = int((now - start) * self.bytes_per_second) - self.bytes_written
+            if due <= 0:
+                time.sleep(self.slice_seconds)
+                continue
+            # 落后时每次最多写一整块数据（否则切片比due短，bytes_written会多算），下一轮继续追赶
+            due = min(due, len(self._payload))
+            if offset + due > len(self._payload):
+                offset = 0
+            view = memoryview(self._payload)[offset:offset + due]
+            while view:
+                written = os.write(self.master_fd, view)
+                view = view[written:]
+            offset += due
+            self.bytes_written += due
+        self.elapsed = time.perf_counter() - start
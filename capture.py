@@ -0,0 +1,165 @@
+import bisect
+import mmap
+import os
+import struct
+import time
+
+# 捕获格式
+#   <name>.cap  串口原始字节，逐字节与收到的数据一致（可直接当作原始数据流使用）
+#   <name>.idx  索引：文件头 + 每个数据块一条 (单调时钟接收时间, 在.cap中的偏移)
+# 索引文件头记录开始时的墙上时间和单调时钟，用于两者之间的换算。
+CAPTURE_SUFFIX = '.cap'
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'SRIDX\x00\x01\x00'
+_HEADER = struct.Struct('<8sdd')  # 魔数, 开始时的time.time(), 开始时的time.monotonic()
+_ENTRY = struct.Struct('<dQ')  # 接收时间(time.monotonic()), 数据块在.cap中的偏移
+
+
+class CaptureWriter:
+    """写入原始数据捕获文件及其时间索引"""
+
+    def __init__(self, path: str, buffer_size: int = 64 * 1024):
+        """path为不带扩展名的文件路径"""
+        self.path = path
+        self._data = open(path + CAPTURE_SUFFIX, 'wb', buffering=buffer_size)
+        self._index = open(path + INDEX_SUFFIX, 'wb', buffering=buffer_size)
+        self._index.write(_HEADER.pack(INDEX_MAGIC, time.time(), time.monotonic()))
+        self.size = 0  # 已写入的原始数据字节数
+
+    @property
+    def closed(self) -> bool:
+        return self._data.closed
+
+    def write(self, data: bytes, timestamp: float = None):
+        """写入一个数据块，timestamp为time.monotonic()接收时间，默认取当前时间"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self._index.write(_ENTRY.pack(timestamp, self.size))
+        self._data.write(data)
+        self.size += len(data)
+
+    def write_batch(self, data: bytes, chunks):
+        """写入一个批次；chunks为[(接收时间, 批次内偏移), ...]，保留批次内每次读取的时间"""
+        base = self.size
+        self._index.write(b''.join(_ENTRY.pack(ts, base + offset) for ts, offset in chunks))
+        self._data.write(data)
+        self.size += len(data)
+
+    def flush(self):
+        # 先写数据再写索引，读取端以两者中较短的为准
+        self._data.flush()
+        self._index.flush()
+
+    def fsync(self):
+        """把两个文件都刷到磁盘"""
+        self.flush()
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+
+    def close(self):
+        if not self._data.closed:
+            self.flush()
+            self._data.close()
+            self._index.close()
+
+
+class _Timestamps:
+    """把索引中的时间戳包装成序列，供bisect做O(log n)查找"""
+
+    def __init__(self, index, count):
+        self._index = index
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return _ENTRY.unpack_from(self._index, _HEADER.size + i * _ENTRY.size)[0]
+
+
+class CaptureReader:
+    """通过mmap读取捕获文件，按时间二分查找，可按原始节奏回放"""
+
+    def __init__(self, path: str):
+        """path可以带.cap/.idx扩展名，也可以不带"""
+        base, ext = os.path.splitext(path)
+        self.path = base if ext in (CAPTURE_SUFFIX, INDEX_SUFFIX) else path
+        self._data_file = open(self.path + CAPTURE_SUFFIX, 'rb')
+        self._index_file = open(self.path + INDEX_SUFFIX, 'rb')
+        self._data = self._map(self._data_file)
+        self._index = self._map(self._index_file)
+
+        if len(self._index) < _HEADER.size:
+            raise ValueError(f"索引文件不完整: {self.path + INDEX_SUFFIX}")
+        magic, self.start_wall_time, self.start_monotonic = _HEADER.unpack_from(self._index)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"不是有效的捕获索引文件: {self.path + INDEX_SUFFIX}")
+
+        # 写入中断时索引可能比数据多出几条，丢弃偏移超出数据长度的条目
+        count = (len(self._index) - _HEADER.size) // _ENTRY.size
+        while count and self._offset(count - 1) > len(self._data):
+            count -= 1
+        self._count = count
+        self.timestamps = _Timestamps(self._index, count)
+
+    @staticmethod
+    def _map(f):
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def size(self) -> int:
+        return len(self._data)
+
+    def _offset(self, i: int) -> int:
+        return _ENTRY.unpack_from(self._index, _HEADER.size + i * _ENTRY.size)[1]
+
+    def chunk(self, i: int):
+        """返回第i个数据块 (接收时间, memoryview)，不复制数据"""
+        timestamp, start = _ENTRY.unpack_from(self._index, _HEADER.size + i * _ENTRY.size)
+        end = self._offset(i + 1) if i + 1 < self._count else len(self._data)
+        return timestamp, memoryview(self._data)[start:end]
+
+    def wall_time(self, timestamp: float) -> float:
+        """把单调时钟时间戳换算为time.time()时间"""
+        return self.start_wall_time + (timestamp - self.start_monotonic)
+
+    def find(self, wall_time: float) -> int:
+        """返回第一个接收时间不早于wall_time(time.time()秒)的数据块序号，O(log n)"""
+        timestamp = wall_time - self.start_wall_time + self.start_monotonic
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def replay(self, start: int = 0, speed: float = 1.0):
+        """从第start块开始逐块产出 (接收时间, memoryview)
+
+        speed为回放倍速，按原始接收间隔/speed等待；speed为None或0时不等待。
+        """
+        if start >= self._count:
+            return
+        first = self.timestamps[start]
+        begin = time.monotonic()
+        for i in range(start, self._count):
+            timestamp, data = self.chunk(i)
+            if speed:
+                delay = (timestamp - first) / speed - (time.monotonic() - begin)
+                if delay > 0:
+                    time.sleep(delay)
+            yield timestamp, data
+
+    def close(self):
+        self.timestamps = None
+        for m in (self._data, self._index):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._data_file.close()
+        self._index_file.close()
@@ -0,0 +1,252 @@
+"""无界面采集模式：不导入PyQt5，适合没有显示服务器的现场设备长期运行
+
+用法:
+    python headless.py /dev/ttyUSB0 /dev/ttyUSB1:115200 --baud 9600 --stats-interval 10
+    python headless.py COM3 --format capture --compression gzip --rotate-interval 3600
+    python headless.py serial_logs/a.cap serial_logs/b.log:115200 --replay 10 --no-save
+
+每个串口一个读取线程，自动保存由共用的LogWriter后台线程完成，原始数据可同时转发到UDP/TCP；
+串口断开后按--reconnect间隔自动重连。
+收到SIGINT/SIGTERM时写完剩余数据后退出。
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+import serial
+
+from log_writer import COMPRESSIONS, FSYNC_POLICIES, LogRetention, LogWriter
+from replay import ReplayReader
+from serial_core import (FileSink, NMEAFramer, PortStats, SerialConfig, SerialReader, StatsExporter, TCPForwarder,
+                         UDPForwarder, connection_error_message, format_record, registered_sentences, set_enabled)
+
+MB = 1024 * 1024
+
+
+class HeadlessPort(threading.Thread):
+    """单个串口的采集线程：连接、读取、把批次交给各个Sink，断开后自动重连"""
+
+    def __init__(self, key: int, config: SerialConfig, sinks: list, options, replay_path: str = None):
+        super().__init__(name=f"Port-{config.port}", daemon=True)
+        self.key = key
+        self.config = config
+        self.replay_path = replay_path  # 设置时从该日志文件回放而不是打开串口
+        self.sinks = sinks
+        self.options = options
+        self.reader = None
+        self.failed = False  # 回放文件打不开或未能回放到末尾
+        self.framer = NMEAFramer()  # 跨重连保留，链路质量统计累计整个运行期间
+        self.stats = PortStats()  # 同样跨重连保留
+        self._stopping = threading.Event()
+        # 统计，只在本线程中累加，统计线程读取
+        self.bytes_received = 0
+        self.batches = 0
+        self.records = 0
+        self.errors = 0
+
+    def stop(self):
+        self._stopping.set()
+        if self.reader is not None:
+            self.reader.stop()
+
+    def on_batch(self, data: bytes, chunks: list, records: list):
+        self.bytes_received += len(data)
+        self.batches += 1
+        self.records += len(records)
+        if self.options.print_records:
+            sys.stdout.write(''.join(map(format_record, records)))
+
+    def on_error(self, message: str):
+        self.errors += 1
+        print(f"[{self.config.port}] {message}", file=sys.stderr)
+
+    def run(self):
+        while not self._stopping.is_set():
+            if self.replay_path is not None:
+                self.reader = ReplayReader(self.config, self.replay_path, self.options.replay, self.options.loop,
+                                           on_batch=self.on_batch, on_error=self.on_error, sinks=self.sinks)
+            else:
+                self.reader = SerialReader(self.config, on_batch=self.on_batch, on_error=self.on_error,
+                                           sinks=self.sinks)
+            self.reader.parse_records = self.options.parse
+            self.framer.reset()
+            self.reader.framer = self.framer
+            self.reader.stats = self.stats
+            try:
+                self.reader.open()
+            except serial.SerialException as e:
+                self.on_error(connection_error_message(e))
+                if self.replay_path is not None:
+                    self.failed = True  # 文件不存在，重试也不会成功
+                    break
+            else:
+                print(f"[{self.config.port}] 已连接，波特率 {self.config.baudrate}")
+                self.reader.run()
+                print(f"[{self.config.port}] 已断开")
+                if self.replay_path is not None:
+                    # 回放完毕或文件损坏都不再“重连”：同一个文件再读一次结果相同
+                    self.failed = not self.reader.finished and not self._stopping.is_set()
+                    break
+            self._stopping.wait(self.options.reconnect)
+
+
+def parse_address(spec: str):
+    host, _, port = spec.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def parse_port(spec: str, default_baud: int) -> SerialConfig:
+    """'端口' 或 '端口:波特率'（Windows的COM口同样适用）"""
+    port, sep, baud = spec.rpartition(':')
+    if sep and baud.isdigit():
+        return SerialConfig(port=port, baudrate=int(baud))
+    return SerialConfig(port=spec, baudrate=default_baud)
+
+
+def print_stats(ports, log_writer, elapsed: float, last: dict, exporter=None):
+    """打印每个串口自上次以来的吞吐量，exporter不为None时同时导出每个串口的统计快照"""
+    lines = []
+    for p in ports:
+        snapshot = p.stats.snapshot()
+        if exporter is not None:
+            exporter.write(p.config.port, snapshot)
+        bytes_prev, records_prev = last.get(p.key, (0, 0))
+        last[p.key] = (p.bytes_received, p.records)
+        state = "在线" if p.reader is not None and p.reader.is_connected else "离线"
+        lines.append(f"  {p.config.port:<16}{state}  {(p.bytes_received - bytes_prev) / elapsed:>10.0f} B/s"
+                     f"  {(p.records - records_prev) / elapsed:>8.1f} 语句/s"
+                     f"  共{p.bytes_received}字节 {p.records}条 错误{p.errors}"
+                     f"  校验和错误{p.framer.bad_checksum} 截断{p.framer.truncated}")
+        lines.append(f"    读取平均{snapshot['read_size_avg']:.0f}/最大{snapshot['read_size_max']}字节"
+                     f"  驱动缓冲区最高{snapshot['queue_high_water']}字节"
+                     f"  解析平均{snapshot['parse_ms_avg']:.3f}ms/最长{snapshot['parse_ms_max']:.3f}ms")
+        # 二进制帧按消息类的速率
+        frames_prev = last.get((p.key, 'frames'), {})
+        last[(p.key, 'frames')] = dict(p.framer.frame_counts)
+        if p.framer.frame_counts or p.framer.bad_frames:
+            rates = "  ".join(f"{key} {(count - frames_prev.get(key, 0)) / elapsed:.1f}/s"
+                              for key, count in sorted(p.framer.frame_counts.items()))
+            lines.append(f"    二进制帧: {rates}  校验失败{p.framer.bad_frames}")
+    if log_writer is not None:
+        lines.append(f"  日志: 已写入{log_writer.bytes_written}字节 队列{log_writer.queued} 丢弃{log_writer.dropped_writes}")
+    print(time.strftime("%Y-%m-%d %H:%M:%S") + " 吞吐量统计\n" + "\n".join(lines), flush=True)
+
+
+def main(argv=None) -> int:
+    """返回退出码：回放模式下有文件打不开或未能回放到末尾时为1"""
+    parser = argparse.ArgumentParser(description="无界面多串口采集")
+    parser.add_argument('ports', nargs='+', help="串口，可写成 端口:波特率")
+    parser.add_argument('--baud', type=int, default=9600, help="未指定波特率的串口使用的波特率")
+    parser.add_argument('--log-dir', default="serial_logs")
+    parser.add_argument('--no-save', action='store_true', help="不保存日志，只解析和统计")
+    parser.add_argument('--format', choices=('text', 'capture'), default='text',
+                        help="text: 原始数据.log；capture: 带时间索引的.cap/.idx")
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='none', help="文本日志流式压缩")
+    parser.add_argument('--max-file-size', type=int, default=500, help="单个日志文件上限(MB)")
+    parser.add_argument('--rotate-interval', type=float, default=None, help="按时间轮换(秒)")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='interval')
+    parser.add_argument('--max-total-size', type=int, default=None, help="日志目录总大小上限(MB)，超出时删除最旧的日志段")
+    parser.add_argument('--max-age', type=float, default=None, help="日志段保留时间(小时)")
+    parser.add_argument('--compress-closed', choices=COMPRESSIONS, default='none',
+                        help="压缩已关闭的文本日志段（捕获文件.cap/.idx不压缩）")
+    parser.add_argument('--forward-udp', metavar='HOST:PORT', help="把所有串口的原始数据转发到UDP")
+    parser.add_argument('--forward-tcp', metavar='HOST:PORT', help="把所有串口的原始数据转发到TCP服务器")
+    parser.add_argument('--no-parse', dest='parse', action='store_false', help="不解析NMEA语句")
+    parser.add_argument('--sentences', help="只解析这些语句类型，逗号分隔（不含发送方标识），"
+                                            f"可选: {','.join(registered_sentences())}，默认全部")
+    parser.add_argument('--print-records', action='store_true', help="把解析结果输出到标准输出")
+    parser.add_argument('--stats-interval', type=float, default=10, help="吞吐量统计输出间隔(秒)，0表示不输出")
+    parser.add_argument('--stats-export', metavar='FILE',
+                        help="每个统计间隔把各串口的统计快照追加到该文件，.csv为CSV，其他为JSON Lines")
+    parser.add_argument('--reconnect', type=float, default=5, help="断开后重连间隔(秒)")
+    parser.add_argument('--replay', type=float, metavar='SPEED', default=None,
+                        help="回放模式：ports为serial_logs中的.cap/.log文件（可写成 文件:波特率，.log按波特率推算时间），"
+                             "SPEED为倍速，0表示不限速；全部回放完毕后退出")
+    parser.add_argument('--loop', action='store_true', help="回放到文件末尾后从头开始")
+    options = parser.parse_args(argv)
+    if options.sentences:
+        wanted = {s.strip().upper() for s in options.sentences.split(',') if s.strip()}
+        unknown = wanted.difference(registered_sentences())
+        if unknown:
+            parser.error(f"未知的语句类型: {','.join(sorted(unknown))}")
+        for sentence in registered_sentences():
+            set_enabled(sentence, sentence in wanted)
+
+    log_writer = None
+    if not options.no_save:
+        retention = None
+        if options.max_total_size or options.max_age or options.compress_closed != 'none':
+            retention = LogRetention(
+                options.log_dir,
+                max_total_size=options.max_total_size * MB if options.max_total_size else None,
+                max_age=options.max_age * 3600 if options.max_age else None,
+                compress=options.compress_closed)
+        log_writer = LogWriter(fsync_policy=options.fsync, retention=retention)
+        log_writer.start()
+
+    forwarders = []
+    if options.forward_udp:
+        forwarders.append(UDPForwarder(*parse_address(options.forward_udp)))
+    if options.forward_tcp:
+        forwarders.append(TCPForwarder(*parse_address(options.forward_tcp)))
+        forwarders[-1].start()
+
+    ports = []
+    for i, spec in enumerate(options.ports):
+        config = parse_port(spec, options.baud)
+        replay_path = None
+        if options.replay is not None:
+            replay_path, config.port = config.port, os.path.basename(config.port)
+        sinks = list(forwarders)
+        if log_writer is not None:
+            sinks.append(FileSink(log_writer, i, options.log_dir, config.port, options.format,
+                                  options.max_file_size * MB, options.compression, options.rotate_interval))
+        ports.append(HeadlessPort(i, config, sinks, options, replay_path))
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.set())
+    started = time.monotonic()
+    for p in ports:
+        p.start()
+    if options.replay is not None:
+        # 所有串口都回放完毕（--loop时只会因为失败）后结束
+        def wait_replay():
+            for p in ports:
+                p.join()
+            stopping.set()
+        threading.Thread(target=wait_replay, daemon=True).start()
+
+    last, last_time = {}, time.monotonic()
+    interval = options.stats_interval or None
+    exporter = StatsExporter(options.stats_export) if options.stats_export else None
+    while not stopping.wait(interval):
+        now = time.monotonic()
+        print_stats(ports, log_writer, now - last_time, last, exporter)
+        last_time = now
+    if options.replay is not None:
+        elapsed = time.monotonic() - started
+        total_bytes = sum(p.bytes_received for p in ports)
+        total_records = sum(p.records for p in ports)
+        print(f"回放: {len(ports)}个文件 {total_bytes}字节 {total_records}条记录，用时{elapsed:.3f}s，"
+              f"{total_bytes / elapsed / MB:.2f} MB/s  {total_records / elapsed:.0f} 条/s", flush=True)
+
+    for p in ports:
+        p.stop()
+    for p in ports:
+        p.join(2)
+    for forwarder in forwarders:
+        forwarder.shutdown()
+    if log_writer is not None:
+        log_writer.stop()
+    failed = [p.replay_path for p in ports if p.failed]
+    if failed:
+        print(f"回放失败: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QFontDatabase, QKeySequence
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QHeaderView, QTableView
+
+from ring_buffer import LineRingBuffer
+
+
+class LineBufferModel(QAbstractListModel):
+    """LineRingBuffer上的只读列表模型，视图只会请求可见行的数据"""
+
+    def __init__(self, buffer: LineRingBuffer, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self._floor = buffer.start_seq  # clear_view()之后只显示该序号之后的行
+        self._start = buffer.start_seq  # 模型第0行对应的序号
+        self._end = buffer.end_seq
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._end - self._start
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        seq = self._start + index.row()
+        if seq < self.buffer.start_seq:
+            return ""  # 已被缓冲区淘汰，下次refresh()时删除
+        line = self.buffer.get(seq)
+        if isinstance(line, bytes):
+            # 混在数据中的UBX/RTCM3等二进制字节显示为\xNN，不丢失信息
+            return line.decode('utf-8', errors='backslashreplace').rstrip('\r')
+        return line
+
+    def refresh(self) -> int:
+        """与缓冲区同步：删除已淘汰的行，追加新行，返回新增行数。开销只与变化的行数有关"""
+        start = max(self.buffer.start_seq, self._floor)
+        end = self.buffer.end_seq
+
+        removed = min(start, self._end) - self._start
+        if removed > 0:
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+            self._start += removed
+            self.endRemoveRows()
+        if start > self._end:
+            # 旧行已全部淘汰，新区间与旧区间不相连
+            self._start = self._end = start
+
+        added = end - self._end
+        if added > 0:
+            self.beginInsertRows(QModelIndex(), self._end - self._start, end - self._start - 1)
+            self._end = end
+            self.endInsertRows()
+        return added
+
+    def reset(self):
+        """按缓冲区当前内容重建模型"""
+        self.beginResetModel()
+        self._start = max(self.buffer.start_seq, self._floor)
+        self._end = self.buffer.end_seq
+        self.endResetModel()
+
+    def clear_view(self):
+        """只清空视图，不影响缓冲区"""
+        self.beginResetModel()
+        self._floor = self._start = self._end = self.buffer.end_seq
+        self.endResetModel()
+
+    def text(self) -> str:
+        """当前模型中的全部行，用于保存"""
+        return ''.join(self.data(self.index(row)) + '\n' for row in range(self.rowCount()))
+
+
+class LogView(QTableView):
+    """虚拟化日志视图：只绘制可见行，行高固定，滚动开销与总行数无关
+
+    只显示内存中LineRingBuffer保存的最近capacity行，更早的行被淘汰后不能再滚动回去；
+    完整的数据由自动保存写在日志文件中。
+    使用单列QTableView而不是QListView：QListView在插入/删除行时会重新布局全部行，
+    百万行时每次刷新要数秒；固定行高的表头按区段计算位置，增删行的开销与总行数无关。
+    """
+
+    def __init__(self, buffer: LineRingBuffer, parent=None, min_columns: int = 120):
+        super().__init__(parent)
+        self.setModel(LineBufferModel(buffer, self))
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setToolTip(f"只保留最近{buffer.capacity}行，更早的行不再显示；完整数据请开启自动保存后查看日志文件")
+
+        metrics = self.fontMetrics()
+        rows = self.verticalHeader()
+        rows.hide()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(metrics.height() + 2)
+
+        # 单列铺满视图，内容超过min_columns个字符宽时出现水平滚动条
+        columns = self.horizontalHeader()
+        columns.hide()
+        columns.setMinimumSectionSize(metrics.horizontalAdvance('0') * min_columns)
+        columns.setStretchLastSection(True)
+
+    def is_at_bottom(self) -> bool:
+        scrollbar = self.verticalScrollBar()
+        return scrollbar.value() >= scrollbar.maximum()
+
+    def refresh(self, auto_scroll=None) -> int:
+        """同步新数据；auto_scroll为None时，原来在底部才跟随滚动"""
+        if auto_scroll is None:
+            auto_scroll = self.is_at_bottom()
+        added = self.model().refresh()
+        if added and auto_scroll:
+            self.scrollToBottom()
+        return added
+
+    def reload(self):
+        """重建模型并滚动到底部"""
+        self.model().reset()
+        self.scrollToBottom()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            model = self.model()
+            QApplication.clipboard().setText('\n'.join(model.data(model.index(row)) for row in rows))
+            return
+        super().keyPressEvent(event)
@@ -0,0 +1,475 @@
+import gzip
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from capture import CAPTURE_SUFFIX, INDEX_SUFFIX, CaptureWriter
+
+try:
+    import zstandard
+except ImportError:  # zstd为可选依赖，未安装时只能使用gzip
+    zstandard = None
+
+FSYNC_POLICIES = ('none', 'interval', 'always')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+_STOP = object()
+# 日志段文件：<端口>_<时间>[_n].log/.cap/.idx，可带压缩后缀
+_SEGMENT_RE = re.compile(r'^(?P<stem>.+?)(?P<suffix>\.log|\.cap|\.idx)(?P<compressed>\.gz|\.zst)?$')
+
+
+def compression_available(compression: str) -> bool:
+    if compression == 'zstd':
+        return zstandard is not None
+    return compression in COMPRESSIONS
+
+
+def _check_compression(compression: str):
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"未知的压缩方式: {compression}")
+    if not compression_available(compression):
+        raise ValueError("zstd压缩需要安装zstandard")
+
+
+class _CompressedFile:
+    """流式压缩写入的文件，接口与二进制文件一致
+
+    压缩器每次flush都会结束当前压缩块，16ms的小批次逐次flush会明显降低压缩率，
+    因此flush()最多每flush_interval秒真正刷新一次，fsync()和close()总是刷新。
+    """
+
+    def __init__(self, path: str, compression: str, flush_interval: float = 1.0):
+        self.raw = open(path, 'wb')
+        if compression == 'zstd':
+            self.stream = zstandard.ZstdCompressor(level=3).stream_writer(self.raw, closefd=False)
+            self._flush_mode = zstandard.FLUSH_BLOCK
+        else:
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb', compresslevel=6)
+            self._flush_mode = None
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    @property
+    def closed(self) -> bool:
+        return self.raw.closed
+
+    def write(self, data):
+        self.stream.write(data)
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        if self._flush_mode is None:
+            self.stream.flush()
+        else:
+            self.stream.flush(self._flush_mode)
+        self.raw.flush()
+        self._last_flush = now
+
+    def fsync(self):
+        self.flush(force=True)
+        os.fsync(self.raw.fileno())
+
+    def close(self):
+        if not self.raw.closed:
+            self.stream.close()
+            self.raw.close()
+
+
+def compress_file(path: str, compression: str = 'gzip', chunk_size: int = 1024 * 1024) -> str:
+    """把已写完的文件压缩为path+后缀，完成后删除原文件并保留修改时间，返回新文件名"""
+    _check_compression(compression)
+    target = path + COMPRESSED_SUFFIXES[compression]
+    tmp = target + '.tmp'
+    with open(path, 'rb') as src:
+        out = _CompressedFile(tmp, compression)
+        try:
+            shutil.copyfileobj(src, out, chunk_size)
+        finally:
+            out.close()
+    stat = os.stat(path)
+    os.utime(tmp, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+class PortLog:
+    """单个串口的自动保存文件，负责按大小轮换（只在写入线程中使用）"""
+
+    def __init__(self, log_dir: str, port_name: str, log_format: str = 'text',
+                 max_file_size: int = 500 * 1024 * 1024, compression: str = 'none',
+                 rotate_interval: float = None):
+        _check_compression(compression)
+        self.log_dir = log_dir
+        self.port_name = port_name
+        self.log_format = log_format  # 'text': 原始数据.log；'capture': .cap/.idx捕获文件
+        self.max_file_size = max_file_size  # 按写入的原始字节数轮换
+        # 文本日志边写边压缩；捕获文件需要mmap随机访问，保持不压缩，由LogRetention在关闭后压缩
+        self.compression = compression if log_format == 'text' else 'none'
+        self.rotate_interval = rotate_interval  # 按时间轮换（秒），None表示不按时间轮换
+        self.file = None
+        self.filename = None
+        self.opened_at = 0.0
+        self.bytes_written = 0
+
+    def open_file(self):
+        """关闭当前文件并创建新文件（第一个文件也由本方法创建）"""
+        self.close()
+
+        # 清理端口名称中的特殊字符
+        clean_port_name = self.port_name.replace('/', '_').replace('\\', '_').replace(':', '')
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # 确保日志目录存在
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        # 同一秒内轮换时避免覆盖/续写已有文件（包括已被压缩的同名文件）
+        suffix = CAPTURE_SUFFIX if self.log_format == 'capture' else '.log'
+        base = filename = os.path.join(self.log_dir, f"{clean_port_name}_{timestamp}")
+        n = 1
+        while any(os.path.exists(filename + suffix + ext) for ext in ('', '.gz', '.zst')):
+            filename = f"{base}_{n}"
+            n += 1
+        if self.compression != 'none':
+            suffix += COMPRESSED_SUFFIXES[self.compression]
+
+        # 先记录文件名再创建文件，LogRetention据此跳过正在写入的文件
+        self.filename = filename + suffix
+        if self.log_format == 'capture':
+            self.file = CaptureWriter(filename)
+        elif self.compression != 'none':
+            self.file = _CompressedFile(self.filename, self.compression)
+        else:
+            self.file = open(self.filename, 'ab', buffering=64 * 1024)  # 二进制写入，与串口数据逐字节一致
+        self.opened_at = time.monotonic()
+        self.bytes_written = 0
+        print(f"创建新的日志文件: {self.filename}")
+
+    def active_files(self) -> list:
+        """正在写入的文件（捕获文件包括.idx）"""
+        if self.filename is None:
+            return []
+        if self.log_format == 'capture':
+            return [self.filename, self.filename[:-len(CAPTURE_SUFFIX)] + INDEX_SUFFIX]
+        return [self.filename]
+
+    def write(self, data: bytes, chunks=None) -> bool:
+        """写入一个批次，字节数直接取len(data)，无需重新编码；发生轮换时返回True"""
+        if isinstance(self.file, CaptureWriter):
+            self.file.write_batch(data, chunks or [(time.monotonic(), 0)])
+        else:
+            self.file.write(data)
+        self.bytes_written += len(data)
+        if (self.bytes_written >= self.max_file_size or
+                self.rotate_interval and time.monotonic() - self.opened_at >= self.rotate_interval):
+            self.open_file()
+            return True
+        return False
+
+    def flush(self, fsync=False):
+        if fsync:
+            if isinstance(self.file, (CaptureWriter, _CompressedFile)):
+                self.file.fsync()
+            else:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        else:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+
+
+class LogRetention(threading.Thread):
+    """日志目录的保留策略，在独立线程中执行，压缩大文件时不会拖慢写入线程
+
+    每当有日志段关闭（轮换或停止保存）时，以及每check_interval秒检查一次：
+      compress       把已关闭、未压缩的文本日志段压缩为.gz/.zst（'none'表示不压缩）；
+                     捕获文件(.cap/.idx)不压缩，CaptureReader和回放需要用mmap直接读取
+      max_age        删除最后修改时间早于max_age秒的日志段
+      max_total_size 目录总大小超过该值时从最旧的日志段开始删除
+    正在写入的文件由active_files()提供，不会被压缩或删除。捕获文件的.cap和.idx作为一个日志段一起处理。
+    """
+
+    def __init__(self, log_dir: str, max_total_size: int = None, max_age: float = None,
+                 compress: str = 'none', check_interval: float = 60.0, active_files=None):
+        super().__init__(name="LogRetention", daemon=True)
+        _check_compression(compress)
+        self.log_dir = log_dir
+        self.max_total_size = max_total_size
+        self.max_age = max_age
+        self.compress = compress
+        self.check_interval = check_interval
+        self.active_files = active_files  # 返回正在写入的文件列表的函数
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self.compressed_files = 0
+        self.deleted_files = 0
+
+    def request(self):
+        """请求尽快检查一次（在任意线程中调用）"""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 5.0):
+        if self.is_alive():
+            self._stopping = True
+            self._wakeup.set()
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.check_interval)
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                self.apply()
+            except OSError as e:
+                print(f"日志保留策略执行失败: {str(e)}")
+
+    def _segments(self) -> dict:
+        """按日志段分组：{段名: [文件路径, ...]}"""
+        segments = {}
+        try:
+            names = os.listdir(self.log_dir)
+        except FileNotFoundError:
+            return segments
+        for name in names:
+            match = _SEGMENT_RE.match(name)
+            if match:
+                segments.setdefault(match.group('stem'), []).append(os.path.join(self.log_dir, name))
+        return segments
+
+    def apply(self):
+        """执行一次压缩和清理"""
+        # 先列目录再取正在写入的文件，新文件在创建前就已登记，不会被误处理
+        segments = self._segments()
+        active = {os.path.abspath(f) for f in (self.active_files() if self.active_files else [])}
+        closed = {stem: paths for stem, paths in segments.items()
+                  if not any(os.path.abspath(p) in active for p in paths)}
+
+        if self.compress != 'none':
+            for stem, paths in closed.items():
+                for i, path in enumerate(paths):
+                    match = _SEGMENT_RE.match(os.path.basename(path))
+                    if match.group('suffix') == '.log' and not match.group('compressed'):
+                        paths[i] = compress_file(path, self.compress)
+                        self.compressed_files += 1
+
+        if self.max_age is None and self.max_total_size is None:
+            return
+        stats = {stem: [os.stat(p) for p in paths] for stem, paths in segments.items()}
+        total = sum(st.st_size for sts in stats.values() for st in sts)
+        now = time.time()
+        # 从最旧的日志段开始删除
+        for stem in sorted(closed, key=lambda k: max(st.st_mtime for st in stats[k])):
+            expired = self.max_age is not None and now - max(st.st_mtime for st in stats[stem]) > self.max_age
+            oversize = self.max_total_size is not None and total > self.max_total_size
+            if not (expired or oversize):
+                continue
+            for path in closed[stem]:
+                os.remove(path)
+                self.deleted_files += 1
+            total -= sum(st.st_size for st in stats[stem])
+
+
+class LogWriter(threading.Thread):
+    """后台日志写入线程
+
+    所有串口的自动保存都经由一个队列交给本线程，GUI线程只做一次put_nowait，
+    磁盘或网络共享卡顿时不会阻塞界面；积压的请求达到max_queue条时丢弃写请求并计数。
+    打开/关闭文件的控制请求不受该上限限制、总是立即入队，与写请求在同一队列中保持先后顺序。
+    本线程每次取出队列中积压的全部写请求，合并写入后再flush，fsync策略：
+      'none'     只flush到操作系统
+      'interval' 每fsync_interval秒fsync一次
+      'always'   每批写入后都fsync
+    使用threading而不是QThread，以便无界面模式复用。
+    retention为LogRetention时随本线程启停，每有日志段关闭就请求它检查一次。
+    """
+
+    def __init__(self, max_queue: int = 4096, fsync_policy: str = 'interval',
+                 fsync_interval: float = 5.0, on_error=None, retention: LogRetention = None):
+        super().__init__(name="LogWriter", daemon=True)
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {fsync_policy}")
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.on_error = on_error  # on_error(key, message)，在写入线程中调用
+        self.max_queue = max_queue
+        self._queue = queue.Queue()  # 不设上限，写请求的上限在write()中检查
+        self._stopping = False
+        self._logs = {}  # key -> PortLog，只在写入线程中修改
+        self._logs_lock = threading.Lock()  # 保护_logs，供active_files()在其他线程中读取
+        self.retention = retention
+        if retention is not None and retention.active_files is None:
+            retention.active_files = self.active_files
+        self._last_fsync = time.monotonic()
+        self.dropped_writes = 0
+        self.bytes_written = 0
+
+    def start(self):
+        if self.retention is not None:
+            self.retention.start()
+        super().start()
+
+    def open(self, key, log_dir: str, port_name: str, log_format: str = 'text',
+             max_file_size: int = 500 * 1024 * 1024, compression: str = 'none',
+             rotate_interval: float = None):
+        """为key（如串口序号）创建新的日志文件，已有文件会先关闭；不等待，返回请求是否已提交
+
+        写入线程未运行（未启动或已停止）时返回False；创建文件失败由写入线程通过on_error报告。
+        compression为'gzip'/'zstd'时文本日志在写入线程中边写边压缩；rotate_interval为按时间轮换的秒数。
+        """
+        _check_compression(compression)
+        return self._control(('open', key, (log_dir, port_name, log_format, max_file_size,
+                                            compression, rotate_interval)))
+
+    def write(self, key, data: bytes, chunks=None) -> bool:
+        """非阻塞地提交一个写请求，积压已达上限时丢弃并返回False"""
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped_writes += 1
+            return False
+        self._queue.put_nowait(('write', key, (data, chunks)))
+        return True
+
+    def close_log(self, key) -> bool:
+        """关闭key的日志文件，之前提交的数据会先写完；不等待"""
+        return self._control(('close', key, ()))
+
+    @property
+    def running(self) -> bool:
+        """是否在接受打开/关闭请求（已启动且未停止）"""
+        return self.is_alive() and not self._stopping
+
+    def stop(self, timeout: float = 5.0):
+        """写完队列中剩余的数据、关闭所有文件后结束线程"""
+        if self.is_alive():
+            self._stopping = True
+            self._queue.put(_STOP)
+            self.join(timeout)
+        if self.retention is not None:
+            self.retention.stop(timeout)
+
+    def active_files(self) -> list:
+        """所有正在写入的文件（可在任意线程中调用）"""
+        with self._logs_lock:
+            return [f for log in self._logs.values() for f in log.active_files()]
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _control(self, item) -> bool:
+        if not self.running:
+            return False
+        self._queue.put_nowait(item)
+        return True
+
+    def _pop_log(self, key):
+        with self._logs_lock:
+            return self._logs.pop(key, None)
+
+    def _segment_closed(self):
+        if self.retention is not None:
+            self.retention.request()
+
+    def _fail(self, key, error):
+        """写入出错时关闭并丢弃该key的日志，通知调用方"""
+        log = self._pop_log(key)
+        if log is not None:
+            try:
+                log.close()
+            except (OSError, ValueError):
+                pass
+        self._report(key, f"日志写入失败: {str(error)}")
+
+    def _report(self, key, message):
+        if self.on_error is not None:
+            self.on_error(key, message)
+        else:
+            print(message)
+
+    def _fsync_due(self, now) -> bool:
+        if self.fsync_policy == 'always':
+            return True
+        return self.fsync_policy == 'interval' and now - self._last_fsync >= self.fsync_interval
+
+    def _handle(self, action, key, args, touched):
+        if action == 'write':
+            log = self._logs.get(key)
+            if log is not None:
+                self.bytes_written += len(args[0])
+                touched.add(key)
+                if log.write(*args):
+                    self._segment_closed()
+        elif action == 'open':
+            old = self._pop_log(key)
+            if old is not None:
+                old.close()
+                self._segment_closed()
+            log = PortLog(*args)
+            with self._logs_lock:
+                self._logs[key] = log
+            log.open_file()  # 先登记再创建文件，LogRetention不会处理正在创建的文件
+        elif action == 'close':
+            log = self._pop_log(key)
+            if log is not None:
+                log.close()
+                self._segment_closed()
+
+    def run(self):
+        stopping = False
+        dirty = set()  # 已写入但尚未fsync的key
+        while not stopping:
+            timeout = self.fsync_interval if self.fsync_policy == 'interval' and dirty else None
+            try:
+                items = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                items = []
+            # 一次取走积压的全部请求，合并成一批写入
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            touched = set()
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                    continue
+                action, key, args = item
+                try:
+                    self._handle(action, key, args, touched)
+                except (OSError, ValueError) as e:
+                    self._fail(key, e)
+
+            dirty |= touched
+            now = time.monotonic()
+            fsync = self._fsync_due(now)
+            for key in (dirty if fsync else touched):
+                log = self._logs.get(key)
+                try:
+                    if log is not None:
+                        log.flush(fsync)
+                except (OSError, ValueError) as e:
+                    self._fail(key, e)
+            if fsync:
+                dirty.clear()
+                self._last_fsync = now
+
+        for key, log in list(self._logs.items()):
+            try:
+                log.flush(self.fsync_policy != 'none')
+                log.close()
+            except (OSError, ValueError) as e:
+                self._report(key, f"日志写入失败: {str(e)}")
+        with self._logs_lock:
+            self._logs.clear()
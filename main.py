@@ -1,10 +1,21 @@
+import os
+import time
+from collections import deque
+
 import serial
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QComboBox, QPushButton, QTextEdit, QGroupBox, QScrollArea, QFileDialog,
+                             QComboBox, QPushButton, QGroupBox, QScrollArea, QFileDialog,
                              QMessageBox, QFrame, QGridLayout, QSizePolicy, QCheckBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal,QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal,QTimer, QObject
 from PyQt5.QtGui import QColor
-from serial_receiver import SerialReceiver, SerialConfig
+from serial_receiver import ReplayReceiver, SerialReceiver, SerialConfig
+from serial_reactor import SerialReactor
+from ring_buffer import LineRingBuffer
+from log_view import LogView
+from log_writer import LogRetention, LogWriter, compression_available
+from serial_core import FileSink, StatsExporter, format_stats
+from render_scheduler import RenderScheduler
+from port_monitor import PortMonitor
 import sys
 
 
@@ -15,34 +26,55 @@ class SerialPortWidget(QGroupBox):
         super().__init__(f"串口 {port_index + 1}", parent)
         self.port_index = port_index
         self.serial_receiver = None
+        self.reactor = None  # 共享I/O线程，为None时每个串口使用独立线程
         self.is_receiving = True  # 默认接收数据
-        self.max_display_length = 200000  # 显示区域最大字符数、
-        self.max_buffer_length = 500000
-        self.data_buffer = ""
+        self.max_display_lines = 50000  # 解析结果缓冲区最多保留的行数
+        self.max_buffer_lines = 100000  # 原始数据缓冲区最多保留的行数
+        # 原始数据按行保存为bytes，显示时才解码；内存占用固定
+        self.data_buffer = LineRingBuffer(self.max_buffer_lines, newline=b'\n')
         self.is_display_paused = False  # 新增：初始化显示暂停状态
         # 文件保存相关属性
         self.log_dir = "serial_logs"  # 日志目录
-        self.current_log_file = None  # 当前日志文件
+        self.log_writer = None  # 后台日志写入线程，由主窗口设置，所有串口共用
+        self.owns_log_writer = False  # 未设置时自行创建，关闭时需要停止
+        self.file_sink = None  # 自动保存时挂在SerialReader上的FileSink，读取线程直接把每个批次交给日志写入线程
+        self._reported_drops = 0  # 已提示过的未保存批次数
+        self.log_format = 'text'  # 'text': 原始数据.log；'capture': 带时间索引的.cap/.idx捕获文件
         self.max_file_size = 500 * 1024 * 1024  # 500MB
+        self.log_compression = 'none'  # 文本日志流式压缩：'none'/'gzip'/'zstd'
+        self.log_rotate_interval = None  # 按时间轮换（秒），None表示只按大小轮换
         self.auto_save_enabled = False  # 默认不启用自动保存
-        self.bytes_written = 0  # 已写入字节数
-        self.parsed_data_buffer = ""  # 新增：用于存储解析后的数据
-
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_display)
-        self.update_timer.start(100)  # 100ms更新一次UI
+        self.parsed_data_buffer = LineRingBuffer(self.max_display_lines)  # 解析后的显示文本（按行）
+        self.max_pending_records = 5000  # 暂停显示或不在屏幕上时最多保留的待显示记录数
+        self.pending_records = deque(maxlen=self.max_pending_records)  # 接收线程已解析、尚未显示的记录
+        self.max_pending_batches = 8  # 接收线程最多领先GUI的批次数，超过后合并/丢弃
+
+        # 显示节流：不在屏幕上的控件不刷新；刷新间隔随刷新耗时在最小/最大值之间调整，
+        # 每次最多格式化max_records_per_refresh条记录，跟不上时只显示最新的并提示跳过的条数
+        self.min_update_interval = 100  # ms
+        self.max_update_interval = 1000  # ms
+        self.max_records_per_refresh = 500
+        self.skipped_records = 0  # 尚未在显示中提示的跳过条数
+        self.total_skipped_records = 0
+        self._display_cost = 0.0  # 刷新耗时的滑动平均（秒）
+
+        # 刷新由所有控件共用的RenderScheduler按帧驱动（见render()），数据回调中不直接刷新界面
+        self.update_interval = self.min_update_interval  # ms，随刷新耗时调整
+        self._next_render = 0.0  # 下次刷新的时间（time.monotonic()）
         self.pending_update = False  # 是否有待更新的数据
-        self.file_write_buffer = ""
-        self.file_write_threshold = 8192  # 8KB写入阈值
+        self.details_pending = False  # 详情窗口是否有待追加的数据
         self.auto_scroll_enabled = True  # 默认启用自动滚动
         self.last_scroll_position = 0
 
-        self.full_refresh_timer = QTimer()
-        self.full_refresh_timer.timeout.connect(self.full_refresh_display)
-        self.full_refresh_timer.start(120000)  # 2分钟全量刷新一次
+        self.full_refresh_interval = 120  # 秒，2分钟全量刷新一次
+        self._next_full_refresh = time.monotonic() + self.full_refresh_interval
 
         # 添加标记是否需要全量刷新
         self.need_full_refresh = False
+        # 已排队显示、尚未显示的批次中最早一次读取的时间，显示后计入延迟统计
+        self._read_times = deque(maxlen=1024)
+        # 最近一个批次的读取时间；同一批次的records_received紧随timed_data_received到达，有记录排队时才记入_read_times
+        self._batch_read_time = None
 
         # 创建日志目录
         import os
@@ -53,6 +85,9 @@ class SerialPortWidget(QGroupBox):
         self.init_ui()
         self.receive_text.verticalScrollBar().valueChanged.connect(self._handle_scroll_event)
 
+        self.render_scheduler = RenderScheduler.instance()
+        self.render_scheduler.add(self)
+
     def init_ui(self):
         layout = QVBoxLayout()
         layout.setContentsMargins(8, 8, 8, 8)
@@ -97,11 +132,10 @@ class SerialPortWidget(QGroupBox):
         layout.addLayout(config_layout)
 
         # 接收数据显示区域
-        self.receive_text = QTextEdit()
+        # 虚拟化视图：直接显示parsed_data_buffer，只绘制可见行
+        self.receive_text = LogView(self.parsed_data_buffer)
         self.receive_text.setMinimumHeight(300)  # 增加最小高度
         self.receive_text.setMinimumWidth(400)  # 增加最小宽度
-        self.receive_text.setReadOnly(True)
-        self.receive_text.setLineWrapMode(QTextEdit.NoWrap)
         layout.addWidget(self.receive_text)
 
         # 控制面板组
@@ -114,6 +148,25 @@ class SerialPortWidget(QGroupBox):
         self.auto_save_check.stateChanged.connect(self.toggle_auto_save)
         control_layout.addWidget(self.auto_save_check)
 
+        # 自动保存格式
+        self.log_format_combo = QComboBox()
+        self.log_format_combo.addItem("文本日志", 'text')
+        self.log_format_combo.addItem("捕获文件", 'capture')
+        self.log_format_combo.setToolTip("捕获文件(.cap/.idx)保存原始字节和每个数据块的接收时间，可按时间定位和回放")
+        self.log_format_combo.currentIndexChanged.connect(self.change_log_format)
+        control_layout.addWidget(self.log_format_combo)
+
+        # 文本日志压缩方式
+        self.log_compression_combo = QComboBox()
+        self.log_compression_combo.addItem("不压缩", 'none')
+        self.log_compression_combo.addItem("gzip", 'gzip')
+        self.log_compression_combo.addItem("zstd", 'zstd')
+        if not compression_available('zstd'):
+            self.log_compression_combo.model().item(2).setEnabled(False)  # 未安装zstandard
+        self.log_compression_combo.setToolTip("文本日志在后台边写边压缩；捕获文件需要随机访问，不压缩")
+        self.log_compression_combo.currentIndexChanged.connect(self.change_log_compression)
+        control_layout.addWidget(self.log_compression_combo)
+
         # 清空按钮
         self.clear_btn = QPushButton("清空")
         self.clear_btn.setFixedWidth(60)
@@ -126,11 +179,6 @@ class SerialPortWidget(QGroupBox):
         self.pause_btn.clicked.connect(self.toggle_display_pause)
         control_layout.addWidget(self.pause_btn)
 
-        # 清理内存按钮
-        self.clean_btn = QPushButton("清理内存")
-        self.clean_btn.clicked.connect(self.manual_cleanup)
-        control_layout.addWidget(self.clean_btn)
-
         control_layout.addStretch()
         layout.addWidget(control_group)
         self.setLayout(layout)
@@ -157,159 +205,176 @@ class SerialPortWidget(QGroupBox):
         if self.auto_save_enabled and self.serial_receiver and self.serial_receiver.is_connected:
             self.create_new_log_file(self.serial_receiver.config.port)
         # 如果状态变为禁用，关闭当前日志文件
-        elif not self.auto_save_enabled and self.current_log_file and not self.current_log_file.closed:
-            self.current_log_file.close()
-            self.current_log_file = None
-
-    def create_new_log_file(self):
-        """创建新的日志文件"""
-        from datetime import datetime
-        if self.current_log_file and not self.current_log_file.closed:
-            self.current_log_file.close()
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.log_dir}/serial_{self.port_index + 1}_{timestamp}.log"
-        self.current_log_file = open(filename, 'a', encoding='utf-8')
-        self.bytes_written = 0
-        print(f"创建新的日志文件: {filename}")  # 调试信息
+        elif not self.auto_save_enabled:
+            self.close_log_file()
+
+    def change_log_format(self, index):
+        """切换自动保存格式，正在保存时立即换用新格式的文件"""
+        self.log_format = self.log_format_combo.itemData(index)
+        if self.auto_save_enabled and self.serial_receiver and self.serial_receiver.is_connected:
+            self.create_new_log_file(self.serial_receiver.config.port)
+
+    def change_log_compression(self, index):
+        """切换日志压缩方式，正在保存时立即换用新文件"""
+        self.log_compression = self.log_compression_combo.itemData(index)
+        if self.auto_save_enabled and self.serial_receiver and self.serial_receiver.is_connected:
+            self.create_new_log_file(self.serial_receiver.config.port)
 
     def full_refresh_display(self):
-        """触发全量刷新"""
+        """触发全量刷新（在下一帧进行）"""
         self.need_full_refresh = True
+        self._next_render = 0.0
+
+    def render(self, now: float):
+        """由RenderScheduler每帧调用：到了本控件的刷新时间才更新显示和详情窗口，否则立即返回"""
+        if now < self._next_render:
+            return
+        self._next_render = now + self.update_interval / 1000
+        if now >= self._next_full_refresh:
+            self._next_full_refresh = now + self.full_refresh_interval
+            self.need_full_refresh = True
         self.update_display()
+        if self.details_pending:
+            self.update_details()
+        if self.file_sink is not None and self.file_sink.dropped_writes > self._reported_drops:
+            self._reported_drops = self.file_sink.dropped_writes
+            self.show_error("日志写入过慢，部分数据未保存")
+
+    def update_details(self):
+        """把新数据追加到详情窗口（窗口可见时）"""
+        self.details_pending = False
+        if hasattr(self, '_data_window') and self._data_window.isVisible():
+            try:
+                self._data_window.append_data(self.is_display_paused)
+                if self.serial_receiver is not None:  # 断开或回放结束后只保留最后显示的统计
+                    self._data_window.set_link_stats(self.serial_receiver.framer.link_stats)
+            except Exception as e:
+                print(f"详情窗口更新错误: {str(e)}")
+
+    def is_displayed(self) -> bool:
+        """控件是否有一部分在屏幕上：隐藏、所在窗口最小化或在滚动区域中被滚出视口时为False"""
+        return (self.isVisible() and not self.window().isMinimized()
+                and not self.receive_text.visibleRegion().isEmpty())
 
     def update_display(self):
-        """更新显示内容，智能控制滚动行为"""
-        if self.is_display_paused:
+        """更新显示内容，智能控制滚动行为；不在屏幕上时不做任何格式化和刷新"""
+        if self.is_display_paused or not self.is_displayed():
+            self._read_times.clear()  # 没有显示出来，不计入读取到显示的延迟
             return
 
         try:
+            start = time.perf_counter()
+            self._consume_pending_records()
+
             if self.need_full_refresh:
-                # 全量刷新模式
+                # 全量刷新模式：按缓冲区重建模型
                 self.need_full_refresh = False
-                self.receive_text.setUpdatesEnabled(False)
-                try:
-                    # 保留最新的max_display_length个字符
-                    display_text = self.parsed_data_buffer[-self.max_display_length:]
-                    self.receive_text.setPlainText(display_text)
-
-                    # 自动滚动处理
-                    scrollbar = self.receive_text.verticalScrollBar()
-                    if self.auto_scroll_enabled or scrollbar.value() == scrollbar.maximum():
-                        scrollbar.setValue(scrollbar.maximum())
-                finally:
-                    self.receive_text.setUpdatesEnabled(True)
+                self.receive_text.model().reset()
+                if self.auto_scroll_enabled:
+                    self.receive_text.scrollToBottom()
+                self._record_display(start)
                 return
 
-            # 原来的增量刷新逻辑
+            # 增量刷新：模型只追加新行、删除已淘汰的行，开销只与新数据量有关
             if not self.pending_update:
                 return
 
             # 重置标志
             self.pending_update = False
 
-            # 获取当前显示的文本
-            current_text = self.receive_text.toPlainText()
-            new_data = self.parsed_data_buffer[len(current_text):]
-
-            if not new_data:
-                return
-
-            # 使用高性能方式更新显示
-            self.receive_text.setUpdatesEnabled(False)
-            cursor = self.receive_text.textCursor()
-
-            try:
-                # 移动到文档末尾
-                cursor.movePosition(cursor.End)
-
-                # 计算需要保留的数据量
-                available_space = self.max_display_length - len(new_data)
-
-                # 如果空间不足，删除最老的数据
-                if available_space < 0:
-                    # 完全清空，只显示新数据
-                    cursor.select(cursor.Document)
-                    cursor.removeSelectedText()
-                elif len(current_text) > available_space:
-                    # 删除部分老数据，保留足够的空间给新数据
-                    remove_count = len(current_text) - available_space
-                    cursor.setPosition(0)
-                    cursor.movePosition(cursor.Right, cursor.KeepAnchor, remove_count)
-                    cursor.removeSelectedText()
-                    cursor.movePosition(cursor.End)
-
-                # 插入新数据
-                cursor.insertText(new_data)
-
-                # 自动滚动处理
-                scrollbar = self.receive_text.verticalScrollBar()
-                if self.auto_scroll_enabled or scrollbar.value() == scrollbar.maximum():
-                    scrollbar.setValue(scrollbar.maximum())
-            finally:
-                self.receive_text.setUpdatesEnabled(True)
-                # 确保UI更新
-                QApplication.processEvents()
+            # 视图只绘制可见行，自动滚动处理
+            self.receive_text.refresh(self.auto_scroll_enabled or self.receive_text.is_at_bottom())
+            self._record_display(start)
 
         except Exception as e:
             print(f"更新显示错误: {str(e)}")
             # 出错时重置缓冲区
-            self.parsed_data_buffer = ""
-            self.receive_text.clear()
+            self.parsed_data_buffer.clear()
+            self.receive_text.refresh()
 
-    def on_data_received(self, data: str):
-        """数据接收回调，只处理GNRMC和GNGGA"""
+    def _record_display(self, start: float):
+        """记录本次显示更新的耗时，以及本次显示的各批次从读到数据到显示出来的延迟"""
+        if self.serial_receiver is None:
+            self._read_times.clear()
+            return
+        cost = time.perf_counter() - start
+        stats = self.serial_receiver.stats
+        stats.record_display(cost)
+        now = time.monotonic()
+        for read_time in self._read_times:
+            stats.record_latency(now - read_time)
+        self._read_times.clear()
+        self._adapt_update_interval(cost)
+
+    def _adapt_update_interval(self, cost: float):
+        """刷新耗时越长，刷新间隔越长（约为耗时的20倍，即每个控件最多占用5%的GUI线程时间）"""
+        self._display_cost = self._display_cost * 0.7 + cost * 0.3
+        interval = int(min(self.max_update_interval, max(self.min_update_interval, self._display_cost * 20000)))
+        # 变化超过20%才调整，避免间隔来回抖动
+        if abs(interval - self.update_interval) > self.update_interval * 0.2:
+            self.update_interval = interval
+
+    def _consume_pending_records(self):
+        """把待显示的解析记录格式化后追加到显示缓冲区（超出容量的旧行自动淘汰）
+
+        一次最多格式化max_records_per_refresh条最新的记录，更早的只计数，在显示中用一行提示代替。
+        """
+        if not self.pending_records:
+            return
+        records = self.pending_records
+        if len(records) > self.max_records_per_refresh:
+            self.skipped_records += len(records) - self.max_records_per_refresh
+            records = list(records)[-self.max_records_per_refresh:]
+        text = ''.join(map(SerialReceiver.format_record, records))
+        if self.skipped_records:
+            text = f"... 显示跟不上，已跳过 {self.skipped_records} 条记录 ...\n\n" + text
+            self.total_skipped_records += self.skipped_records
+            self.skipped_records = 0
+        self.parsed_data_buffer.write(text)
+        self.pending_records.clear()
+
+    def on_records_received(self, records: list):
+        """解析结果回调：记录已在接收线程中解析好，这里只排队等待显示"""
+        if not self.is_receiving:
+            return
+
+        # 待显示队列满时最旧的记录被挤出，计为跳过
+        overflow = len(self.pending_records) + len(records) - self.max_pending_records
+        if overflow > 0:
+            self.skipped_records += overflow
+        self.pending_records.extend(records)
+        if self._batch_read_time is not None:
+            self._read_times.append(self._batch_read_time)
+            self._batch_read_time = None
+
+        # 标记需要更新显示，由RenderScheduler在下一次轮到本控件时刷新
+        self.pending_update = True
+
+    def on_data_received(self, data: bytes, chunks: list):
+        """原始数据回调：更新原始数据缓冲区和详情窗口。chunks为批次内每次读取的(接收时间, 偏移)
+
+        自动保存不经过这里：FileSink在读取线程中收到每个批次，不受显示背压和界面事件循环影响。
+        """
+        if self.serial_receiver:
+            self.serial_receiver.batch_consumed()
         if not self.is_receiving:
             return
+        self._batch_read_time = chunks[0][0] if chunks else None
 
         try:
-            # 1. 写入文件（仅在连接时且自动保存启用时）
-            if (self.auto_save_enabled and self.current_log_file
-                    and self.serial_receiver and self.serial_receiver.is_connected):
-                try:
-                    self.file_write_buffer += data
-                    if len(self.file_write_buffer) >= self.file_write_threshold:
-                        self.current_log_file.write(self.file_write_buffer)
-                        self.current_log_file.flush()
-                        self.bytes_written += len(self.file_write_buffer.encode('utf-8'))
-                        self.file_write_buffer = ""
-
-                    if self.bytes_written >= self.max_file_size:
-                        port_name = self.serial_receiver.config.port
-                        self.create_new_log_file(port_name)
-                except IOError as e:
-                    self.show_error(f"日志写入失败: {str(e)}")
-
-            # 2. 追加新数据到显示缓冲区
-            self.data_buffer += data
-            if len(self.data_buffer) > self.max_buffer_length:
-                # 保留最新数据，丢弃旧数据
-                self.data_buffer = self.data_buffer[-self.max_buffer_length:]
-
-            # 3. 解析数据（只处理GNRMC和GNGGA）
-            parsed_data = self.serial_receiver.parse_nmea_data(data)
-            if parsed_data:
-                self.parsed_data_buffer += parsed_data
-
-                if len(self.parsed_data_buffer) > self.max_display_length:
-                    # 保留最新数据，但确保不会丢失当前解析的数据
-                    keep_length = min(len(parsed_data), self.max_display_length)
-                    self.parsed_data_buffer = self.parsed_data_buffer[-keep_length:]
-
-                # 4. 标记需要更新显示
-                self.pending_update = True
-                # 立即请求UI更新
-                QApplication.processEvents()
-
-            # 5. 更新详情窗口（如果存在）
-            if hasattr(self, '_data_window') and self._data_window.isVisible():
-                self._data_window.append_data(data, self.is_display_paused)
+            # 1. 追加新数据到显示缓冲区
+            self.data_buffer.write(data)
+
+            # 2. 详情窗口随显示一起按帧更新
+            self.details_pending = True
 
         except Exception as e:
             print(f"数据接收处理错误: {str(e)}")
 
     def closeEvent(self, event):
         """清理资源"""
+        self.render_scheduler.remove(self)
+
         # 关闭详情窗口
         if hasattr(self, '_data_window'):
             self._data_window.close()
@@ -319,8 +384,9 @@ class SerialPortWidget(QGroupBox):
         self.disconnect_serial()
 
         # 关闭日志文件
-        if self.current_log_file and not self.current_log_file.closed:
-            self.current_log_file.close()
+        self.close_log_file()
+        if self.owns_log_writer:
+            self.log_writer.stop()
 
         super().closeEvent(event)
 
@@ -341,27 +407,10 @@ class SerialPortWidget(QGroupBox):
         else:
             self.port_combo.setCurrentIndex(0)  # 选择空选项
 
-    def refresh_all_ports(self):
-        """刷新所有串口下拉列表"""
-        try:
-            # 直接获取最新端口列表
-            ports = SerialReceiver.get_available_ports()
-
-            # 更新所有控件
-            for widget in self.port_widgets:
-                widget.refresh_ports(ports)
-                widget.clear_error()  # 刷新时清除错误信息
-
-            # 检查已连接端口是否仍然可用
-            for widget in self.port_widgets:
-                if (widget.serial_receiver and widget.serial_receiver.is_connected and
-                        widget.serial_receiver.config.port not in ports):
-                    # 端口已断开
-                    widget.disconnect_serial()
-                    widget.show_error("串口已断开")
-
-        except Exception as e:
-            QMessageBox.warning(self, "刷新错误", f"刷新串口列表失败: {str(e)}")
+    def port_removed(self):
+        """所连接的设备已被拔出"""
+        self.disconnect_serial()
+        self.show_error("串口已断开")
 
     def show_error(self, message: str):
         """显示错误信息"""
@@ -376,8 +425,8 @@ class SerialPortWidget(QGroupBox):
             self.pause_btn.setText("继续显示")
         else:
             self.pause_btn.setText("暂停显示")
-            # 恢复显示时更新显示内容（从缓冲区）
-            self.update_display()
+            # 恢复显示时在下一帧更新显示内容（从缓冲区）
+            self._next_render = 0.0
 
 
 
@@ -400,12 +449,12 @@ class SerialPortWidget(QGroupBox):
 
         port_name = self.serial_receiver.config.port
         if not hasattr(self, '_data_window'):
-            self._data_window = PortDataWindow(port_name, self)
-            self._data_window.set_data(self.data_buffer)  # 传递当前数据
+            self._data_window = PortDataWindow(port_name, self.data_buffer, self)
 
         # 更新窗口标题和数据
         self._data_window.setWindowTitle(f"串口数据 - {port_name}")
-        self._data_window.set_data(self.data_buffer)
+        self._data_window.set_data()
+        self._data_window.set_link_stats(self.serial_receiver.framer.link_stats)
         self._data_window.show()
         self._data_window.raise_()  # 将窗口置于最前
 
@@ -433,14 +482,7 @@ class SerialPortWidget(QGroupBox):
                 self.create_new_log_file(port)  # 传入端口名称
 
             # 创建新的接收器
-            self.serial_receiver = SerialReceiver(config, self.port_index)
-            self.serial_receiver.data_received.connect(self.on_data_received)
-            self.serial_receiver.error_occurred.connect(self.on_serial_error)
-            self.serial_receiver.start()
-
-            self.connect_btn.setText("断开")
-            self.port_combo.setEnabled(False)
-            self.baudrate_combo.setEnabled(False)
+            self.start_receiver(SerialReceiver(config, self.port_index, reactor=self.reactor))
 
         except serial.SerialException as e:
             error_msg = f"串口错误: {str(e)}"
@@ -454,51 +496,73 @@ class SerialPortWidget(QGroupBox):
         except Exception as e:
             self.show_error(f"未知错误: {str(e)}")
 
+    def start_receiver(self, receiver):
+        """连接接收器（串口或回放）的信号并开始接收"""
+        self.serial_receiver = receiver
+        self.serial_receiver.max_pending_batches = self.max_pending_batches
+        if self.file_sink is not None:
+            # 由读取线程在打开/关闭时打开/关闭日志，关闭前交出的最后一个批次也会写入
+            receiver.reader.sinks.append(self.file_sink)
+        self.serial_receiver.timed_data_received.connect(self.on_data_received)
+        self.serial_receiver.records_received.connect(self.on_records_received)
+        self.serial_receiver.error_occurred.connect(self.on_serial_error)
+        self.serial_receiver.start()
+
+        self.connect_btn.setText("断开")
+        self.port_combo.setEnabled(False)
+        self.baudrate_combo.setEnabled(False)
+
+    def connect_replay(self, path: str, speed: float):
+        """用日志文件代替串口回放，显示、解析、自动保存与真实串口相同"""
+        if self.serial_receiver:
+            self.disconnect_serial()
+        self.clear_error()
+        config = SerialConfig(port=os.path.basename(path), baudrate=int(self.baudrate_combo.currentText()))
+        if self.auto_save_enabled:
+            self.create_new_log_file(config.port)
+        receiver = ReplayReceiver(path, self.port_index, speed, config=config)
+        receiver.finished.connect(self.on_replay_finished)  # 绑定方法，在GUI线程中执行
+        self.start_receiver(receiver)
+        self.details_btn.setEnabled(True)
+
+    def on_replay_finished(self):
+        """回放到文件末尾：与断开串口相同，按钮恢复为“连接”"""
+        if self.serial_receiver is not None and self.sender() is self.serial_receiver:
+            self.disconnect_serial()
+
     def create_new_log_file(self, port_name: str):
-        """创建新的日志文件
+        """创建新的日志文件（由日志写入线程打开，已有文件会先关闭）
+
+        日志由FileSink写入：连接前调用时在start_receiver中挂到读取器上，随串口打开；
+        已连接时立即替换读取器上原来的FileSink并打开新文件。
         Args:
             port_name: 串口名称，如 'COM1' 或 '/dev/ttyUSB0'
         """
-        from datetime import datetime
-        import os
-
-        # 关闭现有文件
-        if self.current_log_file and not self.current_log_file.closed:
-            self.current_log_file.close()
-
-        # 清理端口名称中的特殊字符
-        clean_port_name = port_name.replace('/', '_').replace('\\', '_').replace(':', '')
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-        # 确保日志目录存在
-        os.makedirs(self.log_dir, exist_ok=True)
-
-        # 创建新文件
-        filename = f"{self.log_dir}/{clean_port_name}_{timestamp}.log"
-        try:
-            self.current_log_file = open(filename, 'a', encoding='utf-8')
-            self.bytes_written = 0
-            print(f"创建新的日志文件: {filename}")
-        except IOError as e:
-            self.show_error(f"无法创建日志文件: {str(e)}")
-
-    def manual_cleanup(self):
-        """手动清理内存"""
-        # 清理当前控件的缓冲区但保留最后100000字符
-        if len(self.data_buffer) > 100000:
-            self.data_buffer = self.data_buffer[-100000:]
-        if len(self.parsed_data_buffer) > 100000:
-            self.parsed_data_buffer = self.parsed_data_buffer[-100000:]
-
-        # 更新显示
-        self.receive_text.setPlainText(self.parsed_data_buffer[-100000:])
-
-        # 强制垃圾回收
-        import gc
-        gc.collect()
-
-        QMessageBox.information(self, "清理完成", "已释放内存资源")
-
+        if self.log_writer is None:
+            self.log_writer = LogWriter()
+            self.log_writer.start()
+            self.owns_log_writer = True
+        sink = FileSink(self.log_writer, self.port_index, self.log_dir, port_name, self.log_format,
+                        self.max_file_size, self.log_compression, self.log_rotate_interval)
+        old, self.file_sink = self.file_sink, sink
+        self._reported_drops = 0
+        if self.serial_receiver is not None:
+            reader = self.serial_receiver.reader
+            # 整体替换列表，读取线程中正在进行的遍历不受影响
+            reader.sinks = [s for s in reader.sinks if s is not old] + [sink]
+            if reader.is_connected and not sink.open():
+                self.close_log_file()
+                self.show_error("无法创建日志文件: 日志写入线程未运行")
+
+    def close_log_file(self):
+        """关闭当前日志文件，队列中尚未写入的数据会先写完"""
+        if self.file_sink is None:
+            return
+        sink, self.file_sink = self.file_sink, None
+        if self.serial_receiver is not None:
+            reader = self.serial_receiver.reader
+            reader.sinks = [s for s in reader.sinks if s is not sink]
+        sink.close()  # 读取线程已在关闭串口时关闭过的，再次关闭不做任何事
 
     def on_serial_error(self, error_msg: str):
         """处理串口错误信号"""
@@ -510,7 +574,8 @@ class SerialPortWidget(QGroupBox):
         if self.serial_receiver:
             # 先断开信号连接
             try:
-                self.serial_receiver.data_received.disconnect()
+                self.serial_receiver.timed_data_received.disconnect()
+                self.serial_receiver.records_received.disconnect()
                 self.serial_receiver.error_occurred.disconnect()
             except TypeError:
                 pass  # 信号未连接时忽略
@@ -524,14 +589,13 @@ class SerialPortWidget(QGroupBox):
                 self.serial_receiver.wait(2000)  # 最多等待2秒
 
             # 关闭日志文件
-            if self.current_log_file and not self.current_log_file.closed:
-                self.current_log_file.close()
-                self.current_log_file = None
+            self.close_log_file()
 
             # 删除对象
             del self.serial_receiver
             self.serial_receiver = None
 
+        self.details_pending = False  # 已断开的接收器不再触发详情窗口更新
         self.connect_btn.setText("连接")
         self.port_combo.setEnabled(True)
         self.details_btn.setEnabled(False)
@@ -543,9 +607,11 @@ class SerialPortWidget(QGroupBox):
 
     def clear_receive(self):
         """清空接收区"""
-        self.receive_text.clear()
-        self.parsed_data_buffer = ""
-        self.data_buffer = ""
+        self.parsed_data_buffer.clear()
+        self.pending_records.clear()
+        self.skipped_records = 0
+        self.data_buffer.clear()
+        self.receive_text.refresh()
         self.pending_update = False
         self.auto_scroll_enabled = True  # 重置为自动滚动
         self.last_scroll_position = 0
@@ -562,7 +628,7 @@ class SerialPortWidget(QGroupBox):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.receive_text.toPlainText())
+                    f.write(self.receive_text.model().text())
                 QMessageBox.information(self, "成功", f"串口 {self.port_index + 1} 数据保存成功")
             except Exception as e:
                 self.show_error(f"保存失败: {str(e)}")
@@ -571,8 +637,9 @@ class SerialPortWidget(QGroupBox):
 class PortDataWindow(QMainWindow):
     """串口数据详情窗口"""
 
-    def __init__(self, port_name: str, parent=None):
+    def __init__(self, port_name: str, buffer: LineRingBuffer, parent=None):
         super().__init__(parent)
+        self.buffer = buffer  # 与所属串口控件共享的原始数据缓冲区
         self.setWindowTitle(f"串口数据 - {port_name}")
         self.resize(800, 600)
         central_widget = QWidget()
@@ -581,11 +648,25 @@ class PortDataWindow(QMainWindow):
         layout = QVBoxLayout(central_widget)
 
         # 数据展示区域
-        self.data_text = QTextEdit()
-        self.data_text.setReadOnly(True)
-        self.data_text.setLineWrapMode(QTextEdit.NoWrap)
+        # 虚拟化视图：直接显示共享的原始数据缓冲区，只绘制可见行
+        self.data_text = LogView(buffer)
         layout.addWidget(self.data_text)
 
+        # 链路质量：校验通过/校验和错误/截断的语句数
+        self.link_label = QLabel()
+        layout.addWidget(self.link_label)
+
+        # 吞吐量/延迟统计，每秒刷新；可定时导出为JSON Lines或CSV
+        self.stats_label = QLabel()
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.stats_label)
+        self.stats_exporter = None
+        self.export_interval = 5.0  # 导出间隔（秒）
+        self._last_export = 0.0
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
         # 控制按钮（已移除暂停按钮）
         btn_layout = QHBoxLayout()
 
@@ -597,33 +678,74 @@ class PortDataWindow(QMainWindow):
         self.save_btn.clicked.connect(self.save_data)
         btn_layout.addWidget(self.save_btn)
 
-        layout.addLayout(btn_layout)
+        self.export_btn = QPushButton("定时导出统计...")
+        self.export_btn.clicked.connect(self.toggle_stats_export)
+        btn_layout.addWidget(self.export_btn)
 
-    def set_data(self, data: str):
-        """设置初始数据"""
-        self.data_text.setPlainText(data)
-        self.data_text.verticalScrollBar().setValue(
-            self.data_text.verticalScrollBar().maximum()
-        )
+        layout.addLayout(btn_layout)
 
-    def append_data(self, data: str, is_parent_paused=False):
-        """追加新数据"""
+    def set_data(self):
+        """从缓冲区加载全部数据"""
+        self.data_text.reload()
+
+    def set_link_stats(self, stats: dict):
+        total = stats['good'] + stats['bad_checksum'] + stats['truncated']
+        error_rate = (stats['bad_checksum'] + stats['truncated']) / total * 100 if total else 0.0
+        text = (f"语句: 正确 {stats['good']}  校验和错误 {stats['bad_checksum']}  "
+                f"截断 {stats['truncated']}  错误率 {error_rate:.2f}%")
+        if stats['frames'] or stats['bad_frames']:
+            text += f"\n二进制帧: {stats['frames']}  校验失败 {stats['bad_frames']}"
+            counts = stats.get('frame_counts')
+            if counts:
+                text += "  (" + ", ".join(f"{key} {count}" for key, count in sorted(counts.items())) + ")"
+        self.link_label.setText(text)
+
+    def update_stats(self):
+        """刷新统计显示；开启导出时每export_interval秒追加一个快照（窗口隐藏时也继续）"""
+        receiver = self.parent().serial_receiver if self.parent() is not None else None
+        if receiver is None:
+            return
+        snapshot = receiver.stats.snapshot()
+        snapshot['dropped_batches'] = receiver.dropped_batches
+        snapshot['skipped_records'] = self.parent().total_skipped_records + self.parent().skipped_records
+        if self.isVisible():
+            self.stats_label.setText(format_stats(snapshot) + f"  丢弃批次: {snapshot['dropped_batches']}"
+                                     f"  跳过显示: {snapshot['skipped_records']} 条")
+        now = time.monotonic()
+        if self.stats_exporter is not None and now - self._last_export >= self.export_interval:
+            self._last_export = now
+            try:
+                self.stats_exporter.write(receiver.config.port, snapshot)
+            except OSError as e:
+                self.stats_exporter = None
+                self.export_btn.setText("定时导出统计...")
+                QMessageBox.critical(self, "错误", f"统计导出失败: {str(e)}")
+
+    def toggle_stats_export(self):
+        """开始/停止定时导出统计快照，.csv为CSV，其他扩展名为JSON Lines"""
+        if self.stats_exporter is not None:
+            self.stats_exporter = None
+            self.export_btn.setText("定时导出统计...")
+            return
+        file_path, selected = QFileDialog.getSaveFileName(
+            self, "导出统计", os.path.join("serial_logs", "stats.csv"),
+            "CSV (*.csv);;JSON Lines (*.jsonl)")
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            file_path += '.jsonl' if selected.startswith('JSON') else '.csv'
+        self.stats_exporter = StatsExporter(file_path)
+        self._last_export = 0.0
+        self.export_btn.setText("停止导出统计")
+
+    def append_data(self, is_parent_paused=False):
+        """同步缓冲区中的新行（原来在底部时保持滚动到底部）"""
         if not is_parent_paused:  # 只根据父窗口的暂停状态决定是否更新
-            # 获取当前滚动条位置
-            scrollbar = self.data_text.verticalScrollBar()
-            at_bottom = scrollbar.value() == scrollbar.maximum()
-
-            cursor = self.data_text.textCursor()
-            cursor.movePosition(cursor.End)
-            cursor.insertText(data)
-
-            # 如果之前是在底部，保持滚动到底部
-            if at_bottom:
-                self.data_text.ensureCursorVisible()
+            self.data_text.refresh()
 
     def clear_data(self):
-        """清空数据"""
-        self.data_text.clear()
+        """清空数据（只清空本窗口的显示）"""
+        self.data_text.model().clear_view()
 
     def save_data(self):
         """保存数据到文件"""
@@ -637,11 +759,16 @@ class PortDataWindow(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.data_text.toPlainText())
+                    f.write(self.data_text.model().text())
                 QMessageBox.information(self, "成功", "数据保存成功")
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"保存失败: {str(e)}")
 
+class LogErrorBridge(QObject):
+    """把日志写入线程中的错误转发到GUI线程"""
+    error_occurred = pyqtSignal(object, str)  # (串口序号, 错误信息)
+
+
 class SerialReceiverApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -652,9 +779,24 @@ class SerialReceiverApp(QMainWindow):
         self.is_receiving = True  # 默认接收数据
         self.max_ports = 8  # 默认8个串口
         self.port_widgets = []  # 存储串口控件
+        self.reactor = None  # 共享I/O线程（启用后新连接的串口都由它服务）
+
+        # 所有串口共用一个后台日志写入线程
+        # 日志目录保留策略：默认不压缩、不删除，可按需设置总大小上限/保留时间/关闭后压缩
+        self.log_retention = LogRetention("serial_logs", max_total_size=None, max_age=None, compress='none')
+        self.log_errors = LogErrorBridge()
+        self.log_errors.error_occurred.connect(self.on_log_error)
+        self.log_writer = LogWriter(on_error=self.log_errors.error_occurred.emit, retention=self.log_retention)
+        self.log_writer.start()
+
+        # 后台枚举串口并检测热插拔，界面只使用缓存的列表
+        self.port_monitor = PortMonitor()
+        self.port_monitor.ports_changed.connect(self.on_ports_changed)
+        self.available_ports = []  # 最近一次收到的端口列表
 
         # 创建界面
         self.init_ui()
+        self.port_monitor.start()
 
     def init_ui(self):
         # 主窗口布局
@@ -689,9 +831,10 @@ class SerialReceiverApp(QMainWindow):
         self.clear_all_btn.clicked.connect(self.clear_all)
         control_layout.addWidget(self.clear_all_btn)
 
-        # 刷新端口按钮
+        # 刷新端口按钮（Linux下自动检测热插拔，不需要）
         self.refresh_btn = QPushButton("刷新端口")
         self.refresh_btn.clicked.connect(self.refresh_all_ports)
+        self.refresh_btn.setVisible(not self.port_monitor.watching)
         control_layout.addWidget(self.refresh_btn)
 
         self.global_auto_save_check = QCheckBox("全局自动保存")
@@ -699,6 +842,22 @@ class SerialReceiverApp(QMainWindow):
         self.global_auto_save_check.stateChanged.connect(self.toggle_global_auto_save)
         control_layout.addWidget(self.global_auto_save_check)
 
+        self.shared_io_check = QCheckBox("共享I/O线程")
+        self.shared_io_check.setToolTip("所有串口由一个线程统一收发，对已连接的串口在重新连接后生效")
+        self.shared_io_check.setEnabled(SerialReactor.is_supported())
+        self.shared_io_check.stateChanged.connect(self.toggle_shared_io)
+        control_layout.addWidget(self.shared_io_check)
+
+        # 回放：用serial_logs中的日志代替串口，无硬件时复现问题或压测
+        self.replay_btn = QPushButton("回放日志...")
+        self.replay_btn.clicked.connect(self.start_replay)
+        control_layout.addWidget(self.replay_btn)
+
+        self.replay_speed_combo = QComboBox()
+        for text, speed in (("1x", 1.0), ("10x", 10.0), ("100x", 100.0), ("不限速", 0.0)):
+            self.replay_speed_combo.addItem(text, speed)
+        control_layout.addWidget(self.replay_speed_combo)
+
         control_layout.addStretch()
         main_layout.addWidget(control_group)
 
@@ -731,12 +890,35 @@ class SerialReceiverApp(QMainWindow):
             if hasattr(widget, 'auto_save_check'):
                 widget.auto_save_check.setChecked(enabled)
 
+    def start_replay(self):
+        """选择一个或多个日志文件，依次在空闲的串口控件中回放"""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择要回放的日志", "serial_logs",
+            "日志 (*.cap *.log *.log.gz *.log.zst);;All Files (*)")
+        if not paths:
+            return
+        idle = [w for w in self.port_widgets if not (w.serial_receiver and w.serial_receiver.is_connected)]
+        if len(paths) > len(idle):
+            QMessageBox.warning(self, "回放", f"只有{len(idle)}个空闲的串口窗口，只回放前{len(idle)}个文件")
+        speed = self.replay_speed_combo.currentData()
+        for widget, path in zip(idle, paths):
+            widget.connect_replay(path, speed)
+
+    def toggle_shared_io(self, state):
+        """切换共享I/O线程模式"""
+        if state == Qt.Checked and self.reactor is None:
+            self.reactor = SerialReactor()
+        reactor = self.reactor if state == Qt.Checked else None
+        for widget in self.port_widgets:
+            widget.reactor = reactor
+
     def create_port_widgets(self, count: int):
         """创建指定数量的串口控件"""
         # 保存当前已连接的串口配置
         connected_ports = []
         for widget in self.port_widgets:
-            if widget.serial_receiver and widget.serial_receiver.is_connected:
+            if (widget.serial_receiver and widget.serial_receiver.is_connected
+                    and not isinstance(widget.serial_receiver, ReplayReceiver)):
                 connected_ports.append({
                     'index': widget.port_index,
                     'port': widget.serial_receiver.config.port,
@@ -748,6 +930,7 @@ class SerialReceiverApp(QMainWindow):
             # 只断开未标记为保留的串口
             if not (widget.serial_receiver and widget.serial_receiver.is_connected):
                 widget.disconnect_serial()
+                widget.render_scheduler.remove(widget)
                 widget.setParent(None)
 
         # 保留已连接的控件
@@ -758,6 +941,9 @@ class SerialReceiverApp(QMainWindow):
         current_count = len(self.port_widgets)
         for i in range(current_count, count):
             port_widget = SerialPortWidget(i)
+            port_widget.log_writer = self.log_writer
+            if self.shared_io_check.isChecked():
+                port_widget.reactor = self.reactor
             self.port_widgets.append(port_widget)
 
         # 重新布局所有控件
@@ -771,8 +957,9 @@ class SerialReceiverApp(QMainWindow):
                 widget.baudrate_combo.setCurrentText(str(conn['baudrate']))
                 widget.connect_serial()
 
-        # 刷新端口列表
-        self.refresh_all_ports()
+        # 用缓存的端口列表填充下拉列表；枚举只由PortMonitor完成（启动时它的第一次枚举会通过on_ports_changed更新）
+        for widget in self.port_widgets:
+            widget.refresh_ports(self.available_ports)
 
     def update_port_layout(self):
         """更新串口控件的布局"""
@@ -812,26 +999,56 @@ class SerialReceiverApp(QMainWindow):
         for widget in self.port_widgets:
             widget.clear_receive()
 
+    def on_log_error(self, port_index, message: str):
+        """日志写入线程报告的错误显示到对应的串口控件"""
+        for widget in self.port_widgets:
+            if widget.port_index == port_index:
+                widget.close_log_file()  # 写入线程已丢弃该日志，不再提交写请求
+                widget.show_error(message)
+                return
+        print(message)
+
     def refresh_all_ports(self):
-        """刷新所有串口下拉列表"""
-        ports = SerialReceiver.get_available_ports()
+        """用缓存的端口列表刷新所有串口下拉列表，并请求后台重新枚举（列表变化时由on_ports_changed更新）"""
         for widget in self.port_widgets:
-            widget.refresh_ports(ports)
+            widget.refresh_ports(self.available_ports)
             widget.clear_error()  # 刷新时清除错误信息
+        self.port_monitor.refresh()
+
+    def on_ports_changed(self, ports: list):
+        """端口列表变化（插入或拔出设备）：更新下拉列表，并立即通知设备已消失的已连接串口"""
+        # 只处理从上次列表中消失的端口；回放和手动指定的设备（如伪终端）本来就不在comports()结果中
+        removed = set(self.available_ports) - set(ports)
+        self.available_ports = ports
+        for widget in self.port_widgets:
+            receiver = widget.serial_receiver
+            if (receiver and receiver.is_connected and not isinstance(receiver, ReplayReceiver)
+                    and receiver.config.port in removed):
+                widget.port_removed()
+            widget.refresh_ports(ports)
 
     def closeEvent(self, event):
         """窗口关闭事件处理"""
+        self.port_monitor.stop()
+
         # 先断开所有串口连接
         for widget in self.port_widgets:
             widget.disconnect_serial()
 
-        # 清理所有控件
+        # 清理所有控件（先从显示调度器中移除，控件销毁后不会再被调用）
         for widget in self.port_widgets:
+            widget.render_scheduler.remove(widget)
             widget.setParent(None)
             widget.deleteLater()
 
         self.port_widgets.clear()
 
+        if self.reactor is not None:
+            self.reactor.stop()
+
+        # 写完队列中剩余的日志数据并关闭文件
+        self.log_writer.stop()
+
         # 强制垃圾回收
         import gc
         gc.collect()
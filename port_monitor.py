@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+
+from PyQt5.QtCore import QFileSystemWatcher, QThread, pyqtSignal
+
+from serial_core import get_available_ports
+
+
+class PortMonitor(QThread):
+    """后台枚举串口并检测热插拔
+
+    comports()在USB串口较多的机器上可能要几百毫秒，因此只在本线程中调用，界面使用缓存的ports。
+    Linux下用QFileSystemWatcher（inotify）监视/dev，设备节点增删时才重新枚举，不轮询；
+    其他系统每poll_interval秒枚举一次。端口列表有变化时（包括第一次枚举）发出ports_changed。
+    """
+
+    ports_changed = pyqtSignal(list)  # 排序后的设备列表
+
+    def __init__(self, poll_interval: float = 2.0, settle_time: float = 0.3, parent=None):
+        super().__init__(parent)
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time  # /dev变化后等待一会再枚举，合并连续的变化
+        self.ports = []  # 最近一次枚举结果（只在本线程中替换）
+        self._wakeup = threading.Event()
+        self._should_stop = False
+        self._watcher = None
+        if sys.platform.startswith('linux') and os.path.isdir('/dev'):
+            self._watcher = QFileSystemWatcher(['/dev'], self)
+            self._watcher.directoryChanged.connect(self.refresh)
+
+    @property
+    def watching(self) -> bool:
+        """是否由/dev的变化触发枚举（否则为定时轮询）"""
+        return self._watcher is not None
+
+    def refresh(self, *args):
+        """请求后台重新枚举，立即返回"""
+        self._wakeup.set()
+
+    def stop(self):
+        self._should_stop = True
+        self._wakeup.set()
+        if self.isRunning():
+            self.wait(2000)
+
+    def run(self):
+        while not self._should_stop:
+            # 在枚举之前清除：枚举期间的新变化会让下一次wait立即返回，start()之前的refresh()已包含在这次枚举中
+            self._wakeup.clear()
+            ports = get_available_ports()
+            if ports != self.ports:
+                self.ports = ports
+                self.ports_changed.emit(ports)
+            if self._wakeup.wait(None if self.watching else self.poll_interval) and not self._should_stop:
+                # 变化通常成批出现（ttyUSBx、by-id/by-path链接等），等udev处理完再枚举一次
+                QThread.msleep(int(self.settle_time * 1000))
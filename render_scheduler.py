@@ -0,0 +1,83 @@
+import time
+import weakref
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer
+
+
+class RenderScheduler(QObject):
+    """所有串口控件共用的显示调度器
+
+    每帧（frame_interval毫秒）由一个定时器运行一次，按轮转顺序调用各控件的render(now)；
+    本帧用时达到budget秒后，剩下的控件留到下一帧并从这里继续，因此一个数据量大的串口不会让其他串口得不到刷新，
+    GUI线程每帧花在显示上的时间也有上限。数据到达的信号处理函数只排队和置标志，不直接刷新界面。
+    控件以弱引用保存，Python对象被回收或底层C++对象已销毁(deleteLater)后自动移除。
+    """
+
+    _instance = None
+
+    def __init__(self, frame_interval: int = 16, budget: float = 0.004, parent=None):
+        super().__init__(parent)
+        self.budget = budget
+        self._clients = []
+        self._next = 0  # 下一帧从这个位置开始
+        self.frames = 0
+        self.deferred_frames = 0  # 超出预算、有控件被推迟到下一帧的帧数
+        self.last_frame_time = 0.0
+        self.max_frame_time = 0.0
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.run_frame)
+        self._timer.setInterval(frame_interval)
+
+    @classmethod
+    def instance(cls) -> 'RenderScheduler':
+        """应用内共用的调度器（第一次使用时创建，需要已有QApplication）"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def add(self, client):
+        """client需要提供render(now)方法，now为time.monotonic()"""
+        self._clients.append(weakref.ref(client))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def remove(self, client):
+        for i, ref in enumerate(self._clients):
+            if ref() is client:
+                self._drop(i)
+                return
+
+    def _drop(self, i: int):
+        del self._clients[i]
+        if i < self._next:
+            self._next -= 1
+        if not self._clients:
+            self._next = 0
+            self._timer.stop()
+
+    def run_frame(self):
+        start = time.perf_counter()
+        deadline = start + self.budget
+        now = time.monotonic()
+        count = len(self._clients)
+        for _ in range(count):
+            if not self._clients:
+                break
+            if time.perf_counter() >= deadline:
+                self.deferred_frames += 1
+                break
+            i = self._next % len(self._clients)
+            client = self._clients[i]()
+            if client is None or (isinstance(client, sip.simplewrapper) and sip.isdeleted(client)):
+                self._drop(i)
+                continue
+            self._next = (i + 1) % len(self._clients)
+            try:
+                client.render(now)
+            except Exception as e:
+                print(f"显示更新错误: {str(e)}")
+        self.frames += 1
+        self.last_frame_time = time.perf_counter() - start
+        if self.last_frame_time > self.max_frame_time:
+            self.max_frame_time = self.last_frame_time
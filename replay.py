@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+import serial
+
+from capture import CAPTURE_SUFFIX, INDEX_SUFFIX, CaptureReader
+from serial_core import SerialConfig, SerialReader, open_log
+
+# 回放：用serial_logs中记录的数据代替串口，走与真实串口相同的分帧、批次、背压和Sink，
+# 用于在没有硬件时复现现场问题、压测界面和做可重复的性能回归测试。
+#   .cap(+.idx)  按索引中的原始接收时间和原始数据块回放
+#   .log/.log.gz/.log.zst  没有时间信息，按波特率推算每个字节的到达时间（10位/字节）
+
+
+def is_capture(path: str) -> bool:
+    return path.endswith(CAPTURE_SUFFIX) or path.endswith(INDEX_SUFFIX)
+
+
+def replay_chunks(path: str, baudrate: int = 9600, chunk_size: int = None):
+    """逐块产出 (相对接收时间(秒), bytes)
+
+    chunk_size只用于文本日志，默认为该波特率下约10ms的数据量。
+    """
+    if is_capture(path):
+        with CaptureReader(path) as capture:
+            if not len(capture):
+                return
+            first = capture.timestamps[0]
+            for i in range(len(capture)):
+                timestamp, view = capture.chunk(i)
+                data = bytes(view)
+                view.release()  # 不再引用mmap，回放结束时才能关闭
+                yield timestamp - first, data
+        return
+
+    seconds_per_byte = 10 / baudrate
+    if chunk_size is None:
+        chunk_size = max(16, baudrate // 1000)
+    with open_log(path) as f:
+        offset = 0
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield offset * seconds_per_byte, data
+            offset += len(data)
+
+
+class ReplayReader(SerialReader):
+    """从日志文件回放数据的SerialReader，回调、批次和统计与读取真实串口时相同
+
+    speed: 1为按原始节奏，N为N倍速，None或0为不限速。
+    不限速时若设置了max_pending_batches，下游积压时暂停回放而不是丢弃批次，保证每次回放的结果相同。
+    loop为真时到达文件末尾后从头开始。
+    """
+
+    def __init__(self, config: SerialConfig, path: str, speed: float = 1.0, loop: bool = False, **kwargs):
+        super().__init__(config, **kwargs)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.bytes_replayed = 0
+        self.finished = False  # 正常回放到文件末尾
+        self._wakeup = threading.Event()
+
+    def open(self, timeout: float = None):
+        """检查回放文件；与串口一样，失败时抛出serial.SerialException"""
+        path = self.path[:-len(INDEX_SUFFIX)] + CAPTURE_SUFFIX if self.path.endswith(INDEX_SUFFIX) else self.path
+        if not os.path.isfile(path):
+            raise serial.SerialException(f"回放文件不存在: {self.path}")
+        self.finished = False
+        self.is_connected = True
+        for sink in self.sinks:
+            sink.open()
+
+    def stop(self):
+        self.should_stop = True
+        self._wakeup.set()
+
+    def run(self):
+        """回放直到文件末尾（loop时直到stop()）"""
+        try:
+            if not self.is_connected:
+                self.open()
+            while not self.should_stop:
+                self._replay_once()
+                if not self.loop or self.should_stop:
+                    break
+            self.finished = not self.should_stop
+        except serial.SerialException as e:
+            self._error(str(e))
+        except (OSError, ValueError) as e:
+            self._error(f"回放错误: {str(e)}")
+        finally:
+            self.close()
+
+    def _replay_once(self):
+        begin = time.monotonic()
+        for timestamp, data in replay_chunks(self.path, self.config.baudrate):
+            if self.should_stop:
+                return
+            if self.speed:
+                self._wait_until(begin + timestamp / self.speed)
+            else:
+                self._wait_for_consumer()
+            self.deliver(data)
+            self.bytes_replayed += len(data)
+            self.flush_batch_if_due()
+        self.flush_batch()
+
+    def _wait_until(self, due: float):
+        """等到数据的回放时间，期间照常按截止时间交出批次"""
+        while not self.should_stop:
+            now = time.monotonic()
+            if now >= due:
+                return
+            wait = due - now
+            if self.batch_deadline is not None:
+                wait = min(wait, max(0.0, self.batch_deadline - now))
+            self._wakeup.wait(wait)
+            self.flush_batch_if_due()
+
+    def _wait_for_consumer(self):
+        while (self.max_pending_batches is not None and self.queued_batches >= self.max_pending_batches
+               and not self.should_stop):
+            self._wakeup.wait(0.001)
+            self.flush_batch_if_due()
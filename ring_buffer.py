@@ -0,0 +1,81 @@
+class LineRingBuffer:
+    """定长的行环形缓冲区
+
+    最多保存capacity行，追加、淘汰最旧行和清空都是O(1)，内存占用固定。
+    每行有一个递增的序号，显示端记住已显示到的序号即可增量取出新行，无需复制整个历史。
+    newline为'\\n'时保存str，为b'\\n'时保存bytes。
+    """
+
+    def __init__(self, capacity: int, newline='\n', max_line_length: int = 4096):
+        self.capacity = capacity
+        self.newline = newline
+        self.max_line_length = max_line_length  # 未完成的行超过该长度时强制断行
+        self._lines = [None] * capacity
+        self._start = 0  # 最旧一行的序号
+        self._end = 0  # 下一行的序号
+        self._partial = newline[:0]  # 尚未遇到换行符的最后一行
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def start_seq(self) -> int:
+        """最旧一行的序号"""
+        return self._start
+
+    @property
+    def end_seq(self) -> int:
+        """下一行将使用的序号"""
+        return self._end
+
+    @property
+    def partial(self):
+        """尚未完整的最后一行"""
+        return self._partial
+
+    def append(self, line):
+        """追加一个完整的行（不含换行符）"""
+        self._lines[self._end % self.capacity] = line
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def write(self, data):
+        """追加一段任意切分的数据流，跨调用保留未完成的行"""
+        lines = data.split(self.newline)
+        if self._partial:
+            lines[0] = self._partial + lines[0]
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_line_length:
+            lines.append(self._partial)
+            self._partial = self.newline[:0]
+        self.extend(lines)
+
+    def clear(self):
+        """清空：只移动起始序号，旧行在被覆盖时释放"""
+        self._start = self._end
+        self._partial = self.newline[:0]
+
+    def get(self, seq: int):
+        """按序号取一行，调用方需保证start_seq <= seq < end_seq"""
+        return self._lines[seq % self.capacity]
+
+    def since(self, seq: int) -> list:
+        """返回序号>=seq的所有行；seq早于最旧行时从最旧行开始"""
+        return self._slice(max(seq, self._start), self._end)
+
+    def last(self, n: int) -> list:
+        """返回最后n行"""
+        return self._slice(max(self._end - n, self._start), self._end)
+
+    def _slice(self, first: int, end: int) -> list:
+        if first >= end:
+            return []
+        i, j = first % self.capacity, end % self.capacity
+        if i < j:
+            return self._lines[i:j]
+        return self._lines[i:] + self._lines[:j]
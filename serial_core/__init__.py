@@ -0,0 +1,32 @@
+"""串口接收核心库，不依赖PyQt5
+
+    config  SerialConfig
+    framer  NMEAFramer：bytes上的流式分帧（NMEA语句和UBX/RTCM3二进制帧）
+    binary  UBXFrame、RTCMFrame及其校验
+    parser  NMEAParser、RMCFix/GGAFix等记录、按语句类型分发的parse_nmea_lines（register_decoder扩展）、format_record
+    reader  SerialReader：读取循环、批次合并与背压，回调/Sink方式交出批次
+    sinks   Sink、FileSink、DisplayQueueSink、UDPForwarder、TCPForwarder；open_log读取FileSink写出的日志
+    stats   PortStats：每个串口的吞吐量、读取大小、解析/显示时间和延迟直方图；StatsExporter导出JSON/CSV快照
+    batch   离线批量解码为numpy列（需要numpy，不在此处导入，使用时 from serial_core import batch）
+
+图形界面(serial_receiver.SerialReceiver)和无界面模式(headless.py)都是它的适配层。
+"""
+from .binary import RTCMFrame, UBXFrame
+from .config import SerialConfig
+from .framer import NMEAFramer
+from .parser import (GGAFix, GSARecord, GSTRecord, GSVRecord, NMEAParser, RMCFix, VTGRecord, ZDARecord,
+                     decoder_table, enabled_sentences, format_date, format_record, format_time,
+                     parse_nmea_lines, register_decoder, registered_sentences, set_enabled)
+from .reader import SerialReader, connection_error_message, get_available_ports
+from .sinks import DisplayQueueSink, FileSink, Sink, TCPForwarder, UDPForwarder, open_log
+from .stats import PortStats, StatsExporter, format_stats
+
+__all__ = [
+    'SerialConfig', 'NMEAFramer', 'NMEAParser',
+    'RMCFix', 'GGAFix', 'UBXFrame', 'RTCMFrame', 'GSVRecord', 'GSARecord', 'VTGRecord', 'ZDARecord', 'GSTRecord',
+    'parse_nmea_lines', 'register_decoder', 'set_enabled', 'enabled_sentences', 'registered_sentences',
+    'decoder_table', 'format_record', 'format_time', 'format_date',
+    'SerialReader', 'connection_error_message', 'get_available_ports',
+    'Sink', 'FileSink', 'DisplayQueueSink', 'UDPForwarder', 'TCPForwarder', 'open_log',
+    'PortStats', 'StatsExporter', 'format_stats',
+]
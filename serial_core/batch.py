@@ -0,0 +1,330 @@
+"""批量NMEA解码：把整块缓冲区或日志文件一次性解码为按列存放的numpy数组，用于离线处理
+
+逐行解析(parse_nmea_lines)每条语句都要切分、逐字段判断和转换、再构造dict。
+这里对同一种语句的全部实例同时处理，每一步都是整列的numpy运算：
+  1. 扫描'$'得到所有语句的起点，按语句头中的类型（'RMC,'，忽略GN/GP/BD等发送方）选出语句
+  2. 从缓冲区任意偏移处按8字节(uint64)读取，用SWAR位运算在字中找下一个逗号，逐个字段向后推进
+  3. 同样找到小数点，数字串按8字节一次转换（去掉小数点后不超过8位的字段只转换一次，
+     经纬度的整数和小数部分分别转换，负数等少数字段单独转换）
+  4. 度分换算、南纬/西经、单位换算按列完成
+与逐行解析的区别：
+  - 字段不完整或越过下一条语句的语句被跳过（逐行解析会返回解析错误的记录）
+  - 空的或损坏的浮点字段为NaN（逐行解析为0.0），整数字段为0
+  - 所有语句都会输出，无效定位由valid列标记
+需要numpy。
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，只有批量解码需要
+    np = None
+
+from .sinks import open_log
+
+_PADDING = 32  # 缓冲区末尾补零，保证任意位置都能读取完整的8字节
+_MAX_FIELD = 24  # 查找分隔符的最大距离（字节），更长的字段视为损坏
+BLOCK_SIZE = 4 * 1024 * 1024  # decode_buffer每次解码的字节数
+
+if np is not None:
+    _ONES = np.uint64(0x0101010101010101)
+    _HIGHS = np.uint64(0x8080808080808080)
+    _NIBBLE_HIGH = np.uint64(0xF0F0F0F0F0F0F0F0)
+    _NIBBLE_LOW = np.uint64(0x0F0F0F0F0F0F0F0F)
+    _SIXES = np.uint64(0x0606060606060606)
+    _THREES = np.uint64(0x3333333333333333)
+    _POW10 = 10.0 ** np.arange(9)
+    _POW10_INT = 10 ** np.arange(9, dtype=np.uint64)
+    _COMMAS = _ONES * np.uint64(ord(','))
+    _DOTS = _ONES * np.uint64(ord('.'))
+    _ONE, _THREE, _FOUR, _EIGHT = (np.uint64(n) for n in (1, 3, 4, 8))
+    _FIFTY_SIX, _SIXTY_FOUR = np.uint64(56), np.uint64(64)
+    _ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+    _TYPE_SHIFT = np.uint64(24)  # '$GNRMC,'中跳过'$'和两个字符的发送方，取'RMC,'
+    _TYPE_MASK = np.uint64(0xFFFFFFFF)
+    _LOW_BYTE, _MINUS = np.uint64(0xFF), np.uint64(ord('-'))
+    _PAD = b'\0' * _PADDING
+
+    if hasattr(np, 'bitwise_count'):
+        _bit_count = np.bitwise_count
+    else:  # numpy < 2.0
+        def _bit_count(w):
+            return np.unpackbits(w.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1, dtype=np.uint64)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("批量解码需要安装numpy")
+
+
+def _scan(data, length: int = None):
+    """返回 (逐字节数组, 8字节视图, 所有'$'的位置（末尾附加数据长度）, 每个'$'后的语句类型)
+
+    8字节视图的第i项是data[i:i+8]按小端解释的uint64，可以用下标数组一次读取任意位置。
+    语句类型为'$'之后第3~6字节（如'RMC,'）的uint32，与发送方(GN/GP/BD等)无关。
+    给出length时只解码data[:length]，其后至少还有_PADDING字节可读，不需要复制一份补零。
+    """
+    if length is None:
+        length = len(data)
+        data = b''.join((data, _PAD))
+    u8 = np.frombuffer(data, dtype=np.uint8)
+    words = np.ndarray(shape=(len(u8) - 7,), dtype='<u8', buffer=data, strides=(1,))
+    dollars = np.append(np.flatnonzero(u8[:length] == 36), length)
+    return u8, words, dollars, (words[dollars[:-1]] >> _TYPE_SHIFT) & _TYPE_MASK
+
+
+def _first_byte(w, pattern):
+    """每个8字节字中第一个等于pattern字节的下标(0~7)，没有则为8"""
+    x = w ^ pattern
+    # "含零字节"判断：只有最低的置位字节一定准确，正好是需要的
+    t = (x - _ONES) & ~x & _HIGHS
+    return _bit_count(~t & (t - _ONE)) >> _THREE
+
+
+def _find_comma(words, begin, w0):
+    """从每个begin开始查找下一个逗号，返回 (逗号位置, begin+8处的8字节)
+
+    _MAX_FIELD字节内找不到逗号时位置为-1；只有少数字段超过7字节时不读取整列的第二个8字节，返回None。
+    """
+    length = _first_byte(w0, _COMMAS).view(np.int64)
+    more = length == 8
+    w1 = None
+    if more.sum() * 2 > len(more):
+        w1 = words[begin + 8]
+        length += _first_byte(w1, _COMMAS).view(np.int64) * more
+    for offset in range(8 if w1 is None else 16, _MAX_FIELD, 8):
+        more = length == offset
+        if not more.any():
+            break
+        length[more] += _first_byte(words[begin[more] + offset], _COMMAS).view(np.int64)
+    return np.where(length < _MAX_FIELD, begin + length, -1), w1
+
+
+def _digits(w, length):
+    """把字w中从最低字节开始、长度为length(0~8)的数字串转换为整数，返回 (值, 是否全为数字)"""
+    # 数字右对齐到高位字节，低位为0（第一个字符在最低字节）；numpy中移位量>=64的结果为0，length为0时整个字为0
+    shift = ((8 - length) << 3).view(np.uint64)
+    w = w << shift
+    # 数字字节变换后为0x33，低位的0字节仍为0
+    ok = ((w & _NIBBLE_HIGH) | (((w + _SIXES) & _NIBBLE_HIGH) >> _FOUR)) == _THREES << shift
+    # 8个ASCII数字一次转换：相邻两位、四位、八位依次合并
+    w = ((w & _NIBBLE_LOW) * np.uint64(2561)) >> np.uint64(8)
+    w = ((w & np.uint64(0x00FF00FF00FF00FF)) * np.uint64(6553601)) >> np.uint64(16)
+    w = ((w & np.uint64(0x0000FFFF0000FFFF)) * np.uint64(42949672960001)) >> np.uint64(32)
+    return w, ok
+
+
+def _slow_float(data: bytes) -> float:
+    try:
+        return float(data)
+    except ValueError:
+        return float('nan')
+
+
+def _floats(scanned, begin, end, w0, w1):
+    """字段[begin, end) -> float64，空字段或损坏的字段为NaN；w0、w1是begin、begin+8处的8字节(w1可为None)
+
+    去掉小数点后不超过8位数字的字段（时间、速度、HDOP等）只做一次8位数字转换；
+    多数超过8位的字段（经纬度）把整数和小数部分分别转换。其余少数字段（负数、更长的数字）逐个转换。
+    """
+    u8, words = scanned[:2]
+    length = end - begin
+    dot = _first_byte(w0, _DOTS).view(np.int64)  # 小数点在字段内的下标，前8字节中没有时为8
+    has_dot = dot < length
+    digits = length - has_dot
+    negative = (w0 & _LOW_BYTE) == _MINUS
+
+    if (digits > 8).sum() * 2 <= len(digits):
+        if w1 is None and (length > 8).any():
+            w1 = words[begin + 8]
+        # 去掉小数点：小数点以上的字节整体下移一个字节，第9个字节补到第8个
+        low = ~(_ALL << (dot.view(np.uint64) << _THREE))  # 低dot个字节
+        packed = (w0 & low) | ((w0 >> _EIGHT) & ~low)
+        if w1 is not None:
+            packed |= w1 << _FIFTY_SIX
+        packed = np.where(has_dot, packed, w0)
+        value, ok = _digits(packed, np.minimum(digits, 8))
+        values = value.astype(np.float64) / _POW10[np.where(has_dot, length - dot - 1, 0)]
+        slow = (digits > 8) | negative | (has_dot & (dot == 8))
+    else:
+        int_len = np.minimum(dot, length)
+        frac_len = length - dot - 1
+        slow = (int_len == 8) | (frac_len > 8) | negative
+        np.clip(frac_len, 0, 8, out=frac_len)
+        int_part, ok = _digits(w0, int_len)
+        if w1 is None:
+            frac = words[begin + dot + 1]
+        else:
+            # 小数部分从w0、w1拼接得到（小数点在第8个字节时shift为64，w0移出为0）
+            shift = np.minimum(dot + 1, 8).view(np.uint64) << _THREE
+            frac = (w0 >> shift) | (w1 << (_SIXTY_FOUR - shift))
+        frac_part, frac_ok = _digits(frac, frac_len)
+        ok &= frac_ok
+        # 整数部分最多7位、小数部分最多8位，合并后仍在float64能精确表示的范围内
+        values = (int_part * _POW10_INT[frac_len] + frac_part).astype(np.float64) / _POW10[frac_len]
+    values[~ok | (length == 0)] = np.nan
+
+    # 负数和超过8位的数字很少见，逐个转换
+    slow = np.flatnonzero(slow)
+    if len(slow):
+        buffer = u8.data
+        for i in slow:
+            values[i] = _slow_float(bytes(buffer[begin[i]:end[i]]))
+    return values
+
+
+def _ints(scanned, begin, end, w0, w1):
+    """字段[begin, end) -> int64，空字段、超过8位或损坏的字段为0"""
+    length = end - begin
+    values, ok = _digits(w0, np.minimum(length, 8))
+    values = values.view(np.int64)
+    values[~ok | (length > 8)] = 0
+    return values
+
+
+def _is_char(begin, end, char_field, char: str):
+    """单字符字段是否等于char"""
+    return char_field == ord(char)
+
+
+def _fields(scanned, sentence_type: bytes, kinds: str) -> list:
+    """找到所有该类型（如b'RMC'，任意发送方）的语句，按kinds依次取出语句头之后的字段
+
+    kinds中每个字符对应一个字段：
+      'n' 数字字段，返回 (起点, 终点, 起点处的8字节, 起点+8处的8字节或None)
+      'c' 单字符字段（状态、N/S、E/W），只读取一个字节，返回 (起点, 终点, 该字节)，空字段时该字节为','
+    字段不完整或越过下一个'$'（截断的语句后面紧跟下一条语句）的语句被丢弃。
+    """
+    u8, words, dollars, types = scanned
+    index = np.flatnonzero(types == np.uint64(int.from_bytes(sentence_type + b',', 'little')))
+    begin, limit = dollars[index] + 7, dollars[index + 1]  # 跳过'$GNRMC,'
+
+    fields = []
+    found = np.ones(len(begin), dtype=bool)
+    for kind in kinds:
+        if kind == 'c':
+            char = u8[begin]
+            end = begin + (char != 44)
+            found &= u8[end] == 44
+            fields.append((begin, end, char))
+        else:
+            w0 = words[begin]
+            end, w1 = _find_comma(words, begin, w0)
+            found &= end >= 0
+            fields.append((begin, end, w0, w1))
+        begin = end + 1
+    valid = found & (end < limit)
+    if valid.all():
+        return fields
+    return [tuple(None if a is None else a[valid] for a in field) for field in fields]
+
+
+def _degrees(value, negative):
+    """ddmm.mmmm / dddmm.mmmm -> 十进制度，南纬/西经为负"""
+    degrees = np.floor(value / 100.0)
+    result = degrees + (value - degrees * 100.0) / 60.0
+    return np.where(negative, -result, result)
+
+
+def _seconds_of_day(value):
+    """hhmmss.ss -> 当天秒数"""
+    hours = np.floor(value / 10000.0)
+    minutes = np.floor(value / 100.0) - hours * 100.0
+    return hours * 3600.0 + minutes * 60.0 + (value - np.floor(value / 100.0) * 100.0)
+
+
+def decode_rmc(data, scanned=None) -> dict:
+    """解码缓冲区中的全部RMC语句（GNRMC/GPRMC/BDRMC等，不区分发送方）
+
+    返回列：time(当天秒数) date(ddmmyy整数) latitude longitude(度) speed(km/h) course(度) valid(bool)
+    """
+    _require_numpy()
+    scanned = scanned or _scan(data)
+    # $GNRMC,时间,状态,纬度,N/S,经度,E/W,速度(节),航向,日期,
+    f = _fields(scanned, b'RMC', 'ncncncnnn')
+    return {
+        'time': _seconds_of_day(_floats(scanned, *f[0])),
+        'date': _ints(scanned, *f[8]),
+        'latitude': _degrees(_floats(scanned, *f[2]), _is_char(*f[3], 'S')),
+        'longitude': _degrees(_floats(scanned, *f[4]), _is_char(*f[5], 'W')),
+        'speed': _floats(scanned, *f[6]) * 1.852,  # 节 -> km/h
+        'course': _floats(scanned, *f[7]),
+        'valid': _is_char(*f[1], 'A'),
+    }
+
+
+def decode_gga(data, scanned=None) -> dict:
+    """解码缓冲区中的全部GGA语句（不区分发送方）
+
+    返回列：time(当天秒数) latitude longitude(度) quality satellites hdop altitude(m) valid(bool，质量非0)
+    """
+    _require_numpy()
+    scanned = scanned or _scan(data)
+    # $GNGGA,时间,纬度,N/S,经度,E/W,定位质量,卫星数,HDOP,海拔,
+    f = _fields(scanned, b'GGA', 'nncncnnnn')
+    quality = _ints(scanned, *f[5])
+    return {
+        'time': _seconds_of_day(_floats(scanned, *f[0])),
+        'latitude': _degrees(_floats(scanned, *f[1]), _is_char(*f[2], 'S')),
+        'longitude': _degrees(_floats(scanned, *f[3]), _is_char(*f[4], 'W')),
+        'quality': quality,
+        'satellites': _ints(scanned, *f[6]),
+        'hdop': _floats(scanned, *f[7]),
+        'altitude': _floats(scanned, *f[8]),
+        'valid': quality != 0,
+    }
+
+
+def decode_buffer(data, block_size: int = BLOCK_SIZE) -> dict:
+    """解码一块缓冲区（bytes、bytearray、mmap均可），返回 {'RMC': 列, 'GGA': 列}（各发送方的语句合在一起）
+
+    按block_size在换行处分块解码：每个字段都要按语句位置从缓冲区读取一次，
+    块小到能留在CPU缓存中时这些读取才不会每次都访问内存。
+    """
+    _require_numpy()
+    view = memoryview(data).cast('B')
+    rmc, gga = [], []
+    start = 0
+    while start < len(view):
+        end = len(view)
+        if end - start > block_size:
+            end = data.rfind(b'\n', start, start + block_size) + 1 or start + block_size
+        block = view[start:end]
+        # 后面还有数据时直接读到下一块的开头，不必复制整块补零
+        scanned = _scan(view[start:end + _PADDING], end - start) if len(view) - end >= _PADDING else _scan(block)
+        rmc.append(decode_rmc(block, scanned))
+        gga.append(decode_gga(block, scanned))
+        start = end
+    if not rmc:
+        return {'RMC': decode_rmc(b''), 'GGA': decode_gga(b'')}
+    return {'RMC': _concat(rmc), 'GGA': _concat(gga)}
+
+
+def _concat(parts: list) -> dict:
+    if len(parts) == 1:
+        return parts[0]
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def decode_file(path: str, chunk_size: int = 64 * 1024 * 1024) -> dict:
+    """分块解码一个日志文件（.log/.cap，或.gz/.zst压缩的日志），内存占用与chunk_size有关而与文件大小无关"""
+    _require_numpy()
+    rmc, gga = [], []
+    tail = b''
+    with open_log(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # 在最后一个换行处切开，不完整的行留给下一块
+            end = chunk.rfind(b'\n') + 1
+            if not end:
+                tail += chunk
+                continue
+            columns = decode_buffer(tail + chunk[:end])
+            tail = chunk[end:]
+            rmc.append(columns['RMC'])
+            gga.append(columns['GGA'])
+    if tail or not rmc:
+        columns = decode_buffer(tail)
+        rmc.append(columns['RMC'])
+        gga.append(columns['GGA'])
+    return {'RMC': _concat(rmc), 'GGA': _concat(gga)}
@@ -0,0 +1,109 @@
+"""与NMEA混在同一数据流中的二进制协议帧：u-blox UBX 和 RTCM 3
+
+UBX:   B5 62 | 类 | ID | 长度(2字节小端) | 负载 | CK_A CK_B（8位Fletcher，覆盖类到负载）
+RTCM3: D3 | 6位保留(0) + 10位长度 | 负载(前12位为消息号) | CRC-24Q（覆盖D3到负载）
+分帧在framer.NMEAFramer中进行，这里是校验函数和帧记录。
+"""
+from itertools import accumulate
+from typing import NamedTuple
+
+from .parser import register_formatter
+
+UBX_SYNC = b'\xb5\x62'
+RTCM3_PREAMBLE = 0xD3
+UBX_MAX_PAYLOAD = 8192  # 更长的长度字段视为误同步
+RTCM3_MAX_FRAME = 3 + 1023 + 3
+
+# 常用UBX消息名，其他的显示为 类-ID 的十六进制
+UBX_MESSAGES = {
+    (0x01, 0x02): 'NAV-POSLLH', (0x01, 0x03): 'NAV-STATUS', (0x01, 0x07): 'NAV-PVT',
+    (0x01, 0x12): 'NAV-VELNED', (0x01, 0x14): 'NAV-HPPOSLLH', (0x01, 0x20): 'NAV-TIMEGPS',
+    (0x01, 0x21): 'NAV-TIMEUTC', (0x01, 0x35): 'NAV-SAT', (0x01, 0x3C): 'NAV-RELPOSNED',
+    (0x02, 0x13): 'RXM-SFRBX', (0x02, 0x15): 'RXM-RAWX', (0x02, 0x32): 'RXM-RTCM',
+    (0x05, 0x00): 'ACK-NAK', (0x05, 0x01): 'ACK-ACK',
+    (0x06, 0x8A): 'CFG-VALSET', (0x06, 0x8B): 'CFG-VALGET',
+    (0x0A, 0x04): 'MON-VER', (0x0A, 0x09): 'MON-HW', (0x0D, 0x01): 'TIM-TP',
+}
+
+
+def _crc24q_table() -> list:
+    table = []
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+_CRC24Q = _crc24q_table()
+
+
+def crc24q(data) -> int:
+    """RTCM3使用的CRC-24Q，查表计算；data为bytes或memoryview"""
+    crc = 0
+    table = _CRC24Q
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ byte]
+    return crc
+
+
+def ubx_checksum(data) -> tuple:
+    """UBX的8位Fletcher校验 (CK_A, CK_B)；CK_B是CK_A各步累加值之和，用accumulate在C中完成"""
+    return sum(data) & 0xFF, sum(accumulate(data)) & 0xFF
+
+
+class UBXFrame(NamedTuple):
+    """一个校验通过的UBX帧，raw为完整帧（含同步字和校验和），与串口收到的字节一致"""
+    raw: bytes
+    msg_class: int
+    msg_id: int
+    type: str = 'UBX'
+    valid: bool = True
+    status: str = ''
+
+    @property
+    def name(self) -> str:
+        return UBX_MESSAGES.get((self.msg_class, self.msg_id)) or f"{self.msg_class:02X}-{self.msg_id:02X}"
+
+    @property
+    def payload(self) -> bytes:
+        return self.raw[6:-2]
+
+
+class RTCMFrame(NamedTuple):
+    """一个校验通过的RTCM3帧，raw为完整帧（含前导字节和CRC）"""
+    raw: bytes
+    message_type: int
+    type: str = 'RTCM3'
+    valid: bool = True
+    status: str = ''
+
+    @property
+    def name(self) -> str:
+        return str(self.message_type)
+
+    @property
+    def payload(self) -> bytes:
+        return self.raw[3:-3]
+
+
+def frame_key(frame) -> str:
+    """按消息类统计时使用的键，如'UBX NAV-PVT'、'RTCM3 1005'"""
+    return f"{frame.type} {frame.name}"
+
+
+def _format_frame(record, raw: str) -> str:
+    head = record.raw[:24].hex(' ')
+    more = " ..." if len(record.raw) > 24 else ""
+    return (
+        f"原始: {head}{more}\n"
+        f"解析: [{record.type}] {record.name}\n"
+        f"      长度: {len(record.raw)} 字节\n\n"
+    )
+
+
+register_formatter(UBXFrame, _format_frame)
+register_formatter(RTCMFrame, _format_frame)
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class SerialConfig:
+    port: str
+    baudrate: int = 9600
+    bytesize: int = 8
+    parity: str = 'N'
+    stopbits: float = 1
+    timeout: float = 1  # 阻塞读取的最长等待时间（秒），停止时会被cancel_read立即唤醒
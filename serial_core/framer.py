@@ -0,0 +1,232 @@
+from collections import Counter
+
+from .binary import (UBX_SYNC, UBX_MAX_PAYLOAD, RTCM3_MAX_FRAME, RTCMFrame, UBXFrame,
+                     crc24q, frame_key, ubx_checksum)
+
+# 十六进制字符 -> 值，非十六进制字符为-1
+_HEX = [-1] * 256
+for _i, _c in enumerate(b'0123456789ABCDEF'):
+    _HEX[_c] = _i
+for _i, _c in enumerate(b'abcdef', 10):
+    _HEX[_c] = _i
+# 16位值 -> 高低两字节的异或
+_XOR16 = bytes(((i >> 8) ^ i) & 0xFF for i in range(65536))
+
+
+def nmea_checksum(body) -> int:
+    """'$'与'*'之间所有字节的异或；body为bytes或memoryview（不复制）
+
+    每次异或8个字节，最后折叠为16位后查表。
+    """
+    view = memoryview(body)
+    n = len(view) & ~7
+    x = 0
+    for word in view[:n].cast('Q'):
+        x ^= word
+    for byte in view[n:]:
+        x ^= byte
+    x ^= x >> 32
+    x ^= x >> 16
+    return _XOR16[x & 0xFFFF]
+
+
+def _has_sync(data) -> bool:
+    return UBX_SYNC in data or b'\xd3' in data
+
+
+def _has_split_sync(partial: bytes, data: bytes) -> bool:
+    """UBX同步字被拆在两个数据块之间：残留部分以B5结尾、本块以62开头"""
+    return partial[-1:] == b'\xb5' and data[:1] == b'\x62'
+
+
+class NMEAFramer:
+    """NMEA流式分帧器：在bytes上工作，跨数据块保留不完整的行，只输出完整的语句
+
+    verify_checksum为真时校验每条语句末尾的*hh，校验和错误和被截断的语句不会输出，
+    只在good_sentences / bad_checksum / truncated中计数（每个串口一个分帧器，即每个串口的链路质量统计）。
+
+    binary为真时同时识别混在流中的UBX/RTCM3二进制帧：校验通过的帧不作为行输出，
+    而是暂存为UBXFrame/RTCMFrame，由take_frames()取走；按消息类计数在frame_counts中。
+    数据块中没有同步字节时走纯文本的快速路径。
+    """
+
+    def __init__(self, max_line_length: int = 1024, verify_checksum: bool = True, binary: bool = True):
+        self.max_line_length = max_line_length  # 超过该长度仍无行尾的数据视为垃圾丢弃
+        self.verify_checksum = verify_checksum
+        self.binary = binary
+        self._partial = b""
+        self._frames = []
+        self.good_sentences = 0
+        self.bad_checksum = 0
+        self.truncated = 0  # 没有*hh、被下一条语句打断或超长丢弃的语句
+        self.bad_frames = 0  # 校验失败的二进制帧（含误同步）
+        self.frame_counts = Counter()
+
+    def feed(self, data: bytes) -> list:
+        """输入一个数据块，返回其中所有已完整的行（bytes，去掉首尾空白，跳过空行）"""
+        if self.binary and (_has_sync(data) or _has_sync(self._partial)
+                            or _has_split_sync(self._partial, data)):
+            return self._feed_mixed(data)
+        end = data.rfind(b'\n')
+        if end < 0:
+            # 整块都属于未完成的行，只需拼接到残留部分
+            self._partial += data
+            if len(self._partial) > self.max_line_length:
+                self._discard_partial()
+            return []
+
+        # 只有上次残留的半行需要和本块拼接，之前的数据不会被重新扫描
+        text = self._partial + data[:end] if self._partial else data[:end]
+        self._partial = data[end + 1:]
+        if len(self._partial) > self.max_line_length:
+            self._discard_partial()
+
+        lines = []
+        if not self.verify_checksum:
+            for line in text.split(b'\n'):
+                line = line.strip()
+                if line:
+                    lines.append(line)
+            return lines
+
+        for line in text.split(b'\n'):
+            self._accept_line(line, lines)
+        return lines
+
+    def _accept_line(self, line: bytes, lines: list):
+        """校验一行，合格的追加到lines"""
+        line = line.strip()
+        if not line:
+            return
+        if not self.verify_checksum:
+            lines.append(line)
+            return
+        start = line.rfind(b'$')
+        if start < 0:
+            lines.append(line)  # 不是NMEA语句，交给解析器忽略
+            return
+        if start > 0:
+            # 前面的语句没有结束就开始了下一条（丢字节），只保留最后一条
+            if b'$' in line[:start]:
+                self.truncated += 1
+            line = line[start:]
+        star = len(line) - 3
+        if star < 1 or line[star] != 42:  # '*'
+            self.truncated += 1
+            return
+        expected = (_HEX[line[star + 1]] << 4) | _HEX[line[star + 2]]
+        if expected < 0 or nmea_checksum(memoryview(line)[1:star]) != expected:
+            self.bad_checksum += 1
+            return
+        self.good_sentences += 1
+        lines.append(line)
+
+    def _feed_mixed(self, data: bytes) -> list:
+        """文本和二进制帧混合的数据：依次找下一个'$'、B5 62或D3，按各自的规则取出完整的一段
+
+        不完整的一段（无行尾的语句、长度不够的帧）留在残留部分等下一块数据。
+        校验失败的同步字节只跳过1个字节重新搜索，因此误同步不会吞掉后面的有效数据。
+        """
+        buf = self._partial + data if self._partial else data
+        view = memoryview(buf)
+        n = len(buf)
+        pos = 0
+        lines = []
+        while pos < n:
+            starts = [i for i in (buf.find(b'$', pos), buf.find(UBX_SYNC, pos), buf.find(b'\xd3', pos)) if i >= 0]
+            if not starts:
+                # 末尾单独的B5可能是下一块中UBX同步字的前一半
+                pos = n - 1 if buf[-1] == 0xB5 else n
+                break
+            start = min(starts)
+            lead = buf[start]
+            if lead == 36:  # '$'
+                nl = buf.find(b'\n', start)
+                line = buf[start:nl] if nl >= 0 else buf[start:]
+                cut = [i for i in (line.find(UBX_SYNC), line.find(b'\xd3')) if i > 0]
+                if cut:
+                    # 语句还没结束就开始了二进制帧：语句被截断，从帧开始处继续
+                    self.truncated += 1
+                    pos = start + min(cut)
+                    continue
+                if nl < 0:
+                    pos = start
+                    break
+                self._accept_line(line, lines)
+                pos = nl + 1
+                continue
+
+            if lead == 0xB5:
+                if n - start < 6:
+                    pos = start
+                    break
+                length = buf[start + 4] | buf[start + 5] << 8
+                end = start + 8 + length
+                if length > UBX_MAX_PAYLOAD:
+                    self.bad_frames += 1
+                    pos = start + 1
+                    continue
+                if end > n:
+                    pos = start
+                    break
+                if ubx_checksum(view[start + 2:end - 2]) == (buf[end - 2], buf[end - 1]):
+                    self._add_frame(UBXFrame(buf[start:end], buf[start + 2], buf[start + 3]))
+                    pos = end
+                else:
+                    self.bad_frames += 1
+                    pos = start + 1
+                continue
+
+            # RTCM3: 长度字段前6位必须为0
+            if n - start < 3:
+                pos = start
+                break
+            if buf[start + 1] & 0xFC:
+                pos = start + 1
+                continue
+            end = start + 6 + ((buf[start + 1] & 0x03) << 8 | buf[start + 2])
+            if end > n:
+                pos = start
+                break
+            if crc24q(view[start:end - 3]) == int.from_bytes(buf[end - 3:end], 'big') and end - start > 7:
+                self._add_frame(RTCMFrame(buf[start:end], buf[start + 3] << 4 | buf[start + 4] >> 4))
+                pos = end
+            else:
+                self.bad_frames += 1
+                pos = start + 1
+
+        view.release()
+        self._partial = buf[pos:]
+        if len(self._partial) > self._partial_limit():
+            self._discard_partial()
+        return lines
+
+    def _partial_limit(self) -> int:
+        if self.binary and self._partial[:1] == b'\xb5':
+            return 8 + UBX_MAX_PAYLOAD
+        return max(self.max_line_length, RTCM3_MAX_FRAME) if self.binary else self.max_line_length
+
+    def _add_frame(self, frame):
+        self._frames.append(frame)
+        self.frame_counts[frame_key(frame)] += 1
+
+    def take_frames(self) -> list:
+        """取走feed()之后积累的二进制帧"""
+        frames, self._frames = self._frames, []
+        return frames
+
+    def _discard_partial(self):
+        if self._partial.startswith(b'$'):
+            self.truncated += 1
+        self._partial = b""
+
+    @property
+    def link_stats(self) -> dict:
+        return {'good': self.good_sentences, 'bad_checksum': self.bad_checksum, 'truncated': self.truncated,
+                'frames': sum(self.frame_counts.values()), 'bad_frames': self.bad_frames,
+                'frame_counts': dict(self.frame_counts)}
+
+    def reset(self):
+        """丢弃残留的半行和未取走的帧"""
+        self._partial = b""
+        self._frames = []
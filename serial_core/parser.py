@@ -0,0 +1,446 @@
+from typing import NamedTuple, Optional
+
+
+class RMCFix(NamedTuple):
+    """RMC记录
+
+    type为语句头（含发送方标识，如'GNRMC'、'GPRMC'）。
+    time保留原始数值hhmmss.ss、date保留ddmmyy整数（缺失时为None），"HH:MM:SS"等文本只在显示时生成。
+    无效记录只有raw、type、time、valid、status有意义。
+    """
+    raw: bytes
+    type: str
+    time: Optional[float]
+    valid: bool
+    status: str = ''  # 无效原因
+    date: Optional[int] = None
+    latitude: float = 0.0  # 度，南纬为负
+    longitude: float = 0.0  # 度，西经为负
+    speed: float = 0.0  # km/h
+    course: float = 0.0  # 度
+
+
+class GGAFix(NamedTuple):
+    """GGA记录，约定与RMCFix相同"""
+    raw: bytes
+    type: str
+    time: Optional[float]
+    valid: bool
+    status: str = ''
+    latitude: float = 0.0
+    longitude: float = 0.0
+    quality: int = 0
+    satellites: int = 0
+    hdop: float = 0.0
+    altitude: float = 0.0  # m
+
+
+class GSVRecord(NamedTuple):
+    """GSV（可见卫星）记录，satellites为 ((PRN, 仰角, 方位角, 信噪比), ...)，缺失的数值为None"""
+    raw: bytes
+    type: str
+    valid: bool
+    status: str = ''
+    total: int = 0  # 本组语句条数
+    number: int = 0  # 本条序号
+    in_view: int = 0
+    satellites: tuple = ()
+
+
+class GSARecord(NamedTuple):
+    """GSA（参与定位的卫星与DOP）记录"""
+    raw: bytes
+    type: str
+    valid: bool
+    status: str = ''
+    mode: str = ''  # M手动 / A自动
+    fix_type: int = 0  # 1未定位 2二维 3三维
+    prns: tuple = ()
+    pdop: float = 0.0
+    hdop: float = 0.0
+    vdop: float = 0.0
+
+
+class VTGRecord(NamedTuple):
+    """VTG（对地航向与速度）记录"""
+    raw: bytes
+    type: str
+    valid: bool
+    status: str = ''
+    course: float = 0.0  # 真北航向，度
+    course_magnetic: float = 0.0
+    speed: float = 0.0  # km/h
+
+
+class ZDARecord(NamedTuple):
+    """ZDA（UTC时间与日期）记录，time为hhmmss.ss数值"""
+    raw: bytes
+    type: str
+    time: Optional[float]
+    valid: bool
+    status: str = ''
+    day: int = 0
+    month: int = 0
+    year: int = 0
+    zone_hours: int = 0
+    zone_minutes: int = 0
+
+
+class GSTRecord(NamedTuple):
+    """GST（伪距误差统计）记录，误差单位为m"""
+    raw: bytes
+    type: str
+    time: Optional[float]
+    valid: bool
+    status: str = ''
+    rms: float = 0.0
+    major: float = 0.0  # 误差椭圆长半轴
+    minor: float = 0.0
+    orientation: float = 0.0  # 长半轴方向，度
+    lat_error: float = 0.0
+    lon_error: float = 0.0
+    alt_error: float = 0.0
+
+
+def format_time(time: Optional[float]) -> str:
+    """hhmmss.ss -> 'HH:MM:SS'"""
+    if time is None:
+        return "无效时间"
+    t = int(time)
+    return f"{t // 10000:02d}:{t // 100 % 100:02d}:{t % 100:02d}"
+
+
+def format_date(date: Optional[int]) -> str:
+    """ddmmyy -> 'YYYY-MM-DD'"""
+    if date is None:
+        return "无效日期"
+    return f"20{date % 100:02d}-{date // 100 % 100:02d}-{date // 10000:02d}"
+
+
+def _time(parts, index: int) -> Optional[float]:
+    return float(parts[index]) if len(parts) > index and len(parts[index]) >= 6 else None
+
+
+def _float(parts, index: int, default=0.0):
+    return float(parts[index]) if len(parts) > index and parts[index] else default
+
+
+def _int(parts, index: int, default=0):
+    return int(parts[index]) if len(parts) > index and parts[index] else default
+
+
+class NMEAParser:
+    """各类NMEA语句的解码函数
+
+    parts为去掉校验和后按b','切分的字段（bytes），raw为原始语句，header为语句头（如'GPRMC'）。
+    """
+
+    @staticmethod
+    def parse_rmc(parts, raw: bytes = b'', header: str = 'GNRMC') -> RMCFix:
+        """解析RMC语句"""
+        time = None
+        try:
+            time = _time(parts, 1)
+
+            # 状态检查
+            status = parts[2] if len(parts) > 2 else b'V'
+            if status != b'A':
+                return RMCFix(raw, header, time, False, '无效数据')
+
+            date = int(parts[9]) if len(parts) > 9 and len(parts[9]) >= 6 else None
+
+            # 经纬度解析
+            lat = float(parts[3][:2]) + float(parts[3][2:]) / 60.0 if len(parts) > 3 and parts[3] else 0.0
+            if len(parts) > 4 and parts[4] == b'S':
+                lat = -lat
+
+            lon = float(parts[5][:3]) + float(parts[5][3:]) / 60.0 if len(parts) > 5 and parts[5] else 0.0
+            if len(parts) > 6 and parts[6] == b'W':
+                lon = -lon
+
+            speed = float(parts[7]) if len(parts) > 7 and parts[7] else 0.0  # 节
+            course = float(parts[8]) if len(parts) > 8 and parts[8] else 0.0  # 度
+
+            return RMCFix(raw, header, time, True, '', date, lat, lon, speed * 1.852, course)  # 速度转换为km/h
+        except Exception:
+            return RMCFix(raw, header, time, False, '解析错误')
+
+    @staticmethod
+    def parse_gga(parts, raw: bytes = b'', header: str = 'GNGGA') -> GGAFix:
+        """解析GGA语句"""
+        time = None
+        try:
+            time = _time(parts, 1)
+
+            # 定位质量
+            quality = int(parts[6]) if len(parts) > 6 and parts[6] else 0
+            if quality == 0:
+                return GGAFix(raw, header, time, False, '无效定位')
+
+            # 经纬度解析
+            lat = float(parts[2][:2]) + float(parts[2][2:]) / 60.0 if len(parts) > 2 and parts[2] else 0.0
+            if len(parts) > 3 and parts[3] == b'S':
+                lat = -lat
+
+            lon = float(parts[4][:3]) + float(parts[4][3:]) / 60.0 if len(parts) > 4 and parts[4] else 0.0
+            if len(parts) > 5 and parts[5] == b'W':
+                lon = -lon
+
+            satellites = int(parts[7]) if len(parts) > 7 and parts[7] else 0
+            hdop = float(parts[8]) if len(parts) > 8 and parts[8] else 0.0
+            altitude = float(parts[9]) if len(parts) > 9 and parts[9] else 0.0
+
+            return GGAFix(raw, header, time, True, '', lat, lon, quality, satellites, hdop, altitude)
+        except Exception:
+            return GGAFix(raw, header, time, False, '解析错误')
+
+    @staticmethod
+    def parse_gsv(parts, raw: bytes = b'', header: str = 'GPGSV') -> GSVRecord:
+        """解析GSV语句，每颗卫星4个字段；NMEA 4.1末尾多出的信号ID被忽略"""
+        try:
+            satellites = tuple(
+                (_int(parts, i, None), _int(parts, i + 1, None), _int(parts, i + 2, None), _int(parts, i + 3, None))
+                for i in range(4, len(parts) - 3, 4))
+            return GSVRecord(raw, header, True, '', _int(parts, 1), _int(parts, 2), _int(parts, 3), satellites)
+        except Exception:
+            return GSVRecord(raw, header, False, '解析错误')
+
+    @staticmethod
+    def parse_gsa(parts, raw: bytes = b'', header: str = 'GNGSA') -> GSARecord:
+        """解析GSA语句：模式、定位类型、12个卫星号、PDOP/HDOP/VDOP"""
+        try:
+            fix_type = _int(parts, 2)
+            if fix_type < 2:
+                return GSARecord(raw, header, False, '未定位', parts[1].decode('ascii'), fix_type)
+            prns = tuple(int(p) for p in parts[3:15] if p)
+            return GSARecord(raw, header, True, '', parts[1].decode('ascii'), fix_type, prns,
+                             _float(parts, 15), _float(parts, 16), _float(parts, 17))
+        except Exception:
+            return GSARecord(raw, header, False, '解析错误')
+
+    @staticmethod
+    def parse_vtg(parts, raw: bytes = b'', header: str = 'GPVTG') -> VTGRecord:
+        """解析VTG语句：真北航向、磁北航向、速度（优先使用km/h字段）"""
+        try:
+            speed = _float(parts, 7, None)
+            if speed is None:
+                speed = _float(parts, 5) * 1.852
+            mode = parts[9] if len(parts) > 9 else b'A'
+            if mode == b'N':
+                return VTGRecord(raw, header, False, '无效数据')
+            return VTGRecord(raw, header, True, '', _float(parts, 1), _float(parts, 3), speed)
+        except Exception:
+            return VTGRecord(raw, header, False, '解析错误')
+
+    @staticmethod
+    def parse_zda(parts, raw: bytes = b'', header: str = 'GPZDA') -> ZDARecord:
+        """解析ZDA语句：UTC时间、日、月、年、本地时区"""
+        time = None
+        try:
+            time = _time(parts, 1)
+            year = _int(parts, 4)
+            if time is None or not year:
+                return ZDARecord(raw, header, time, False, '无效时间')
+            return ZDARecord(raw, header, time, True, '', _int(parts, 2), _int(parts, 3), year,
+                             _int(parts, 5), _int(parts, 6))
+        except Exception:
+            return ZDARecord(raw, header, time, False, '解析错误')
+
+    @staticmethod
+    def parse_gst(parts, raw: bytes = b'', header: str = 'GPGST') -> GSTRecord:
+        """解析GST语句：RMS、误差椭圆、经纬高标准差"""
+        time = None
+        try:
+            time = _time(parts, 1)
+            return GSTRecord(raw, header, time, True, '', *(_float(parts, i) for i in range(2, 9)))
+        except Exception:
+            return GSTRecord(raw, header, time, False, '解析错误')
+
+    # 兼容旧名称
+    parse_gnrmc = parse_rmc
+    parse_gngga = parse_gga
+
+
+def _format_rmc(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      时间: {format_time(record.time)}\n"
+        f"      日期: {format_date(record.date)}\n"
+        f"      位置: {record.latitude:.6f}°N, {record.longitude:.6f}°E\n"
+        f"      速度: {record.speed:.2f} km/h\n"
+        f"      航向: {record.course:.1f}°\n\n"
+    )
+
+
+def _format_gga(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      时间: {format_time(record.time)}\n"
+        f"      位置: {record.latitude:.6f}°N, {record.longitude:.6f}°E\n"
+        f"      质量: {record.quality}\n"
+        f"      卫星数: {record.satellites}\n"
+        f"      HDOP: {record.hdop:.1f}\n"
+        f"      海拔: {record.altitude:.1f} m\n\n"
+    )
+
+
+def _format_gsv(record, raw: str) -> str:
+    satellites = "  ".join(f"{prn}({snr if snr is not None else '-'})" for prn, _, _, snr in record.satellites)
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}] {record.number}/{record.total}\n"
+        f"      可见卫星: {record.in_view}\n"
+        f"      卫星(信噪比): {satellites}\n\n"
+    )
+
+
+def _format_gsa(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      定位: {record.fix_type}D  模式: {record.mode}\n"
+        f"      卫星: {' '.join(map(str, record.prns))}\n"
+        f"      PDOP: {record.pdop:.2f}  HDOP: {record.hdop:.2f}  VDOP: {record.vdop:.2f}\n\n"
+    )
+
+
+def _format_vtg(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      航向: {record.course:.1f}°  磁航向: {record.course_magnetic:.1f}°\n"
+        f"      速度: {record.speed:.2f} km/h\n\n"
+    )
+
+
+def _format_zda(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      时间: {record.year:04d}-{record.month:02d}-{record.day:02d} {format_time(record.time)} UTC\n"
+        f"      时区: {record.zone_hours:+03d}:{abs(record.zone_minutes):02d}\n\n"
+    )
+
+
+def _format_gst(record, raw: str) -> str:
+    return (
+        f"原始: {raw}\n"
+        f"解析: [{record.type}]\n"
+        f"      时间: {format_time(record.time)}  RMS: {record.rms:.3f}\n"
+        f"      误差椭圆: {record.major:.3f} / {record.minor:.3f} m, {record.orientation:.1f}°\n"
+        f"      标准差: 纬度 {record.lat_error:.3f} 经度 {record.lon_error:.3f} 高度 {record.alt_error:.3f} m\n\n"
+    )
+
+
+def _format_fields(record, raw: str) -> str:
+    """没有注册格式化函数的记录：NamedTuple按字段逐行显示，其他对象用repr"""
+    if hasattr(record, '_asdict'):
+        fields = "".join(f"      {k}: {v}\n" for k, v in record._asdict().items() if k not in ('raw', 'type'))
+    else:
+        fields = f"      {record!r}\n"
+    return f"原始: {raw}\n解析: [{getattr(record, 'type', '?')}]\n{fields}\n"
+
+
+# 语句类型(去掉发送方标识，如b'RMC') -> 解码函数；所有已注册的解码器
+_decoders = {}
+# 热路径使用的分发表，只含启用的语句类型
+_enabled = {}
+# 记录类型 -> 格式化函数
+_formatters = {}
+# 语句头bytes -> str，发送方和类型的组合数量很少，缓存后不必每条语句都decode
+_headers = {}
+
+
+def _sentence_key(sentence_type) -> bytes:
+    key = sentence_type.encode('ascii') if isinstance(sentence_type, str) else sentence_type
+    return key.upper()
+
+
+def register_decoder(sentence_type, decoder, formatter=None, record_type=None, enabled: bool = True):
+    """注册（或替换）一种语句的解码器
+
+    sentence_type: 不含发送方标识的语句类型，如'RMC'；专有语句写完整语句头，如'PUBX'
+    decoder(parts, raw, header): 返回一条记录（需有raw、type、valid、status属性），返回None表示丢弃
+    formatter(record, raw_text): 显示文本；record_type为该解码器返回的记录类，二者同时给出时生效
+    """
+    key = _sentence_key(sentence_type)
+    _decoders[key] = decoder
+    if formatter is not None and record_type is not None:
+        register_formatter(record_type, formatter)
+    set_enabled(key, enabled)
+
+
+def register_formatter(record_type, formatter):
+    """为一种记录类注册显示格式化函数 formatter(record, raw_text) -> str"""
+    _formatters[record_type] = formatter
+
+
+def set_enabled(sentence_type, enabled: bool = True):
+    """启用或停用一种已注册的语句类型；停用的类型在解析时和未知语句一样直接跳过"""
+    key = _sentence_key(sentence_type)
+    if enabled:
+        _enabled[key] = _decoders[key]
+    else:
+        _enabled.pop(key, None)
+
+
+def enabled_sentences() -> list:
+    return sorted(k.decode('ascii') for k in _enabled)
+
+
+def registered_sentences() -> list:
+    return sorted(k.decode('ascii') for k in _decoders)
+
+
+def decoder_table(sentence_types) -> dict:
+    """只含指定语句类型的分发表，传给parse_nmea_lines(decoders=...)时不影响全局的启用设置"""
+    return {key: _decoders[key] for key in map(_sentence_key, sentence_types)}
+
+
+for _key, _decoder, _formatter, _record_type in (
+        ('RMC', NMEAParser.parse_rmc, _format_rmc, RMCFix),
+        ('GGA', NMEAParser.parse_gga, _format_gga, GGAFix),
+        ('GSV', NMEAParser.parse_gsv, _format_gsv, GSVRecord),
+        ('GSA', NMEAParser.parse_gsa, _format_gsa, GSARecord),
+        ('VTG', NMEAParser.parse_vtg, _format_vtg, VTGRecord),
+        ('ZDA', NMEAParser.parse_zda, _format_zda, ZDARecord),
+        ('GST', NMEAParser.parse_gst, _format_gst, GSTRecord)):
+    register_decoder(_key, _decoder, _formatter, _record_type)
+
+
+def parse_nmea_lines(lines, decoders: dict = None) -> list:
+    """解析完整的NMEA语句，返回记录列表
+
+    按语句类型查分发表（默认为全局启用的类型），发送方标识(GN/GP/BD/GL/GA...)不参与查找；
+    未启用或未知的语句只花一次查表。
+    """
+    if decoders is None:
+        decoders = _enabled
+    records = []
+    for line in lines:
+        comma = line.find(b',')
+        if comma < 4 or line[0] != 36:  # '$'
+            continue
+        header = line[1:comma]
+        # 标准语句为2字符发送方 + 类型，专有语句('P'开头)以完整语句头注册
+        decoder = decoders.get(header if header[0] == 80 else header[2:])
+        if decoder is None:
+            continue
+        star = line.rfind(b'*', comma)
+        name = _headers.get(header)
+        if name is None:
+            name = _headers[header] = header.decode('ascii', errors='replace')
+        record = decoder((line[:star] if star > 0 else line).split(b','), line, name)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def format_record(record) -> str:
+    """把一条解析记录格式化为显示文本，只在真正显示时调用"""
+    raw = record.raw.decode('ascii', errors='replace')
+    if not record.valid:
+        return f"原始: {raw}\n解析: [{record.type}] {record.status or '无效数据'}\n\n"
+    return _formatters.get(type(record), _format_fields)(record, raw)
@@ -0,0 +1,349 @@
+import select
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from .config import SerialConfig
+from .framer import NMEAFramer
+from .parser import parse_nmea_lines
+from .stats import PortStats
+
+
+def connection_error_message(e: serial.SerialException) -> str:
+    error_msg = f"串口连接错误: {str(e)}"
+    if "PermissionError" in str(e):
+        error_msg = "串口已被占用"
+    elif "FileNotFoundError" in str(e):
+        error_msg = "串口不存在"
+    return error_msg
+
+
+def get_available_ports() -> list:
+    """获取所有可用串口"""
+    try:
+        # 直接调用 comports() 获取最新列表
+        ports = [port.device for port in serial.tools.list_ports.comports()]
+        return sorted(ports)  # 返回排序后的端口列表
+    except Exception as e:
+        print(f"获取串口列表错误: {str(e)}")
+        return []
+
+
+class SerialReader:
+    """串口读取循环：打开串口、阻塞读取、分帧解析，并按时间/大小把数据合并成批次
+
+    每个批次通过 on_batch(data, chunks, records) 交给调用方：
+      data    批次内的原始字节
+      chunks  [(time.monotonic()接收时间, 批次内偏移), ...]，每次读取一项
+      records 批次内解析出的NMEA记录（parse_records为假时为空列表）
+    sinks中的每个Sink（见sinks.py）也会收到每个批次，并在串口打开/关闭时收到open()/close()。
+    背压（max_pending_batches）只限制交给on_batch（显示）的批次，Sink（保存、转发）总是收到全部数据。
+    错误通过 on_error(message) 报告。回调都在读取线程中调用。
+    可以在任意线程中调用run()阻塞运行，也可以由SerialReactor以非阻塞方式驱动。
+    """
+
+    # 批量发送：数据先在读取线程中合并，满足任一条件时一次性交出
+    batch_interval = 0.016  # 批次最长等待时间（秒）
+    batch_max_bytes = 64 * 1024  # 批次达到该字节数立即交出
+    max_coalesced_bytes = 1024 * 1024  # 背压期间on_batch最多合并的字节数，超过后不再交给on_batch
+    max_error_count = 5  # 连续出错次数达到该值后停止读取
+
+    def __init__(self, config: SerialConfig, on_batch=None, on_error=None, sinks=()):
+        self.config = config
+        self.on_batch = on_batch
+        self.on_error = on_error
+        self.sinks = list(sinks)
+        # 是否分帧解析：bool，或返回bool的函数（每次读取时判断，没有使用方时跳过解析）
+        self.parse_records = True
+        self.serial_port = None
+        self.is_connected = False
+        self.should_stop = False
+        self.framer = NMEAFramer()  # 每个串口独立的分帧状态
+        self.stats = PortStats()  # 吞吐量/读取大小/解析时间等统计，开销很小，始终开启
+        # 批次状态，只在读取线程（或反应器线程）中访问
+        self._batch_data = bytearray()
+        self._batch_chunks = []
+        self._batch_records = []
+        self.batch_deadline = None  # 当前批次的截止时间，没有待交出的数据时为None
+        # 背压：on_batch的下游未处理的批次数达到上限后暂停交给on_batch，None表示不限制
+        self.max_pending_batches = None
+        self.emitted_batches = 0
+        self.consumed_batches = 0  # 由下游调用batch_consumed()累加
+        self.dropped_batches = 0  # 因背压合并过多而没有交给on_batch的批次数（Sink已收到）
+        # 已交给Sink、因背压尚未交给on_batch的数据
+        self._held_data = bytearray()
+        self._held_chunks = []
+        self._held_records = []
+        self.stopped = threading.Event()  # 反应器模式下串口关闭后置位
+        self.stopped.set()
+
+    def open(self, timeout: float = None):
+        """打开串口，失败时抛出serial.SerialException"""
+        self.serial_port = serial.Serial(
+            port=self.config.port,
+            baudrate=self.config.baudrate,
+            bytesize=self.config.bytesize,
+            parity=self.config.parity,
+            stopbits=self.config.stopbits,
+            timeout=self.config.timeout if timeout is None else timeout
+        )
+        self.is_connected = True
+        for sink in self.sinks:
+            sink.open()
+
+    def close(self):
+        """交出剩余的批次（不受背压限制）并关闭串口"""
+        try:
+            self.flush_batch(force=True)
+            if self.serial_port and self.serial_port.is_open:
+                self.serial_port.close()
+        finally:
+            if self.is_connected:
+                for sink in self.sinks:
+                    sink.close()
+            self.is_connected = False
+
+    def _error(self, message: str):
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            print(message)
+
+    def deliver(self, data: bytes):
+        """把读到的数据并入当前批次，批次满时立即交出"""
+        now = time.monotonic()
+        if not self._batch_data:
+            self.batch_deadline = now + self.batch_interval
+        self._batch_chunks.append((now, len(self._batch_data)))
+        self._batch_data += data
+        self.stats.record_read(len(data), now)
+        # 分帧和解析在读取线程中完成，使用方只负责显示/保存
+        parse = self.parse_records() if callable(self.parse_records) else self.parse_records
+        if parse:
+            start = time.perf_counter()
+            records = parse_nmea_lines(self.framer.feed(data))
+            records.extend(self.framer.take_frames())  # UBX/RTCM3二进制帧与语句记录一起交出
+            self.stats.record_parse(time.perf_counter() - start, len(records))
+            self._batch_records.extend(records)
+        if len(self._batch_data) >= self.batch_max_bytes:
+            self.flush_batch()
+
+    def flush_batch_if_due(self):
+        if self.batch_deadline is not None and time.monotonic() >= self.batch_deadline:
+            self.flush_batch()
+
+    def flush_batch(self, force: bool = False):
+        """交出当前批次：Sink每批都收到；on_batch的下游积压时继续合并，合并过多则丢弃（force时不检查背压）"""
+        if self._batch_data:
+            data = bytes(self._batch_data)
+            chunks = self._batch_chunks
+            records = self._batch_records
+            self._reset_batch()
+            for sink in self.sinks:
+                sink.handle(data, chunks, records)
+            if self.on_batch is None:
+                return
+            if not self._held_data and (force or not self._backpressured()):
+                self.emitted_batches += 1
+                self.on_batch(data, chunks, records)
+                return
+            offset = len(self._held_data)
+            self._held_data += data
+            self._held_chunks.extend((t, offset + o) for t, o in chunks)
+            self._held_records.extend(records)
+
+        if not self._held_data:
+            return
+        if not force and self._backpressured():
+            if len(self._held_data) >= self.max_coalesced_bytes:
+                self.dropped_batches += 1
+                self._reset_held()
+            elif self.batch_deadline is None:
+                self.batch_deadline = time.monotonic() + self.batch_interval
+            return
+
+        data = bytes(self._held_data)
+        chunks = self._held_chunks
+        records = self._held_records
+        self._reset_held()
+        self.emitted_batches += 1
+        self.on_batch(data, chunks, records)
+
+    def _backpressured(self) -> bool:
+        return self.max_pending_batches is not None and self.queued_batches >= self.max_pending_batches
+
+    def _reset_held(self):
+        self._held_data = bytearray()
+        self._held_chunks = []
+        self._held_records = []
+
+    def _reset_batch(self):
+        self._batch_data = bytearray()
+        self._batch_chunks = []
+        self._batch_records = []
+        self.batch_deadline = None
+
+    @property
+    def pending_bytes(self) -> int:
+        """尚未交出的字节数（包括已交给Sink、尚未交给on_batch的数据）"""
+        return len(self._batch_data) + len(self._held_data)
+
+    @property
+    def link_stats(self) -> dict:
+        """链路质量：校验通过、校验和错误、被截断的语句数，二进制帧数（只统计经过分帧的数据）"""
+        return self.framer.link_stats
+
+    def batch_consumed(self):
+        """下游每处理完一个批次调用一次"""
+        self.consumed_batches += 1
+
+    @property
+    def queued_batches(self) -> int:
+        """已交出但下游尚未处理的批次数"""
+        return self.emitted_batches - self.consumed_batches
+
+    def run(self):
+        """阻塞运行读取循环，直到stop()或连续出错；串口未打开时先打开"""
+        try:
+            if not self.is_connected:
+                self.open()
+
+            error_count = 0  # 错误计数器
+
+            while not self.should_stop and self.serial_port and self.serial_port.is_open:
+                try:
+                    # 阻塞等待数据到达，到达后一次取走驱动缓冲区中的全部数据；
+                    # 有未交出的批次时最多等到它的截止时间，保证批次按时交出
+                    wait = None
+                    if self.batch_deadline is not None:
+                        wait = max(0.0, self.batch_deadline - time.monotonic())
+                    data = self.read_available(wait)
+                    if data:
+                        self.deliver(data)
+                        error_count = 0  # 重置错误计数器
+                    self.flush_batch_if_due()
+
+                except serial.SerialException as e:
+                    if self.should_stop:
+                        break
+                    error_count += 1
+                    if error_count >= self.max_error_count:
+                        self._error(f"串口读取错误: {str(e)} (连续错误{error_count}次)")
+                        break
+                    # 短暂延迟后重试
+                    time.sleep(0.1)
+
+                except OSError as e:
+                    # 处理系统资源错误
+                    if e.errno == 22:  # 系统资源不足
+                        self._error("系统资源不足，正在尝试恢复...")
+                        time.sleep(0.5)  # 等待系统恢复
+                        error_count += 1
+                        if error_count >= self.max_error_count:
+                            break
+                    else:
+                        self._error(f"系统错误: {str(e)}")
+                        break
+
+                except Exception as e:
+                    error_count += 1
+                    if error_count >= self.max_error_count:
+                        self._error(f"发生错误: {str(e)}")
+                        break
+                    time.sleep(0.1)  # 短暂延迟后重试
+
+        except serial.SerialException as e:
+            self._error(connection_error_message(e))
+        except Exception as e:
+            self._error(f"未知错误: {str(e)}")
+        finally:
+            self.close()
+
+    def read_available(self, wait: float = None) -> bytes:
+        """阻塞读取：最多等待wait秒（None为串口的读超时config.timeout），有数据到达后立即返回当前可读的全部字节
+
+        串口的读超时打开后不再修改：pyserial每次修改超时都要重新配置串口（POSIX上tcsetattr，Windows上SetCommTimeouts）。
+        需要等得比读超时短时，先在串口的文件描述符上select，没有文件描述符的平台（Windows）查询in_waiting。
+        """
+        port = self.serial_port
+        waiting = port.in_waiting
+        self.stats.record_queue(waiting)
+        if not waiting and wait is not None and not self._wait_readable(wait):
+            return b''
+        data = port.read(max(1, waiting))
+        if data:
+            remaining = port.in_waiting
+            if remaining:
+                data += port.read(remaining)
+        return data
+
+    def _wait_readable(self, timeout: float) -> bool:
+        """等待串口有数据可读，最多timeout秒；超时或被stop()唤醒时返回False"""
+        port = self.serial_port
+        try:
+            fd = port.fileno()
+        except AttributeError:
+            fd = None
+        if fd is not None:
+            abort = getattr(port, 'pipe_abort_read_r', None)  # pyserial的cancel_read()向它写入以唤醒读取
+            ready, _, _ = select.select([fd] if abort is None else [fd, abort], [], [], timeout)
+            return fd in ready
+        deadline = time.monotonic() + timeout
+        while not self.should_stop:
+            if port.in_waiting:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, 0.001))
+        return False
+
+    def stop(self):
+        """请求停止并唤醒阻塞中的读取（反应器模式下由调用方从反应器中移除）"""
+        self.should_stop = True
+        port = self.serial_port
+        if port is not None and port.is_open and hasattr(port, 'cancel_read'):
+            try:
+                port.cancel_read()
+            except Exception:
+                pass
+
+    # 以下三个方法只在反应器模式下由SerialReactor线程调用
+    def reactor_open(self) -> bool:
+        """以非阻塞方式打开串口，失败时报告错误"""
+        try:
+            self.open(timeout=0)
+            return True
+        except serial.SerialException as e:
+            self._error(connection_error_message(e))
+        except Exception as e:
+            self._error(f"未知错误: {str(e)}")
+        return False
+
+    def reactor_read(self) -> bool:
+        """串口可读时调用，返回False表示应将该串口移出反应器"""
+        if self.should_stop:
+            return False
+        try:
+            waiting = self.serial_port.in_waiting
+            self.stats.record_queue(waiting)
+            data = self.serial_port.read(waiting or 1)
+        except serial.SerialException as e:
+            self._error(f"串口读取错误: {str(e)}")
+            return False
+        except Exception as e:
+            self._error(f"发生错误: {str(e)}")
+            return False
+        if data:
+            self.deliver(data)
+        self.flush_batch_if_due()
+        return True
+
+    def reactor_close(self):
+        """关闭串口并通知等待者"""
+        try:
+            self.close()
+        finally:
+            self.stopped.set()
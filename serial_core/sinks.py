@@ -0,0 +1,185 @@
+import gzip
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+_STOP = object()
+
+
+class Sink:
+    """批次接收端基类
+
+    SerialReader每交出一个批次调用一次handle()，在读取线程中执行，不应阻塞；
+    串口打开后调用open()，关闭后调用close()（每次重连都会重新调用）。
+    """
+
+    def open(self):
+        pass
+
+    def handle(self, data: bytes, chunks: list, records: list):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def open_log(path: str):
+    """以二进制方式打开FileSink写出的日志用于读取，.gz/.zst按扩展名解压（.zst需要zstandard）"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        try:
+            import zstandard  # 只有.zst日志需要
+        except ImportError:
+            raise ValueError("读取.zst日志需要安装zstandard") from None
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+class FileSink(Sink):
+    """自动保存：把批次交给共用的LogWriter后台线程写盘（log_writer.LogWriter或接口相同的对象）"""
+
+    def __init__(self, log_writer, key, log_dir: str, port_name: str, log_format: str = 'text',
+                 max_file_size: int = 500 * 1024 * 1024, compression: str = 'none',
+                 rotate_interval: float = None):
+        self.log_writer = log_writer
+        self.key = key
+        self.log_args = (log_dir, port_name, log_format, max_file_size, compression, rotate_interval)
+        self.dropped_writes = 0  # 写入队列已满而未保存的批次数
+
+    def open(self) -> bool:
+        """请求写入线程创建新文件，返回请求是否已提交（写入线程未运行时为False）"""
+        return self.log_writer.open(self.key, *self.log_args)
+
+    def handle(self, data: bytes, chunks: list, records: list):
+        if not self.log_writer.write(self.key, data, chunks):
+            self.dropped_writes += 1
+
+    def close(self):
+        self.log_writer.close_log(self.key)
+
+
+class DisplayQueueSink(Sink):
+    """显示队列：保存最近的解析记录（和可选的原始数据），由显示端按自己的节奏取走
+
+    超过maxlen时丢弃最旧的条目，读取线程不会因为显示端变慢而阻塞或占用无限内存。
+    """
+
+    def __init__(self, maxlen: int = 5000, keep_raw: bool = False):
+        self.records = deque(maxlen=maxlen)
+        self.raw = deque(maxlen=maxlen) if keep_raw else None
+        self.dropped = 0  # 被挤出队列的记录数（近似值）
+
+    def handle(self, data: bytes, chunks: list, records: list):
+        overflow = len(self.records) + len(records) - self.records.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.records.extend(records)
+        if self.raw is not None:
+            self.raw.append(data)
+
+    def drain(self) -> list:
+        """取走当前全部记录（可在任意线程中调用）"""
+        items = []
+        try:
+            while True:
+                items.append(self.records.popleft())
+        except IndexError:
+            return items
+
+    def drain_raw(self) -> bytes:
+        if self.raw is None:
+            return b''
+        chunks = []
+        try:
+            while True:
+                chunks.append(self.raw.popleft())
+        except IndexError:
+            return b''.join(chunks)
+
+
+class UDPForwarder(Sink):
+    """把原始数据按批次用UDP转发出去；非阻塞发送，发送失败只计数"""
+
+    max_datagram = 65507
+
+    def __init__(self, host: str, port: int):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+
+    def handle(self, data: bytes, chunks: list, records: list):
+        view = memoryview(data)
+        for i in range(0, len(view), self.max_datagram):
+            part = view[i:i + self.max_datagram]
+            try:
+                self.sent_bytes += self.sock.sendto(part, self.address)
+            except OSError:
+                self.dropped_bytes += len(part)
+
+    def shutdown(self):
+        self.sock.close()
+
+
+class TCPForwarder(Sink, threading.Thread):
+    """把原始数据转发到TCP服务器
+
+    连接和发送都在独立线程中进行（调用start()启动），读取线程只把批次放入有界队列；
+    队列满（对端或网络太慢）时丢弃并计数，连接断开后每reconnect_interval秒重连。
+    """
+
+    def __init__(self, host: str, port: int, max_queue: int = 1024, reconnect_interval: float = 5.0):
+        threading.Thread.__init__(self, name=f"TCPForwarder-{host}:{port}", daemon=True)
+        self.address = (host, port)
+        self.reconnect_interval = reconnect_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sock = None
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+
+    def handle(self, data: bytes, chunks: list, records: list):
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped_bytes += len(data)
+
+    def shutdown(self, timeout: float = 2.0):
+        """发送完队列中的数据后结束线程"""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join(timeout)
+
+    def _connect(self) -> bool:
+        try:
+            self._sock = socket.create_connection(self.address, timeout=self.reconnect_interval)
+            return True
+        except OSError:
+            self._sock = None
+            return False
+
+    def run(self):
+        retry_at = 0.0
+        while True:
+            data = self._queue.get()
+            if data is _STOP:
+                break
+            if self._sock is None:
+                # 未连接期间到达的数据直接丢弃，避免重连成功后发送大量过期数据
+                if time.monotonic() < retry_at or not self._connect():
+                    retry_at = max(retry_at, time.monotonic() + self.reconnect_interval)
+                    self.dropped_bytes += len(data)
+                    continue
+            try:
+                self._sock.sendall(data)
+                self.sent_bytes += len(data)
+            except OSError:
+                self.dropped_bytes += len(data)
+                self._sock.close()
+                self._sock = None
+                retry_at = time.monotonic() + self.reconnect_interval
+        if self._sock is not None:
+            self._sock.close()
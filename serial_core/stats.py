@@ -0,0 +1,165 @@
+import csv
+import json
+import os
+import time
+
+# 直方图按2的幂分桶：第k桶为 [2^(k-1), 2^k)，第0桶为0；只需一次bit_length，开销可以常开
+_BUCKETS = 24
+
+
+def _bucket(value: int) -> int:
+    return min(value.bit_length(), _BUCKETS - 1)
+
+
+def _bucket_label(k: int) -> str:
+    if k == 0:
+        return "0"
+    if k == _BUCKETS - 1:
+        return f">={1 << (k - 1)}"
+    return f"{1 << (k - 1)}-{(1 << k) - 1}"
+
+
+def _histogram(counts: list) -> dict:
+    return {_bucket_label(k): n for k, n in enumerate(counts) if n}
+
+
+def _percentile(counts: list, q: float) -> int:
+    """按桶的上界估计分位数"""
+    total = sum(counts)
+    if not total:
+        return 0
+    target = total * q
+    seen = 0
+    for k, n in enumerate(counts):
+        seen += n
+        if seen >= target:
+            return (1 << k) - 1 if k else 0
+    return (1 << (_BUCKETS - 1)) - 1
+
+
+class PortStats:
+    """一个串口的吞吐量和延迟统计
+
+    读取线程调用record_read/record_parse，GUI线程调用record_latency/record_display，
+    都只做整数累加（GIL保证单个操作的原子性），读取方随时调用snapshot()。
+    速率按最近一个完整的统计窗口（window秒）计算，不依赖调用snapshot()的频率。
+    """
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.bytes = 0
+        self.reads = 0
+        self.records = 0
+        self.read_sizes = [0] * _BUCKETS  # 每次读取的字节数
+        self.max_read = 0
+        self.queue_high_water = 0  # 读取时驱动缓冲区中已有的最大字节数（in_waiting）
+        self.parse_time = 0.0
+        self.parse_max = 0.0
+        self.latency_ms = [0] * _BUCKETS  # 读到数据到显示出来的时间（毫秒）
+        self.display_count = 0
+        self.display_time = 0.0
+        self.display_max = 0.0
+        self.bytes_per_s = 0.0
+        self.records_per_s = 0.0
+        self._window_start = self.started
+        self._window_bytes = 0
+        self._window_records = 0
+
+    def record_read(self, size: int, now: float):
+        """一次读取，now为time.monotonic()"""
+        self.bytes += size
+        self.reads += 1
+        self.read_sizes[_bucket(size)] += 1
+        if size > self.max_read:
+            self.max_read = size
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.bytes_per_s = (self.bytes - self._window_bytes) / elapsed
+            self.records_per_s = (self.records - self._window_records) / elapsed
+            self._window_start = now
+            self._window_bytes = self.bytes
+            self._window_records = self.records
+
+    def record_queue(self, waiting: int):
+        if waiting > self.queue_high_water:
+            self.queue_high_water = waiting
+
+    def record_parse(self, seconds: float, records: int):
+        self.records += records
+        self.parse_time += seconds
+        if seconds > self.parse_max:
+            self.parse_max = seconds
+
+    def record_latency(self, seconds: float):
+        self.latency_ms[_bucket(int(seconds * 1000))] += 1
+
+    def record_display(self, seconds: float):
+        self.display_count += 1
+        self.display_time += seconds
+        if seconds > self.display_max:
+            self.display_max = seconds
+
+    def snapshot(self) -> dict:
+        """当前统计；标量字段可直接写入CSV，*_hist为直方图（只写入JSON）"""
+        now = time.monotonic()
+        # 长时间没有数据时速率归零，而不是停在最后一个窗口的值
+        idle = now - self._window_start >= 2 * self.window
+        return {
+            'time': round(time.time(), 3),
+            'uptime_s': round(now - self.started, 3),
+            'bytes': self.bytes,
+            'reads': self.reads,
+            'records': self.records,
+            'bytes_per_s': 0.0 if idle else round(self.bytes_per_s, 1),
+            'records_per_s': 0.0 if idle else round(self.records_per_s, 1),
+            'read_size_avg': round(self.bytes / self.reads, 1) if self.reads else 0.0,
+            'read_size_max': self.max_read,
+            'queue_high_water': self.queue_high_water,
+            'parse_ms_avg': round(self.parse_time / self.reads * 1000, 3) if self.reads else 0.0,
+            'parse_ms_max': round(self.parse_max * 1000, 3),
+            'latency_ms_p50': _percentile(self.latency_ms, 0.5),
+            'latency_ms_p99': _percentile(self.latency_ms, 0.99),
+            'display_ms_avg': round(self.display_time / self.display_count * 1000, 3) if self.display_count else 0.0,
+            'display_ms_max': round(self.display_max * 1000, 3),
+            'read_size_hist': _histogram(self.read_sizes),
+            'latency_ms_hist': _histogram(self.latency_ms),
+        }
+
+
+def format_stats(snapshot: dict) -> str:
+    """详情窗口中显示的多行文本"""
+    s = snapshot
+    return (f"吞吐: {s['bytes_per_s']:.0f} B/s  {s['records_per_s']:.1f} 语句/s  "
+            f"共 {s['bytes']} 字节 / {s['records']} 条 / {s['reads']} 次读取\n"
+            f"读取大小: 平均 {s['read_size_avg']:.0f}  最大 {s['read_size_max']}  "
+            f"驱动缓冲区最高 {s['queue_high_water']} 字节\n"
+            f"解析: 平均 {s['parse_ms_avg']:.3f} ms/次  最长 {s['parse_ms_max']:.3f} ms  "
+            f"显示更新: 平均 {s['display_ms_avg']:.3f} ms  最长 {s['display_ms_max']:.3f} ms\n"
+            f"读取到显示延迟: P50 <= {s['latency_ms_p50']} ms  P99 <= {s['latency_ms_p99']} ms  "
+            f"分布(ms): {' '.join(f'{k}:{n}' for k, n in s['latency_ms_hist'].items()) or '-'}")
+
+
+class StatsExporter:
+    """把统计快照追加到文件：.csv每行一个快照（只含标量字段），其他扩展名为JSON Lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = path.lower().endswith('.csv')
+
+    def write(self, port: str, snapshot: dict):
+        row = {'port': port, **snapshot}
+        if not self.csv:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            return
+        row = {k: v for k, v in row.items() if not isinstance(v, dict)}
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
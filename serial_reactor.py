@@ -0,0 +1,116 @@
+import os
+import selectors
+import threading
+import time
+
+from PyQt5.QtCore import QThread
+
+
+class SerialReactor(QThread):
+    """单线程串口I/O反应器
+
+    用selectors(Linux下为epoll)在一个线程里服务所有已打开的串口。每个串口仍由一个
+    SerialReceiver代表，data_received / error_occurred 信号不变，只是不再各自占用线程；
+    反应器直接驱动其中的SerialReader。
+    没有数据时线程一直阻塞在select上，不会周期性唤醒（只有存在未发送的批次时才按批次截止时间唤醒）。
+    仅支持POSIX系统。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._selector = selectors.DefaultSelector()
+        # 自唤醒管道：其他线程投递命令后写一个字节，让select立即返回
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self._commands = []
+        self._lock = threading.Lock()
+        self._registered = {}  # SerialReader -> fd
+        self._should_stop = False
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Windows的串口句柄无法被select，只能使用每串口一个线程的模式"""
+        return os.name == 'posix'
+
+    def add_receiver(self, receiver):
+        """由反应器线程打开串口并开始监听，receiver为SerialReader"""
+        self._post('add', receiver)
+        if not self.isRunning():
+            self.start()
+
+    def remove_receiver(self, receiver):
+        """停止监听并关闭串口"""
+        self._post('remove', receiver)
+
+    def stop(self):
+        """关闭所有串口并结束线程"""
+        self._should_stop = True
+        self._wakeup()
+        if self.isRunning():
+            self.wait(2000)
+
+    def _post(self, action, receiver):
+        with self._lock:
+            self._commands.append((action, receiver))
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except BlockingIOError:
+            pass  # 管道已满，说明已经有未处理的唤醒
+
+    def _process_commands(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            commands, self._commands = self._commands, []
+
+        for action, receiver in commands:
+            if action == 'add':
+                if receiver in self._registered:
+                    continue
+                if self._should_stop or receiver.should_stop or not receiver.reactor_open():
+                    receiver.reactor_close()
+                    continue
+                fd = receiver.serial_port.fileno()
+                self._selector.register(fd, selectors.EVENT_READ, receiver)
+                self._registered[receiver] = fd
+            elif receiver in self._registered:
+                self._detach(receiver)
+            else:
+                receiver.reactor_close()
+
+    def _detach(self, receiver):
+        fd = self._registered.pop(receiver)
+        self._selector.unregister(fd)
+        receiver.reactor_close()
+
+    def _next_timeout(self):
+        """距离最早的批次截止时间还有多久，没有待发送批次时无限等待"""
+        deadlines = [r.batch_deadline for r in self._registered if r.batch_deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def run(self):
+        """反应器主循环"""
+        while not self._should_stop:
+            for key, _ in self._selector.select(self._next_timeout()):
+                if key.data is None:
+                    self._process_commands()
+                elif key.data in self._registered and not key.data.reactor_read():
+                    self._detach(key.data)
+            for receiver in self._registered:
+                receiver.flush_batch_if_due()
+
+        # 退出前关闭所有仍在监听的串口
+        self._process_commands()
+        for receiver in list(self._registered):
+            self._detach(receiver)
@@ -1,280 +1,139 @@
-import serial
-import serial.tools.list_ports
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
-from dataclasses import dataclass
-
-from PyQt5.QtWidgets import QCheckBox, QGroupBox, QHBoxLayout
-
-
-@dataclass
-class SerialConfig:
-    port: str
-    baudrate: int = 9600
-    bytesize: int = 8
-    parity: str = 'N'
-    stopbits: float = 1
-    timeout: float = 1
-
-
-class NMEAParser:
-    """NMEA协议解析器"""
-
-    @staticmethod
-    def parse_gnrmc(parts):
-        """解析GNRMC语句"""
-        try:
-            # 时间解析
-            time_str = parts[1] if len(parts) > 1 and parts[1] else None
-            time = f"{time_str[0:2]}:{time_str[2:4]}:{time_str[4:6]}" if time_str and len(time_str) >= 6 else "无效时间"
-
-            # 状态检查
-            status = parts[2] if len(parts) > 2 else 'V'
-            if status != 'A':
-                return {
-                    'type': 'GNRMC',
-                    'time': time,
-                    'valid': False,
-                    'status': '无效数据'
-                }
-
-            # 日期解析
-            date_str = parts[9] if len(parts) > 9 and parts[9] else None
-            date = f"20{date_str[4:6]}-{date_str[2:4]}-{date_str[0:2]}" if date_str and len(date_str) >= 6 else "无效日期"
-
-            # 经纬度解析
-            lat = float(parts[3][:2]) + float(parts[3][2:]) / 60.0 if len(parts) > 3 and parts[3] else 0.0
-            if len(parts) > 4 and parts[4] == 'S':
-                lat = -lat
-
-            lon = float(parts[5][:3]) + float(parts[5][3:]) / 60.0 if len(parts) > 5 and parts[5] else 0.0
-            if len(parts) > 6 and parts[6] == 'W':
-                lon = -lon
-
-            speed = float(parts[7]) if len(parts) > 7 and parts[7] else 0.0  # 节
-            course = float(parts[8]) if len(parts) > 8 and parts[8] else 0.0  # 度
-
-            return {
-                'type': 'GNRMC',
-                'time': time,
-                'date': date,
-                'latitude': lat,
-                'longitude': lon,
-                'speed': speed * 1.852,  # 转换为km/h
-                'course': course,
-                'valid': True
-            }
-        except Exception:
-            return {
-                'type': 'GNRMC',
-                'valid': False,
-                'status': '解析错误'
-            }
-
-    @staticmethod
-    def parse_gngga(parts):
-        """解析GNGGA语句"""
-        try:
-            # 时间解析
-            time_str = parts[1] if len(parts) > 1 and parts[1] else None
-            time = f"{time_str[0:2]}:{time_str[2:4]}:{time_str[4:6]}" if time_str and len(time_str) >= 6 else "无效时间"
-
-            # 定位质量
-            quality = int(parts[6]) if len(parts) > 6 and parts[6] else 0
-            if quality == 0:
-                return {
-                    'type': 'GNGGA',
-                    'time': time,
-                    'valid': False,
-                    'status': '无效定位'
-                }
-
-            # 经纬度解析
-            lat = float(parts[2][:2]) + float(parts[2][2:]) / 60.0 if len(parts) > 2 and parts[2] else 0.0
-            if len(parts) > 3 and parts[3] == 'S':
-                lat = -lat
-
-            lon = float(parts[4][:3]) + float(parts[4][3:]) / 60.0 if len(parts) > 4 and parts[4] else 0.0
-            if len(parts) > 5 and parts[5] == 'W':
-                lon = -lon
-
-            satellites = int(parts[7]) if len(parts) > 7 and parts[7] else 0
-            hdop = float(parts[8]) if len(parts) > 8 and parts[8] else 0.0
-            altitude = float(parts[9]) if len(parts) > 9 and parts[9] else 0.0
-
-            return {
-                'type': 'GNGGA',
-                'time': time,
-                'latitude': lat,
-                'longitude': lon,
-                'quality': quality,
-                'satellites': satellites,
-                'hdop': hdop,
-                'altitude': altitude,
-                'valid': True
-            }
-        except Exception:
-            return {
-                'type': 'GNGGA',
-                'valid': False,
-                'status': '解析错误'
-            }
+import codecs
+import os
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from replay import ReplayReader
+from serial_core import (NMEAFramer, PortStats, SerialConfig, SerialReader, format_record, format_stats,
+                         get_available_ports, parse_nmea_lines)
+
 
 class SerialReceiver(QThread):
-    data_received = pyqtSignal(str)  # 数据接收信号
+    """SerialReader的Qt适配：在QThread（或共享的SerialReactor）中运行读取循环，批次以信号发出"""
+    raw_data_received = pyqtSignal(bytes)  # 原始数据接收信号
+    # 带时间戳的原始数据：(批次数据, [(time.monotonic()接收时间, 批次内偏移), ...])，每次读取一项
+    timed_data_received = pyqtSignal(bytes, list)
+    data_received = pyqtSignal(str)  # 数据接收信号（UTF-8解码后的文本，仅在有连接时解码）
+    records_received = pyqtSignal(list)  # 解析结果信号：一个批次内的NMEA记录列表
     error_occurred = pyqtSignal(str)  # 错误发生信号
 
-    def __init__(self, config: SerialConfig, port_index: int):
+    def __init__(self, config: SerialConfig, port_index: int, reactor=None):
         super().__init__()
         self.config = config
         self.port_index = port_index
-        self.serial_port = None
-        self._is_connected = False
-        self._should_stop = False
+        self.reactor = reactor  # 可选的SerialReactor，设置后不再单独启动线程
+        self.reader = SerialReader(config, on_batch=self._emit_batch, on_error=self.error_occurred.emit)
+        # 只有解析结果信号被连接时才分帧解析
+        self.reader.parse_records = lambda: self.receivers(self.records_received) > 0
+        # 增量解码器：跨数据块的多字节字符不会被拆成替换字符
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    # 批次参数和背压状态保存在SerialReader中
+    @property
+    def batch_interval(self) -> float:
+        return self.reader.batch_interval
+
+    @batch_interval.setter
+    def batch_interval(self, value: float):
+        self.reader.batch_interval = value
+
+    @property
+    def max_pending_batches(self):
+        return self.reader.max_pending_batches
+
+    @max_pending_batches.setter
+    def max_pending_batches(self, value):
+        self.reader.max_pending_batches = value
+
+    @property
+    def dropped_batches(self) -> int:
+        return self.reader.dropped_batches
+
+    @property
+    def queued_batches(self) -> int:
+        """已发出但下游尚未处理的批次数"""
+        return self.reader.queued_batches
+
+    def batch_consumed(self):
+        """下游每处理完一个批次调用一次（raw_data_received / timed_data_received每批各发一次）"""
+        self.reader.batch_consumed()
+
+    @property
+    def serial_port(self):
+        return self.reader.serial_port
+
+    @property
+    def framer(self) -> NMEAFramer:
+        return self.reader.framer
+
+    @property
+    def stats(self) -> PortStats:
+        """吞吐量/延迟统计，见serial_core.stats"""
+        return self.reader.stats
+
+    def start(self, *args):
+        """启动接收：线程模式启动本线程，反应器模式注册到共享的反应器"""
+        if self.reactor is None:
+            super().start(*args)
+            return
+        self.reader.stopped.clear()
+        self.reactor.add_receiver(self.reader)
+
+    def isRunning(self):
+        if self.reactor is None:
+            return super().isRunning()
+        return not self.reader.stopped.is_set()
+
+    def wait(self, msecs=None):
+        if self.reactor is None:
+            return super().wait() if msecs is None else super().wait(msecs)
+        return self.reader.stopped.wait(None if msecs is None else msecs / 1000)
+
+    def _emit_batch(self, data: bytes, chunks: list, records: list):
+        """在读取线程中调用，只向已连接的信号发送"""
+        if self.receivers(self.raw_data_received) > 0:
+            self.raw_data_received.emit(data)
+        if self.receivers(self.timed_data_received) > 0:
+            self.timed_data_received.emit(data, chunks)
+        # 只有文本信号被连接时才解码
+        if self.receivers(self.data_received) > 0:
+            self.data_received.emit(self._decoder.decode(data))
+        if records:
+            self.records_received.emit(records)
 
     def run(self):
         """接收数据的线程循环"""
-        try:
-            self.serial_port = serial.Serial(
-                port=self.config.port,
-                baudrate=self.config.baudrate,
-                bytesize=self.config.bytesize,
-                parity=self.config.parity,
-                stopbits=self.config.stopbits,
-                timeout=self.config.timeout
-            )
-            self._is_connected = True
-
-            # 优化读取参数
-            read_chunk_size = 1024  # 每次读取1KB
-            max_read_per_loop = 8192  # 每次循环最多读取8KB
-            error_count = 0  # 错误计数器
-            max_error_count = 5  # 最大允许错误次数
-
-            while not self._should_stop and self.serial_port and self.serial_port.is_open:
-                try:
-                    # 增加短暂延迟，减少资源占用
-                    self.msleep(10)
-
-                    bytes_available = self.serial_port.in_waiting
-                    if bytes_available > 0:
-                        # 限制单次读取量
-                        bytes_to_read = min(bytes_available, max_read_per_loop, read_chunk_size)
-                        data = self.serial_port.read(bytes_to_read)
-
-                        # 高效解码
-                        try:
-                            text_data = data.decode('utf-8', errors='replace')
-                        except UnicodeDecodeError:
-                            text_data = data.decode('latin1')  # 更宽松的解码方式
-
-                        self.data_received.emit(text_data)
-                        error_count = 0  # 重置错误计数器
-                    else:
-                        # 没有数据时短暂休眠
-                        self.msleep(50)
-
-                except serial.SerialException as e:
-                    error_count += 1
-                    if error_count >= max_error_count:
-                        self.error_occurred.emit(f"串口读取错误: {str(e)} (连续错误{error_count}次)")
-                        break
-                    # 短暂延迟后重试
-                    self.msleep(100)
-
-                except OSError as e:
-                    # 处理系统资源错误
-                    if e.errno == 22:  # 系统资源不足
-                        self.error_occurred.emit("系统资源不足，正在尝试恢复...")
-                        self.msleep(500)  # 等待系统恢复
-                        error_count += 1
-                        if error_count >= max_error_count:
-                            break
-                    else:
-                        self.error_occurred.emit(f"系统错误: {str(e)}")
-                        break
-
-                except Exception as e:
-                    error_count += 1
-                    if error_count >= max_error_count:
-                        self.error_occurred.emit(f"发生错误: {str(e)}")
-                        break
-                    self.msleep(100)  # 短暂延迟后重试
-
-        except serial.SerialException as e:
-            error_msg = f"串口连接错误: {str(e)}"
-            if "PermissionError" in str(e):
-                error_msg = "串口已被占用"
-            elif "FileNotFoundError" in str(e):
-                error_msg = "串口不存在"
-            self.error_occurred.emit(error_msg)
-        except Exception as e:
-            self.error_occurred.emit(f"未知错误: {str(e)}")
-        finally:
-            if self.serial_port and self.serial_port.is_open:
-                self.serial_port.close()
-            self._is_connected = False
-
-    def parse_nmea_data(self, data: str):
-        """解析NMEA数据，按指定格式输出"""
-        lines = data.split('\n')
-        output = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            if line.startswith('$GNRMC'):
-                output.append(f"原始: {line}")
-                result = NMEAParser.parse_gnrmc(line.split(','))
-                if result['valid']:
-                    output.append(
-                        f"解析: [GNRMC]\n"
-                        f"      时间: {result['time']}\n"
-                        f"      日期: {result['date']}\n"
-                        f"      位置: {result['latitude']:.6f}°N, {result['longitude']:.6f}°E\n"
-                        f"      速度: {result['speed']:.2f} km/h\n"
-                        f"      航向: {result['course']:.1f}°\n"
-                    )
-                else:
-                    output.append(f"解析: [GNRMC] {result.get('status', '无效数据')}\n")
-                output.append("")
-
-            elif line.startswith('$GNGGA'):
-                output.append(f"原始: {line}")
-                result = NMEAParser.parse_gngga(line.split(','))
-                if result['valid']:
-                    output.append(
-                        f"解析: [GNGGA]\n"
-                        f"      时间: {result['time']}\n"
-                        f"      位置: {result['latitude']:.6f}°N, {result['longitude']:.6f}°E\n"
-                        f"      质量: {result['quality']}\n"
-                        f"      卫星数: {result['satellites']}\n"
-                        f"      HDOP: {result['hdop']:.1f}\n"
-                        f"      海拔: {result['altitude']:.1f} m\n"
-                    )
-                else:
-                    output.append(f"解析: [GNGGA] {result.get('status', '无效数据')}\n")
-                output.append("")
-
-        return '\n'.join(output) if output else None
+        self.reader.run()
+
+    def _cancel_read(self):
+        """唤醒阻塞中的读取，使线程立即响应停止请求"""
+        if self.reactor is not None:
+            self.reader.should_stop = True
+            if self.isRunning():
+                self.reactor.remove_receiver(self.reader)
+            return
+        self.reader.stop()
+
+    parse_nmea_lines = staticmethod(parse_nmea_lines)
+    format_record = staticmethod(format_record)
 
     # 在SerialReceiver类中修改
     def cleanup(self):
         """彻底清理串口资源"""
-        self._should_stop = True
+        self._cancel_read()
 
         # 断开所有信号连接
-        try:
-            self.data_received.disconnect()
-            self.error_occurred.disconnect()
-        except TypeError:
-            pass  # 信号未连接时忽略
+        for signal in (self.raw_data_received, self.timed_data_received, self.data_received,
+                       self.records_received, self.error_occurred):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # 信号未连接时忽略
 
         # 更安全的线程终止方式
         if self.isRunning():
             self.wait(2000)  # 等待线程结束，最多2秒
-            if self.isRunning():
+            if self.isRunning() and self.reactor is None:
                 self.terminate()  # 强制终止线程
 
         # 确保串口关闭
@@ -284,7 +143,7 @@ class SerialReceiver(QThread):
             except:
                 pass
             finally:
-                self.serial_port = None
+                self.reader.serial_port = None
 
         # 强制释放资源
         import gc
@@ -292,27 +151,18 @@ class SerialReceiver(QThread):
 
     def disconnect(self):
         """断开串口连接"""
-        self._should_stop = True
+        self._cancel_read()
         if self.isRunning():
             self.wait(1000)  # 等待线程结束，最多1秒
-        self._is_connected = False
+        self.reader.is_connected = False
         if hasattr(self, '_data_window'):
             self._data_window.close()
 
     @property
     def is_connected(self):
-        return self._is_connected
-
-    @staticmethod
-    def get_available_ports() -> list:
-        """获取所有可用串口"""
-        try:
-            # 直接调用 comports() 获取最新列表
-            ports = [port.device for port in serial.tools.list_ports.comports()]
-            return sorted(ports)  # 返回排序后的端口列表
-        except Exception as e:
-            print(f"获取串口列表错误: {str(e)}")
-            return []
+        return self.reader.is_connected
+
+    get_available_ports = staticmethod(get_available_ports)
 
     def get_port_info(self):
         """获取串口详细信息"""
@@ -327,5 +177,32 @@ class SerialReceiver(QThread):
         停止位: {self.serial_port.stopbits}
         超时: {self.serial_port.timeout}
         接收缓存: {self.serial_port.in_waiting} 字节
+        待处理批次: {self.queued_batches}
+        丢弃批次: {self.dropped_batches}
         """
-        return info
\ No newline at end of file
+        return info + format_stats(self.stats.snapshot())
+
+
+class ReplayReceiver(SerialReceiver):
+    """用serial_logs中记录的日志代替串口，信号与SerialReceiver相同
+
+    speed为1时按原始节奏，N为N倍速，None或0为不限速（见replay.ReplayReader）。只支持独立线程模式。
+    """
+
+    def __init__(self, path: str, port_index: int, speed: float = 1.0, loop: bool = False,
+                 config: SerialConfig = None):
+        config = config or SerialConfig(port=os.path.basename(path))
+        super().__init__(config, port_index)
+        self.reader = ReplayReader(config, path, speed, loop,
+                                   on_batch=self._emit_batch, on_error=self.error_occurred.emit)
+        self.reader.parse_records = lambda: self.receivers(self.records_received) > 0
+
+    def get_port_info(self):
+        speed = f"{self.reader.speed:g}x" if self.reader.speed else "不限速"
+        return f"""
+        回放文件: {self.reader.path}
+        速度: {speed}
+        已回放: {self.reader.bytes_replayed} 字节
+        待处理批次: {self.queued_batches}
+        丢弃批次: {self.dropped_batches}
+        """ + format_stats(self.stats.snapshot())
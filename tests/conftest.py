@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 允许在仓库根目录直接运行 python -m pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from serial_core import NMEAFramer, decoder_table, parse_nmea_lines
+from serial_core.batch import decode_buffer
+
+SENTENCES = (
+    b"$GNRMC,083559.00,A,3958.71234,N,11619.45678,E,0.004,77.52,091202,,,A*4B\r\n",
+    b"$GPRMC,083600.00,V,3958.71240,S,11619.45680,W,1.500,,091202,,,A*00\r\n",
+    b"$BDGGA,083559.00,3958.71234,N,11619.45678,E,1,12,0.86,52.4,M,-8.5,M,,*00\r\n",
+    b"$GPGSV,3,1,12,01,40,083,46,02,17,308,41,12,07,344,39,14,22,228,45*00\r\n",
+    b"$GPGGA,083600.00,3958.71240,S,11619.45680,W,2,05,12.5,-3.25,M,-8.5,M,,*00\r\n",
+)
+
+
+def test_any_talker_matches_per_line():
+    data = b''.join(SENTENCES) * 3
+    columns = decode_buffer(data, block_size=256)  # 小块：同时覆盖分块与拼接
+    records = parse_nmea_lines(NMEAFramer(verify_checksum=False).feed(data), decoder_table(('RMC', 'GGA')))
+    for name, keys in (('RMC', ('latitude', 'longitude', 'speed')), ('GGA', ('latitude', 'longitude', 'hdop', 'altitude'))):
+        rows = [r for r in records if r.type.endswith(name)]
+        assert len(rows) == len(columns[name]['latitude']) == 6
+        # 逐行解析不填无效定位的坐标，只比较有效的语句
+        valid = columns[name]['valid']
+        for key in keys:
+            expected = [getattr(r, key) for r, ok in zip(rows, valid) if ok]
+            assert np.allclose(expected, columns[name][key][valid]), f"{name}.{key}"
+    assert columns['RMC']['valid'].tolist() == [True, False] * 3
+    assert columns['RMC']['latitude'][1] < 0 and columns['RMC']['longitude'][1] < 0
+    assert np.isnan(columns['RMC']['course'][1])
+    assert columns['GGA']['satellites'].tolist() == [12, 5] * 3
+    assert columns['GGA']['quality'].tolist() == [1, 2] * 3
+    assert columns['RMC']['time'][0] == 8 * 3600 + 35 * 60 + 59
+
+
+def test_truncated_sentence_is_skipped():
+    data = b"$GNRMC,083559.00,A,3958.7" + SENTENCES[0] + b"$GPGGA,0836"
+    columns = decode_buffer(data)
+    assert len(columns['RMC']['time']) == 1 and len(columns['GGA']['time']) == 0
@@ -0,0 +1,35 @@
+from serial_core.binary import RTCMFrame, UBXFrame, crc24q, frame_key, ubx_checksum
+
+
+def test_crc24q_check_value():
+    # CRC-24Q（RTCM3/Qualcomm）的标准校验值
+    assert crc24q(b"123456789") == 0xCDE703
+    assert crc24q(b"") == 0
+
+
+def test_crc24q_accepts_memoryview():
+    data = bytes(range(200))
+    assert crc24q(memoryview(data)[10:50]) == crc24q(data[10:50])
+
+
+def test_ubx_checksum_known_message():
+    # UBX-CFG-PRT轮询：B5 62 06 00 00 00 06 18
+    assert ubx_checksum(bytes((0x06, 0x00, 0x00, 0x00))) == (0x06, 0x18)
+
+
+def test_ubx_checksum_matches_reference():
+    data = bytes(range(256)) * 3
+    ck_a = ck_b = 0
+    for byte in data:
+        ck_a = (ck_a + byte) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    assert ubx_checksum(data) == (ck_a, ck_b)
+
+
+def test_frame_names():
+    ubx = UBXFrame(b'\xb5\x62\x01\x07\x00\x00\x08\x19', 0x01, 0x07)
+    assert ubx.name == 'NAV-PVT'
+    assert ubx.payload == b''
+    assert frame_key(ubx) == 'UBX NAV-PVT'
+    assert UBXFrame(b'', 0x7F, 0x01).name == '7F-01'
+    assert frame_key(RTCMFrame(b'', 1077)) == 'RTCM3 1077'
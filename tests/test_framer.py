@@ -0,0 +1,92 @@
+from serial_core.binary import crc24q, ubx_checksum
+from serial_core.framer import NMEAFramer, nmea_checksum
+
+RMC = b"$GNRMC,083559.00,A,3958.71234,N,11619.45678,E,0.004,77.52,091202,,,A*4B\r\n"
+GGA = b"$GNGGA,083559.00,3958.71234,N,11619.45678,E,1,12,0.86,52.4,M,-8.5,M,,*6C\r\n"
+
+
+def ubx_frame(msg_class, msg_id, payload):
+    body = bytes((msg_class, msg_id)) + len(payload).to_bytes(2, 'little') + payload
+    return b'\xb5\x62' + body + bytes(ubx_checksum(body))
+
+
+def rtcm3_frame(message_type, payload):
+    payload = bytes((message_type >> 4, (message_type & 0x0F) << 4)) + payload
+    frame = b'\xd3' + len(payload).to_bytes(2, 'big') + payload
+    return frame + crc24q(frame).to_bytes(3, 'big')
+
+
+UBX = ubx_frame(0x01, 0x07, bytes(range(92)))
+RTCM = rtcm3_frame(1077, bytes(range(40)))
+
+
+def feed_chunks(data, size, framer=None):
+    framer = framer or NMEAFramer()
+    lines, frames = [], []
+    for i in range(0, len(data), size):
+        lines += framer.feed(data[i:i + size])
+        frames += framer.take_frames()
+    return framer, lines, frames
+
+
+def test_nmea_checksum_matches_reference():
+    body = RMC[1:RMC.index(b'*')]
+    x = 0
+    for byte in body:
+        x ^= byte
+    assert nmea_checksum(body) == x == 0x4B
+    assert nmea_checksum(memoryview(body)) == x
+
+
+def test_text_lines_independent_of_chunk_size():
+    data = (RMC + GGA) * 20
+    for size in (1, 2, 7, 64, len(data)):
+        framer, lines, frames = feed_chunks(data, size)
+        assert lines == [RMC.strip(), GGA.strip()] * 20
+        assert frames == []
+        assert framer.good_sentences == 40
+
+
+def test_bad_checksum_and_truncated_not_emitted():
+    framer = NMEAFramer()
+    bad = RMC.replace(b'*4B', b'*4C')
+    cut = RMC[:30] + GGA  # 前一条语句丢了后半段
+    lines = framer.feed(bad + cut + b"$GNRMC,no-checksum\r\n")
+    assert lines == [GGA.strip()]
+    assert framer.bad_checksum == 1
+    assert framer.truncated == 2
+
+
+def test_mixed_stream_independent_of_chunk_size():
+    data = (RMC + UBX + GGA + RTCM) * 5
+    for size in (1, 3, 17, 100, len(data)):
+        framer, lines, frames = feed_chunks(data, size)
+        assert lines == [RMC.strip(), GGA.strip()] * 5, size
+        assert [f.raw for f in frames] == [UBX, RTCM] * 5, size
+        assert framer.link_stats['frame_counts'] == {'UBX NAV-PVT': 5, 'RTCM3 1077': 5}
+        assert framer.bad_frames == 0
+
+
+def test_ubx_sync_split_across_reads():
+    # 回归：残留部分以B5结尾、下一块以62开头时不能走纯文本路径
+    framer = NMEAFramer()
+    assert framer.feed(RMC + b'\xb5') == [RMC.strip()]
+    assert framer.feed(UBX[1:] + GGA) == [GGA.strip()]
+    assert [f.raw for f in framer.take_frames()] == [UBX]
+    assert framer.link_stats['frames'] == 1
+
+
+def test_corrupt_frames_skip_one_byte():
+    bad_ubx = UBX[:-1] + bytes((UBX[-1] ^ 0xFF,))
+    bad_rtcm = RTCM[:-1] + bytes((RTCM[-1] ^ 0xFF,))
+    framer, lines, frames = feed_chunks(bad_ubx + RMC + bad_rtcm + GGA + UBX, 5)
+    assert lines == [RMC.strip(), GGA.strip()]
+    assert [f.raw for f in frames] == [UBX]
+    assert framer.bad_frames >= 2
+
+
+def test_binary_disabled_keeps_text_path():
+    framer = NMEAFramer(binary=False)
+    framer.feed(UBX + RMC)
+    assert framer.take_frames() == []
+    assert framer.frame_counts == {}
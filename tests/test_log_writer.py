@@ -0,0 +1,36 @@
+import os
+import threading
+import time
+
+from log_writer import LogRetention, LogWriter
+
+
+def test_retention_compresses_text_logs_only(tmp_path):
+    for name in ('a_20240101_000000.log', 'b_20240101_000000.cap', 'b_20240101_000000.idx'):
+        (tmp_path / name).write_bytes(b'$GNRMC,,V,,,,,,,,,,N*00\r\n' * 100)
+    retention = LogRetention(str(tmp_path), compress='gzip')
+    retention.apply()
+    assert sorted(os.listdir(tmp_path)) == ['a_20240101_000000.log.gz', 'b_20240101_000000.cap',
+                                            'b_20240101_000000.idx']
+    assert retention.compressed_files == 1
+
+
+def test_control_requests_never_block(tmp_path):
+    writer = LogWriter(max_queue=2, fsync_policy='none')
+    assert not writer.open(0, str(tmp_path), 'ttyUSB0')  # 写入线程尚未启动
+    release = threading.Event()
+    handle = writer._handle
+    writer._handle = lambda *args: (release.wait(5), handle(*args))  # 模拟磁盘卡住
+    writer.start()
+    assert writer.open(0, str(tmp_path), 'ttyUSB0')
+    time.sleep(0.05)  # 写入线程取走open后卡住
+    assert [writer.write(0, b'%d\n' % i) for i in range(3)] == [True, True, False]
+    started = time.monotonic()
+    assert writer.close_log(0)  # 队列已满也立即返回
+    assert time.monotonic() - started < 0.1
+    release.set()
+    writer.stop()
+    assert not writer.open(0, str(tmp_path), 'ttyUSB0')
+    logs = [name for name in os.listdir(tmp_path) if name.endswith('.log')]
+    assert len(logs) == 1 and (tmp_path / logs[0]).read_bytes() == b'0\n1\n'
+    assert writer.dropped_writes == 1
@@ -0,0 +1,46 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from serial_core import SerialConfig, SerialReader
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="需要pty")
+
+RMC = b"$GNRMC,083559.00,A,3958.71234,N,11619.45678,E,0.004,77.52,091202,,,A*4B\r\n"
+
+
+def test_batches_flush_on_time_without_reconfiguring_port():
+    master, slave = os.openpty()
+    batches = []
+    reader = SerialReader(SerialConfig(port=os.ttyname(slave), timeout=1),
+                          on_batch=lambda data, chunks, records: batches.append((time.monotonic(), data, records)))
+    reader.open()
+    timeouts = []
+    port_class = type(reader.serial_port)
+
+    class RecordingPort(port_class):
+        def _reconfigure_port(self, *args, **kwargs):
+            timeouts.append(self.timeout)
+            return super()._reconfigure_port(*args, **kwargs)
+
+    reader.serial_port.__class__ = RecordingPort
+    thread = threading.Thread(target=reader.run)
+    thread.start()
+    try:
+        sent = time.monotonic()
+        os.write(master, RMC)
+        while not batches and time.monotonic() - sent < 0.5:
+            time.sleep(0.005)
+        # 批次在batch_interval后交出，而不是等到1秒的读超时
+        assert batches and batches[0][0] - sent < 0.3
+        assert batches[0][1] == RMC and len(batches[0][2]) == 1
+        assert timeouts == []
+    finally:
+        reader.stop()
+        thread.join(2)
+        os.close(master)
+        os.close(slave)
+    assert not thread.is_alive()